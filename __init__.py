@@ -1,3 +1,3 @@
-from supervaizer_control import supervaize_account
+from platform_account import supervaize_account
 
 __all__ = ["supervaize_account"]
@@ -0,0 +1,345 @@
+# supervaize_hello_world/admission.py
+"""Admission control for agent job starts and DataResource writes.
+
+Every ``POST /api/supervaizer/agents/{slug}/jobs`` runs the job in a
+background task that holds a threadpool worker until the job ends. Without
+limits, a burst of job starts exhausts the pool and starves every other route. This module adds a
+pure ASGI middleware that, per agent:
+
+- admits at most ``max_concurrent_jobs + max_queued_jobs`` jobs at a time and
+  answers ``429 Too Many Requests`` with a ``Retry-After`` estimate beyond that;
+- still answers ``202`` immediately for a queued job, but holds its background
+  execution on the event loop (no thread) until a running job finishes;
+- rate-limits DataResource mutations with a token bucket per agent and
+  workspace - through the ``data_write_limit`` route dependency rather than the
+  middleware, so that only requests with an accepted write key are charged
+  (the workspace comes from a client header: unauthenticated requests must not
+  drain another workspace's bucket);
+- answers ``503 Service Unavailable`` to every job start once ``draining`` is
+  set (see shutdown.py).
+
+The job gate relies on Starlette running a response's background tasks inside
+the same ASGI call, right after the last body message is sent: the middleware
+waits for a slot at that point and releases it when the call returns.
+
+Usage (after the Server is built)::
+
+    install_admission_control(sv_server)
+
+and ``dependencies=[Depends(data_write_limit(agent_slug))]`` on the write routes
+(see async_data_routes.py).
+"""
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from loguru import logger as log
+from supervaizer import Server
+from supervaizer.access import require_scope
+
+_JOBS_PATH = re.compile(r"^/api/supervaizer/agents/(?P<slug>[^/]+)/jobs/?$")
+
+
+@dataclass(frozen=True)
+class AgentLimits:
+    """Admission limits of one agent.
+
+    Attributes:
+        max_concurrent_jobs: Jobs executing at the same time.
+        max_queued_jobs: Accepted jobs waiting for a free slot.
+        data_writes_per_second: Sustained DataResource writes per workspace.
+        data_write_burst: Writes allowed in a burst above the sustained rate.
+    """
+
+    max_concurrent_jobs: int = 4
+    max_queued_jobs: int = 16
+    data_writes_per_second: float = 50.0
+    data_write_burst: int = 100
+
+    @classmethod
+    def from_env(cls) -> "AgentLimits":
+        """Defaults overridable with JOBS_MAX_CONCURRENT, JOBS_MAX_QUEUED,
+        DATA_WRITES_PER_SECOND and DATA_WRITES_BURST."""
+        return cls(
+            max_concurrent_jobs=int(os.getenv("JOBS_MAX_CONCURRENT", cls.max_concurrent_jobs)),
+            max_queued_jobs=int(os.getenv("JOBS_MAX_QUEUED", cls.max_queued_jobs)),
+            data_writes_per_second=float(os.getenv("DATA_WRITES_PER_SECOND", cls.data_writes_per_second)),
+            data_write_burst=int(os.getenv("DATA_WRITES_BURST", cls.data_write_burst)),
+        )
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens/s up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Consume one token; returns 0 on success, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class JobGate:
+    """Concurrency slots plus a bounded FIFO queue for one agent's jobs.
+
+    A job first *reserves* a place (``reserve``), which fails when running and
+    queued jobs already fill the capacity. Once its 202 is sent it *claims* a
+    slot (``claim``), waiting in FIFO order when all slots are busy, and
+    ``release`` hands the slot to the next waiter. A request that fails before
+    being accepted gives its reservation back with ``cancel``.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.running = 0
+        self._reserved = 0
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = deque()
+        self._lock = threading.Lock()
+        self._avg_duration: float | None = None
+
+    @property
+    def queued(self) -> int:
+        return self._reserved + len(self._waiters)
+
+    def reserve(self) -> bool:
+        with self._lock:
+            if self.running + self.queued >= self.max_concurrent + self.max_queued:
+                return False
+            self._reserved += 1
+            return True
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._reserved -= 1
+
+    async def claim(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._reserved -= 1
+            if self.running < self.max_concurrent:
+                self.running += 1
+                return
+            waiter: asyncio.Future[None] = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                    raise
+            # The slot was handed over just before the cancellation: pass it on.
+            self.release()
+            raise
+
+    def release(self, duration: float | None = None) -> None:
+        with self._lock:
+            if duration is not None:
+                previous = self._avg_duration
+                self._avg_duration = duration if previous is None else 0.8 * previous + 0.2 * duration
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if waiter.done() or loop.is_closed():
+                    continue
+                # The slot passes straight to the waiter: ``running`` is unchanged.
+                loop.call_soon_threadsafe(_wake, waiter)
+                return
+            self.running -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until a place is likely to free up, from the average job duration."""
+        with self._lock:
+            average = self._avg_duration or 1.0
+            return max(1, math.ceil(average * (self.queued + 1) / self.max_concurrent))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "queued": self.queued,
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+            }
+
+
+def _wake(waiter: asyncio.Future[None]) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdmissionController:
+    """Per-agent job gates and per-(agent, workspace) write buckets.
+
+    Args:
+        limits: Limits by agent slug.
+        default: Limits of agents missing from ``limits``.
+        max_buckets: Write buckets kept before the least recently used are dropped.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, AgentLimits] | None = None,
+        default: AgentLimits | None = None,
+        max_buckets: int = 10_000,
+    ) -> None:
+        self.limits = dict(limits or {})
+        self.default = default or AgentLimits.from_env()
+        self.max_buckets = max_buckets
+        self._gates: dict[str, JobGate] = {}
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+        # Set while the server shuts down: job starts are refused, running jobs finish.
+        self.draining = False
+
+    def limits_for(self, agent_slug: str) -> AgentLimits:
+        return self.limits.get(agent_slug, self.default)
+
+    def gate(self, agent_slug: str) -> JobGate:
+        with self._lock:
+            gate = self._gates.get(agent_slug)
+            if gate is None:
+                limits = self.limits_for(agent_slug)
+                gate = self._gates[agent_slug] = JobGate(limits.max_concurrent_jobs, limits.max_queued_jobs)
+            return gate
+
+    def take_write(self, agent_slug: str, workspace_id: str) -> float:
+        """Consume a write token; returns 0 when allowed, else seconds to wait."""
+        key = (agent_slug, workspace_id)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                limits = self.limits_for(agent_slug)
+                bucket = self._buckets[key] = TokenBucket(limits.data_writes_per_second, limits.data_write_burst)
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.take()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            gates = dict(self._gates)
+        return {slug: gate.stats() for slug, gate in gates.items()}
+
+    def active_jobs(self) -> int:
+        """Running plus queued jobs across agents."""
+        return sum(gate["running"] + gate["queued"] for gate in self.stats().values())
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying an AdmissionController (see module docstring)."""
+
+    def __init__(self, app: Any, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            method, path = scope["method"], scope["path"]
+            if method == "POST" and (match := _JOBS_PATH.match(path)):
+                await self._admit_job(match["slug"], scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    async def _admit_job(self, slug: str, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if self.controller.draining:
+            log.warning(f"[Admission] {slug}: server is draining, rejecting job start")
+            await _reject(send, 503, 30, "Server is shutting down")
+            return
+        gate = self.controller.gate(slug)
+        if not gate.reserve():
+            log.warning(f"[Admission] {slug}: job queue full ({gate.stats()}), rejecting job start")
+            await _reject(send, 429, gate.retry_after(), "Agent job queue is full")
+            return
+
+        accepted = False
+        claimed = False
+        started = 0.0
+
+        async def send_then_wait(message: dict[str, Any]) -> None:
+            nonlocal accepted, claimed, started
+            if message["type"] == "http.response.start":
+                accepted = 200 <= message["status"] < 300
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body") and accepted:
+                # Response delivered; the job runs as soon as this returns.
+                claimed = True
+                await gate.claim()
+                started = time.monotonic()
+
+        try:
+            await self.app(scope, receive, send_then_wait)
+        finally:
+            if not claimed:
+                gate.cancel()
+            elif started:
+                gate.release(time.monotonic() - started)
+
+
+async def _reject(send: Any, status: int, retry_after: float, detail: str) -> None:
+    body = ('{"detail": "%s"}' % detail).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def data_write_limit(agent_slug: str) -> Callable[..., None]:
+    """Route dependency charging a DataResource write to ``agent_slug``'s bucket for the workspace.
+
+    It runs after ``require_scope("write")``: rejected keys never take a token.
+    Without an admission controller on the app, writes are not limited.
+    """
+
+    def _charge(request: Request, _: dict[str, str] = Depends(require_scope("write"))) -> None:
+        controller: AdmissionController | None = getattr(request.app.state, "admission", None)
+        if controller is None:
+            return
+        wait = controller.take_write(agent_slug, request.headers.get("X-Supervaize-Workspace-Id") or "")
+        if wait:
+            raise HTTPException(
+                status_code=429,
+                detail="DataResource write rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    return _charge
+
+
+def install_admission_control(
+    server: Server, limits: dict[str, AgentLimits] | None = None, default: AgentLimits | None = None
+) -> AdmissionController:
+    """Add the admission middleware to the server app; the controller is on ``app.state.admission``."""
+    controller = AdmissionController(limits, default)
+    app: FastAPI = server.app
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    app.state.admission = controller
+    return controller
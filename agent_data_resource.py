@@ -4,60 +4,174 @@
 Demonstrates how an agent declares a DataResource so Studio can render
 a generic CRUD table without any agent-specific UI code.
 
-The in-memory store is intentionally simple — it resets on server restart.
-Real agents would use a database repository instead of the dict below.
+The in-memory store (see contacts_store.py and contact_shards.py) is
+partitioned per workspace and resets on server restart.
+Real agents would use a database repository instead.
 """
-import uuid
+import atexit
+import csv
+import io
+import os
+from collections.abc import Iterator
 from typing import Any
 
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from supervaizer import DataResource, DataResourceField, Editable, FieldType
+from supervaizer.data_resource import DataResourceContext
+
+from contact_shards import ContactShards
+from contacts_store import AsyncContactStore, ContactQuotaExceededError, DuplicateContactError
+from fast_json import dumps
 
 # ---------------------------------------------------------------------------
 # In-memory store (resets on restart — for demo purposes only)
 # ---------------------------------------------------------------------------
 
-_contacts: dict[str, dict[str, Any]] = {
-    "c1": {"id": "c1", "first_name": "Alice", "last_name": "Smith", "email": "alice@example.com", "city": "Paris"},
-    "c2": {"id": "c2", "first_name": "Bob", "last_name": "Jones", "email": "bob@example.com", "city": "London"},
-}
+# Field used to deduplicate contacts: imports upsert on it and create/update reject
+# duplicates. Set CONTACTS_UNIQUE_FIELD="" to disable the index and always append.
+CONTACTS_UNIQUE_FIELD = os.getenv("CONTACTS_UNIQUE_FIELD", "email")
+
+_SEED_CONTACTS: list[dict[str, Any]] = [
+    {"id": "c1", "first_name": "Alice", "last_name": "Smith", "email": "alice@example.com", "city": "Paris"},
+    {"id": "c2", "first_name": "Bob", "last_name": "Jones", "email": "bob@example.com", "city": "London"},
+]
+
+# Contacts are partitioned per workspace (X-Supervaize-Workspace-Id); requests
+# without a workspace use the "default" shard. Each shard has its own row quota,
+# and only the most recently used shards stay in memory — cold ones are spilled
+# to CONTACTS_SPILL_DIR and reloaded on demand.
+CONTACTS_SHARD_MAX_ROWS = int(os.getenv("CONTACTS_SHARD_MAX_ROWS", "100000")) or None
+CONTACTS_MAX_RESIDENT_SHARDS = int(os.getenv("CONTACTS_MAX_RESIDENT_SHARDS", "32"))
+
+# With CONTACTS_SNAPSHOT_DIR set, shards are checkpointed there every
+# CONTACTS_SNAPSHOT_INTERVAL seconds (and at exit) and a restarted worker
+# restores them from it instead of starting over from the seed.
+CONTACTS_SNAPSHOT_DIR = os.getenv("CONTACTS_SNAPSHOT_DIR") or None
+CONTACTS_SNAPSHOT_INTERVAL = float(os.getenv("CONTACTS_SNAPSHOT_INTERVAL", "60"))
+
+_shards = ContactShards(
+    seed=_SEED_CONTACTS,
+    unique_field=CONTACTS_UNIQUE_FIELD,
+    max_rows=CONTACTS_SHARD_MAX_ROWS,
+    max_resident=CONTACTS_MAX_RESIDENT_SHARDS,
+    spill_dir=CONTACTS_SNAPSHOT_DIR or os.getenv("CONTACTS_SPILL_DIR") or None,
+)
+
+
+def _reset_contacts() -> None:
+    """Drop every workspace shard (used at import time and by the test fixtures)."""
+    _shards.reset()
+
+
+if CONTACTS_SNAPSHOT_DIR:
+    _shards.start_checkpointing(CONTACTS_SNAPSHOT_INTERVAL)
+    atexit.register(_shards.stop_checkpointing)
+else:
+    _reset_contacts()
+
+
+def checkpoint_contacts() -> None:
+    """Write changed shards to CONTACTS_SNAPSHOT_DIR now (no-op when snapshots are off)."""
+    if CONTACTS_SNAPSHOT_DIR:
+        _shards.checkpoint()
+
+
+def _workspace(context: DataResourceContext | None) -> str | None:
+    return context.workspace_id if context is not None else None
+
+
+def _conflict(exc: DuplicateContactError) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(exc))
+
+
+def _over_quota(exc: ContactQuotaExceededError) -> HTTPException:
+    return HTTPException(status_code=507, detail=str(exc))
+
+
+# Callbacks are coroutines: async_data_routes awaits them on the event loop, so
+# an I/O-bound backend would not hold a threadpool slot per request.
+
+
+async def _list_contacts(
+    context: DataResourceContext | None = None, skip: int = 0, limit: int | None = None
+) -> list[dict[str, Any]]:
+    """One page of a workspace's contacts (all of them without ``limit``), sliced in the store."""
+    async with _shards.apin(_workspace(context)) as store:
+        return await AsyncContactStore(store).page(skip, limit)
 
 
-def _list_contacts() -> list[dict[str, Any]]:
-    return list(_contacts.values())
+def _iter_contacts(workspace_id: str | None = None) -> Iterator[dict[str, Any]]:
+    """Yield a workspace's contacts one by one, a page at a time.
 
+    Only the current page is held (see ``ContactStore.iter_pages``), and the
+    shard stays pinned until the iteration ends, so an export's memory does
+    not grow with the workspace.
+    """
+    with _shards.pin(workspace_id) as store:
+        for page in store.iter_pages(EXPORT_PAGE_SIZE):
+            yield from page
 
-def _get_contact(contact_id: str) -> dict[str, Any] | None:
-    return _contacts.get(contact_id)
 
+def contact_choices(workspace_id: str | None = None) -> list[tuple[str, str]]:
+    """A workspace's contacts as ``(id, "First Last")`` options for dynamic choice fields.
 
-def _create_contact(data: dict[str, Any]) -> dict[str, Any]:
-    contact_id = str(uuid.uuid4())[:8]
-    # Always generate a server-side id; ignore any id supplied in the payload.
-    contact = {k: v for k, v in data.items() if k != "id"}
-    contact["id"] = contact_id
-    _contacts[contact_id] = contact
-    return contact
+    Labels leave the email out: it is a sensitive field, and choice lists are
+    served without the masking the data routes apply.
+    """
+    with _shards.pin(workspace_id) as store:
+        rows = store.snapshot()
+    options = []
+    for contact in rows:
+        name = " ".join(filter(None, (contact.get("first_name"), contact.get("last_name"))))
+        options.append((contact["id"], name or contact["id"]))
+    return options
 
 
-def _update_contact(contact_id: str, data: dict[str, Any]) -> dict[str, Any] | None:
-    if contact_id not in _contacts:
-        return None
-    _contacts[contact_id] = {**_contacts[contact_id], **data, "id": contact_id}
-    return _contacts[contact_id]
+def contacts_version(workspace_id: str | None = None) -> tuple[int, int]:
+    """Changes whenever a workspace's contacts do (a reset shard is a new store)."""
+    with _shards.pin(workspace_id) as store:
+        return id(store), store.version
 
 
-def _delete_contact(contact_id: str) -> bool:
-    if contact_id not in _contacts:
-        return False
-    del _contacts[contact_id]
-    return True
+async def _get_contact(contact_id: str, context: DataResourceContext | None = None) -> dict[str, Any] | None:
+    async with _shards.apin(_workspace(context)) as store:
+        return await AsyncContactStore(store).get(contact_id)
 
 
-def _import_contacts(records: list[dict[str, Any]]) -> dict[str, Any]:
-    for record in records:
-        contact_id = str(uuid.uuid4())[:8]
-        _contacts[contact_id] = {**record, "id": contact_id}
-    return {"created": len(records), "total": len(_contacts)}
+async def _create_contact(data: dict[str, Any], context: DataResourceContext | None = None) -> dict[str, Any]:
+    async with _shards.apin(_workspace(context)) as store:
+        try:
+            return await AsyncContactStore(store).create(data)
+        except DuplicateContactError as exc:
+            raise _conflict(exc) from exc
+        except ContactQuotaExceededError as exc:
+            raise _over_quota(exc) from exc
+
+
+async def _update_contact(
+    contact_id: str, data: dict[str, Any], context: DataResourceContext | None = None
+) -> dict[str, Any] | None:
+    async with _shards.apin(_workspace(context)) as store:
+        try:
+            return await AsyncContactStore(store).update(contact_id, data)
+        except DuplicateContactError as exc:
+            raise _conflict(exc) from exc
+
+
+async def _delete_contact(contact_id: str, context: DataResourceContext | None = None) -> bool:
+    async with _shards.apin(_workspace(context)) as store:
+        return await AsyncContactStore(store).delete(contact_id)
+
+
+async def _import_contacts(
+    records: list[dict[str, Any]], context: DataResourceContext | None = None
+) -> dict[str, Any]:
+    async with _shards.apin(_workspace(context)) as store:
+        try:
+            return await AsyncContactStore(store).import_records(records)
+        except ContactQuotaExceededError as exc:
+            raise _over_quota(exc) from exc
 
 
 # ---------------------------------------------------------------------------
@@ -90,3 +204,85 @@ contacts_resource = DataResource(
     on_delete=_delete_contact,
     on_import=_import_contacts,
 )
+
+
+# ---------------------------------------------------------------------------
+# Streaming export (mounted on the agent via custom_routes)
+# ---------------------------------------------------------------------------
+
+# Rows are read from the store EXPORT_PAGE_SIZE at a time (see _iter_contacts)
+# and buffered into chunks of roughly EXPORT_CHUNK_SIZE bytes before being sent,
+# so neither the rows nor the body are held in full, while each chunk is still
+# large enough to amortize the write.
+EXPORT_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_columns(fields: str | None, include_sensitive: bool) -> list[str]:
+    """Resolve the projected columns, dropping sensitive fields unless asked for."""
+    declared = [f.name for f in contacts_resource.fields]
+    sensitive = {f.name for f in contacts_resource.fields if f.sensitive}
+    if fields:
+        columns = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in columns if name not in declared]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown contact fields: {unknown}")
+    else:
+        columns = declared
+    if not include_sensitive:
+        columns = [name for name in columns if name not in sensitive]
+    return columns
+
+
+def _ndjson_chunks(columns: list[str], workspace_id: str | None = None) -> Iterator[bytes]:
+    buffer: list[bytes] = []
+    size = 0
+    for contact in _iter_contacts(workspace_id):
+        line = dumps({name: contact.get(name) for name in columns})
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b"\n".join(buffer) + b"\n"
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+
+def _csv_chunks(columns: list[str], workspace_id: str | None = None) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for contact in _iter_contacts(workspace_id):
+        writer.writerow([contact.get(name, "") for name in columns])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+contacts_routes = APIRouter(tags=["Data Resources"])
+
+
+@contacts_routes.get("/data/contacts/export/", summary="Export Contacts (streaming)")
+def export_contacts(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    fields: str | None = Query(default=None, description="Comma-separated fields to export"),
+    include_sensitive: bool = Query(default=False, description="Include fields marked sensitive"),
+    workspace_id: str | None = Header(default=None, alias="X-Supervaize-Workspace-Id"),
+) -> StreamingResponse:
+    """Stream every contact as NDJSON or CSV without building the full body in memory."""
+    columns = _export_columns(fields, include_sensitive)
+    if format == "ndjson":
+        chunks = _ndjson_chunks(columns, workspace_id)
+    else:
+        chunks = _csv_chunks(columns, workspace_id)
+    return StreamingResponse(
+        chunks,
+        media_type=_EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
@@ -4,14 +4,24 @@
 # If a copy of the MPL was not distributed with this file, you can obtain one at
 # https://mozilla.org/MPL/2.0/.
 
-# This is an example file.
-# It must be copied / renamed to supervaizer_control.py
-# and edited to configure your agent(s)
+"""
+Email research agent: collects a competitor summary for a company.
+
+A job fans out one research case per (country, language) pair. Cases run on
+the shared case scheduler (see scheduler.py) with at most
+EMAIL_RESEARCH_PARALLELISM in flight, their findings are streamed into the
+job's results as each case completes, and no new case starts once
+"Max number of results" is reached.
+"""
 
 import os
+import random
+from collections.abc import Iterable
+from concurrent.futures import Future
+from typing import Any
 
 import shortuuid
-from loguru import logger
+from loguru import logger as log
 from supervaizer import (
     Agent,
     AgentMethod,
@@ -25,17 +35,58 @@ from supervaizer import (
     JobResponse,
     Parameter,
     ParametersSetup,
-    Server,
 )
 from supervaizer.account import Account
 
-# Public url of your hosted agent  (including port if needed)
-# Use loca.lt or ngrok to get a public url during development.
-# This can be setup from environment variables.
-# SUPERVAIZER_HOST and SUPERVAIZER_PORT
-DEV_PUBLIC_URL = os.getenv("SUPERVAIZE_PUBLIC_URL_LOCAL")
-# Public url of your hosted agent
-PROD_PUBLIC_URL = os.getenv("SUPERVAIZE_PUBLIC_URL")
+from __init__ import supervaize_account
+from case_cache import CaseMemo, case_cache_for
+from cost_ledger import case_cost, cost_ledgers
+from deadlines import (
+    DeadlineExceeded,
+    call_with_deadline,
+    case_deadline,
+    close_expired,
+    close_late_case,
+    job_deadline,
+    sleep_within,
+)
+from dynamic_choices import choice_catalog
+from scheduler import SchedulerClosedError, case_scheduler
+
+# Research cases of one job running at the same time.
+RESEARCH_PARALLELISM = int(os.getenv("EMAIL_RESEARCH_PARALLELISM", "4"))
+
+COUNTRIES = {
+    "PA": "Panama",
+    "PG": "Papua New Guinea",
+    "PY": "Paraguay",
+    "PE": "Peru",
+    "PH": "Philippines",
+    "PN": "Pitcairn",
+    "PL": "Poland",
+}
+LANGUAGES = {"en": "English", "fr": "French", "es": "Spanish"}
+
+
+
+# agent_data_resource is imported on first use: it opens the contact shards,
+# which workers running research cases from this module never need.
+def _contact_choices(workspace_id: str | None) -> list[tuple[str, str]]:
+    from agent_data_resource import contact_choices
+
+    return contact_choices(workspace_id)
+
+
+def _contacts_version(workspace_id: str | None) -> tuple[int, int]:
+    from agent_data_resource import contacts_version
+
+    return contacts_version(workspace_id)
+
+
+# Options of the dynamic choice fields below (see dynamic_choices.py).
+choice_catalog.register("countries", lambda workspace_id: COUNTRIES.items())
+choice_catalog.register("languages", lambda workspace_id: LANGUAGES.items())
+choice_catalog.register("contacts", _contact_choices, version=_contacts_version, per_workspace=True)
 
 # Define the parameters and secrets expected by the agent
 agent_parameters: ParametersSetup | None = ParametersSetup.from_list([
@@ -97,15 +148,7 @@ job_start_fields: list[AgentMethodField] = [
         type=list[str],
         field_type="MultipleChoiceField",
         description="List of countries",
-        choices=[
-            ["PA", "Panama"],
-            ["PG", "Papua New Guinea"],
-            ["PY", "Paraguay"],
-            ["PE", "Peru"],
-            ["PH", "Philippines"],
-            ["PN", "Pitcairn"],
-            ["PL", "Poland"],
-        ],
+        dynamic_choices="countries",
         required=True,
     ),
     AgentMethodField(
@@ -113,22 +156,22 @@ job_start_fields: list[AgentMethodField] = [
         type=list[str],
         field_type="MultipleChoiceField",
         description="languages",
-        choices=[["en", "English"], ["fr", "French"], ["es", "Spanish"]],
+        dynamic_choices="languages",
         required=False,
     ),
     AgentMethodField(
-        name="languages",
+        name="Send summary to",
         type=list[str],
         field_type="MultipleChoiceField",
-        description="languages",
-        choices=[["en", "English"], ["fr", "French"], ["es", "Spanish"]],
+        description="Contacts receiving the summary",
+        dynamic_choices="contacts",
         required=False,
     ),
 ]
 
 job_start_method: AgentMethod = AgentMethod(
     name="start",  # This is required
-    method="hello_world.job_start",  # Path to the main function in dotted notation.
+    method="agent_email.job_start",  # Path to the main function in dotted notation.
     is_async=False,  # Only use sync methods for the moment
     params={"action": "start"},  # If default parameters must be passed to the function.
     fields=job_start_fields,
@@ -137,209 +180,253 @@ job_start_method: AgentMethod = AgentMethod(
 
 job_stop_method: AgentMethod = AgentMethod(
     name="stop",
-    method="control.stop",
+    method="agent_email.job_stop",
+    is_async=False,
     params={"action": "stop"},
-    description="Stop the agent",
+    description="Stop the running job",
 )
 job_status_method: AgentMethod = AgentMethod(
     name="status",
-    method="hello.mystatus",
-    params={"status": "statusvalue"},
+    method="agent_email.job_status",
+    is_async=False,
+    params={"action": "status"},
     description="Get the status of the agent",
 )
-custom_method: AgentMethod = AgentMethod(
-    name="custom",
-    method="control.custom",
-    params={"action": "custom"},
-    description="Custom method",
-)
 
-custom_method2: AgentMethod = AgentMethod(
-    name="custom2",
-    method="control.custom2",
-    params={"action": "custom2"},
-    description="Custom method",
-)
 
+def email_agent(agent_name: str = "Email Agent") -> Agent:
+    """
+    Define the Agent
+    """
+    return Agent(
+        name=agent_name,
+        id=shortuuid.uuid(f"{agent_name}"),
+        author="Alain Prasquier <al1@supervaize.com>",  # Author of the agent
+        developer="Alain Prasquier <al1@supervaize.com>",  # Developer of the controller integration
+        maintainer="Alain Prasquier <al1@supervaize.com>",  # Maintainer of the integration
+        editor="Alain Prasquier <al1@supervaize.com>",  # Editor (usually a company)
+        version="1.0",  # Version string
+        description="Researches a company per country and language and summarizes the findings",
+        tags=["hello world", "ai agent", "research"],
+        methods=AgentMethods(
+            job_start=job_start_method,
+            job_stop=job_stop_method,
+            job_status=job_status_method,
+            chat=None,
+        ),
+        parameters_setup=agent_parameters,
+        dynamic_choices_callback=choice_catalog.callback(
+            field.dynamic_choices for field in job_start_fields if field.dynamic_choices
+        ),
+        instructions_path="supervaize_instructions.html",  # Path where instructions page is served
+    )
 
-agent_name = "Hello World AI Agent"
-
-# Define the Agent
-agent: Agent = Agent(
-    name=agent_name,
-    id=shortuuid.uuid(f"{agent_name}"),
-    author="Alain Prasquier <al1@supervaize.com>",  # Author of the agent
-    developer="Alain Prasquier <al1@supervaize.com>",  # Developer of the controller integration
-    maintainer="Alain Prasquier <al1@supervaize.com>",  # Maintainer of the integration
-    editor="Alain Prasquier <al1@supervaize.com>",  # Editor (usually a company)
-    version="1.0",  # Version string
-    description="This is a test agent",
-    tags=["hello world", "ai agent"],
-    methods=AgentMethods(
-        job_start=job_start_method,
-        job_stop=job_stop_method,
-        job_status=job_status_method,
-        chat=None,
-        custom={"custom1": custom_method, "custom2": custom_method2},
-    ),
-    parameters_setup=agent_parameters,
-    instructions_path="supervaize_instructions.html",  # Path where instructions page is served
-)
 
-# For export purposes, use dummy values if environment variables are not set
-account: Account = Account(
-    workspace_id=os.getenv("SUPERVAIZE_WORKSPACE_ID") or "dummy_workspace_id",
-    api_key=os.getenv("SUPERVAIZE_API_KEY") or "dummy_api_key",
-    api_url=os.getenv("SUPERVAIZE_API_URL") or "https://app.supervaize.com",
-)
+def _account() -> Account:
+    return supervaize_account
 
-# Define the supervaizer server capabilities
-sv_server: Server = Server(
-    agents=[agent],
-    a2a_endpoints=True,  # Enable A2A endpoints
-    supervisor_account=account,  # Account of the supervisor from Supervaize
-)
 
+def _as_list(value: Any) -> list[str]:
+    """Multiple choice fields arrive as a list, or as a comma separated string from forms."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
 
-# Expose the FastAPI app instance for deployment
-app = sv_server.app
+
+def search_company(
+    company: str, country: str, language: str, advanced: bool, limit: int, deadline: float | None = None
+) -> list[dict[str, str]]:
+    """
+    Stand-in for the research backend (web search + summary with OPEN_API_KEY).
+    Findings only depend on the inputs; the latency is simulated and bounded by ``deadline``.
+    """
+    sleep_within(deadline, random.uniform(0.5, 3), f"search {company} in {country} ({language})")
+    rng = random.Random(f"{company}|{country}|{language}|{advanced}")
+    found = rng.randint(1, 8 if advanced else 3)
+    return [
+        {
+            "company": company,
+            "country": country,
+            "language": language,
+            "title": f"{company} in {COUNTRIES.get(country, country)} - {LANGUAGES.get(language, language)} source {n + 1}",
+        }
+        for n in range(min(found, limit))
+    ]
+
+
+def research_case(
+    case_id: str,
+    job_id: str,
+    company: str,
+    country: str,
+    language: str,
+    advanced: bool,
+    limit: int,
+    deadline: float | None = None,
+) -> dict[str, Any]:
+    """One research case: search a company for a country and language, report the findings."""
+    deadline = case_deadline(deadline)
+    log.info(f"AGENT EmailAgent: Starting Case [blue]{case_id}[/blue] - {company} / {country} / {language}")
+    case = call_with_deadline(
+        deadline,
+        Case.start_sync,
+        job_id=job_id,
+        account=_account(),
+        name=f"Research {company} - {country} ({language})",
+        description=f"case {case_id} in job {job_id} - {'advanced' if advanced else 'restricted'} research",
+        what=f"start case {case_id}",
+        on_late=close_late_case(f"start case {case_id}"),
+    )
+
+    try:
+        results = search_company(company, country, language, advanced, limit, deadline=deadline)
+        cost = 0.02 * len(results)
+
+        call_with_deadline(
+            deadline,
+            case.update_sync,
+            CaseNodeUpdate(
+                name=f"Findings {country} ({language})",
+                cost=cost,
+                payload={"results": results},
+                is_final=False,
+            ),
+            what=f"update case {case_id}",
+        )
+        call_with_deadline(
+            deadline,
+            case.close_sync,
+            case_result={"message": f"{len(results)} result(s)"},
+            final_cost=cost,
+            what=f"close case {case_id}",
+        )
+    except DeadlineExceeded as e:
+        log.warning(f"AGENT EmailAgent: Case id {case_id} timed out: {e}")
+        close_expired(case, e)
+        raise
+
+    log.info(f"AGENT EmailAgent: Case id {case_id} finished with {len(results)} result(s)")
+    return {"case_id": case_id, "cost": cost, "results": results}
 
 
-# Custom method to start a synchronous job.
 def job_start(**kwargs) -> JobResponse:
     """
-    This is a synchronous job : all cases are executed in the same process.
-    It is useful for testing and development.
-
-    Expects a JobResponse object to be returned.
+    Research a company in every selected country and language.
 
     **kwargs:
         fields: dict
-            The custom fields required for the job execution. Defined by you in the job_start_method.
+            The custom fields required for the job execution. Defined in job_start_fields.
         context: JobContext
             The context of the job - contains job_id, mission_id, mission_context. Provided by the Supervaize platform.
-        conditions: JobInstructions
-            The conditions of the job - contains stop_on_error, max_cases, etc. Defined by the user when the job is created in the Supervaize platform.
     """
-    cases = 0
-    cost = 0.0
-
     job_fields = kwargs.get("fields", {})
     job_context: JobContext = kwargs.get("context", {})
     job_instructions: JobInstructions | None = job_context.job_instructions
-
     job_id = job_context.job_id
 
-    logger.info(f"AGENT ExampleAgent: Starting Job {job_id}")
-    logger.info(f"AGENT ExampleAgent: Job Fields : {job_fields}")
-    logger.info(f"AGENT ExampleAgent: Job Instructions : {job_instructions}")
-
-    for i in range(3):
-        # Check if the conditions to continue the job are met.
-        check, explanation = (
-            job_instructions.check(cases=cases, cost=cost)
-            if job_instructions
-            else (True, "No conditions")
-        )
-        if check:  # REQUIRED - the job conditions must be met for the job to continue.
-            case_id = f"C{i + 1}"
+    company = str(job_fields.get("Company to research") or "Google")
+    max_results = int(job_fields.get("Max number of results") or 10)
+    advanced = job_fields.get("Type of research", "R") == "A"
+    languages = _as_list(job_fields.get("languages")) or ["en"]
+    targets = [(country, language) for country in _as_list(job_fields.get("List of countries")) for language in languages]
+
+    log.info(f"AGENT EmailAgent: Starting Job {job_id} - {company}, {len(targets)} target(s), max {max_results} result(s)")
+
+    results: list[dict[str, str]] = []
+    case_ids: dict[Future, str] = {}
+    # Research is deterministic in its inputs: with "email-agent" in CASE_CACHE_AGENTS,
+    # a case already run with the same inputs is answered from the cache (see case_cache.py).
+    memo = CaseMemo(case_cache_for("email-agent"), agent="email-agent")
+
+    def collect(finished: Iterable[Future]) -> None:
+        for future in finished:
+            case_id = case_ids.pop(future)
+            if future.cancelled():  # dropped by a server shutdown before it started
+                ledger.record(case_id, "cancelled")
+                continue
             try:
-                case_result = custom_case_start(
-                    case_id=case_id, job_id=job_id, **kwargs
-                )  # Execute case - case_is is optional.
-                cost += getattr(case_result, "cost", 1.1)  # Increment cost of job
-                cases += 1  # Increment number of cases
+                outcome = future.result()
+            except DeadlineExceeded as e:  # already closed as timed out; max_duration stops the job
+                log.warning(f"AGENT EmailAgent: Case {case_id} timed out: {e}")
+                ledger.record(case_id, "timeout")
+                continue
             except Exception as e:
-                logger.error(f"AGENT ExampleAgent: Error on case {case_id}: {e}")
+                log.error(f"AGENT EmailAgent: Error on case {case_id}: {e}")
+                ledger.record(case_id, "failed")
                 if job_instructions and job_instructions.stop_on_error:
-                    logger.error(f"AGENT ExampleAgent: STOPPING JOB ON ERROR: {e}")
-                    raise Exception(e)
-                else:
-                    logger.info(
-                        "AGENT ExampleAgent: CONTINUING JOB - stop_on_error is False"
-                    )
-        else:
-            logger.warning(f"AGENT ExampleAgent: STOPPING JOB: {explanation}")
-            break
-
-    final_deliverable = {"VERY": "IMPORTANT"}
-    # start = main(action="run")
+                    log.error(f"AGENT EmailAgent: STOPPING JOB ON ERROR: {e}")
+                    raise
+                continue
+            ledger.record(case_id, "cached" if memo.from_cache(future) else "completed", case_cost(outcome))
+            results.extend(outcome["results"][: max_results - len(results)])
+
+    deadline = job_deadline(job_instructions)
+    interrupted = False
+    with (
+        cost_ledgers.open(job_id, job_instructions) as ledger,
+        case_scheduler.job(job_context, expected_cases=len(targets), window=RESEARCH_PARALLELISM) as job,
+    ):
+        for i, (country, language) in enumerate(targets):
+            collect(job.completed())
+            if len(results) >= max_results:
+                log.info(f"AGENT EmailAgent: {max_results} result(s) collected, skipping remaining targets")
+                break
+            check, explanation = ledger.check(job_instructions, in_flight=job.in_flight)
+            if not check:
+                log.warning(f"AGENT EmailAgent: STOPPING JOB: {explanation}")
+                break
+            case_id = f"C{i + 1}"
+            inputs = {"company": company, "country": country, "language": language, "advanced": advanced, "limit": max_results}
+            try:
+                future = memo.submit(
+                    job, research_case, inputs, case_id=case_id, job_id=job_id, deadline=deadline, **inputs
+                )
+            except SchedulerClosedError as e:
+                log.warning(f"AGENT EmailAgent: STOPPING JOB: {e}")
+                interrupted = True
+                break
+            case_ids[future] = case_id
+            ledger.watch(case_id, future)
+        collect(job.wait())
+    cases, cost = ledger.completed, ledger.total_cost
+
+    payload: dict[str, Any] = {
+        "company": company,
+        "results": results,
+        "cases": cases,
+        "recipients": _as_list(job_fields.get("Send summary to")),
+        "costs": ledger.summary(),
+    }
+    if memo.enabled:
+        payload["case_cache"] = memo.report()
     res = JobResponse(
         job_id=job_id,
-        status=EntityStatus.COMPLETED,
-        message="Job Completed",
-        payload=final_deliverable,
+        status=EntityStatus.CANCELLED if interrupted else EntityStatus.COMPLETED,
+        message=f"{len(results)} result(s) for {company}" + (" - interrupted by server shutdown" if interrupted else ""),
+        payload=payload,
         cost=cost,
     )
-
-    logger.info(
-        f"AGENT ExampleAgent: Job {job_id} completed - Total cost: {cost} -> {res}"
-    )
-
+    log.info(f"AGENT EmailAgent: Job {job_id} completed - {cases} case(s), total cost: {cost}")
     return res
 
 
-def custom_case_start(case_id: str, job_id: str, **kwargs):
-    logger.info(f"AGENT ExampleAgent: Starting Case {case_id} with params: {kwargs}")
-    kwargs["case_id"] = case_id
-    random_sleep = random.uniform(0, 5)
-    random_cost = random.uniform(0, 10)
-    case = Case.start_sync(
-        job_id=job_id,
-        account=supervaize_account,
-        name=f"Case {case_id}",
-        description=f"case {case_id} in job {job_id} - random sleep {random_sleep} - random cost {random_cost}",
-    )
-
-    sleep(random_sleep)
-
-    case.update_sync(
-        CaseNodeUpdate(
-            name=f"Update Case {case_id}",
-            cost=random_cost,
-            payload={
-                "message": f"This a case update after sleeping for {random_sleep} seconds! - cost was {random_cost}"
-            },
-            is_final=False,
-        )
+def job_stop(**kwargs) -> None:
+    job_context = kwargs.get("context") or {}
+    job_id = getattr(job_context, "job_id", None) or (
+        job_context.get("job_id") if isinstance(job_context, dict) else None
     )
+    log.info(f"AGENT EmailAgent: job_stop requested for job_id={job_id}")
 
-    case.close_sync(case_result={"message": "Case Completed"})
 
-    logger.info(f"AGENT ExampleAgent: Case id {case_id} finished")
-    return case
-
-
-def resume_case_with_human_input(case_id: str, job_id: str, **kwargs):
-    case = Case.resume(id=case_id, job_id=job_id, account=supervaize_account)
-
-    case.close_sync(case_result={})
-
-
-def email_agent(supervaize_account: Account, agent_name="Email Agent") -> Agent:
-    """
-    Define the Agent
-    """
-    return Agent(
-        name=agent_name,
-        id=shortuuid.uuid(f"{agent_name}"),
-        author="Alain Prasquier <al1@supervaize.com>",  # Author of the agent
-        developer="Alain Prasquier <al1@supervaize.com>",  # Developer of the controller integration
-        maintainer="Alain Prasquier <al1@supervaize.com>",  # Maintainer of the integration
-        editor="Alain Prasquier <al1@supervaize.com>",  # Editor (usually a company)
-        version="1.0",  # Version string
-        description="This is a test agent",
-        tags=["hello world", "ai agent"],
-        methods=AgentMethods(
-            job_start=job_start_method(supervaize_account=supervaize_account),
-            job_stop=job_start_method(supervaize_account=supervaize_account),
-            job_status=job_start_method(supervaize_account=supervaize_account),
-            chat=None,
-            custom={
-                "custom1": custom_method(supervaize_account=supervaize_account),
-                "custom2": custom_method2(supervaize_account=supervaize_account),
-            },
-        ),
-        parameters_setup=agent_parameters,
-        instructions_path="supervaize_instructions.html",  # Path where instructions page is served
+def job_status(**kwargs):
+    job_context = kwargs.get("context") or {}
+    job_id = getattr(job_context, "job_id", None) or (
+        job_context.get("job_id") if isinstance(job_context, dict) else None
     )
+    log.info(f"AGENT EmailAgent: job_status requested for job_id={job_id}")
+    queue = case_scheduler.job_stats(job_id)
+    if queue is None:
+        return {"status": "idle", "job_id": job_id}
+    return {"status": "running", "job_id": job_id, "cases": queue, "costs": cost_ledgers.summary(job_id)}
@@ -4,7 +4,8 @@ Each case does work, then requests human approval before closing.
 """
 
 import random
-from time import sleep
+from collections.abc import Iterable
+from concurrent.futures import Future
 from loguru import logger as log
 from supervaizer import (
     Case,
@@ -16,26 +17,59 @@ from supervaizer import (
 )
 
 from __init__ import supervaize_account
+from cost_ledger import case_cost, cost_ledgers
+from deadlines import (
+    DeadlineExceeded,
+    call_with_deadline,
+    case_deadline,
+    close_expired,
+    close_late_case,
+    job_deadline,
+    sleep_within,
+)
+from job_events import emit, job_events
+from scheduler import SchedulerClosedError, case_scheduler
 
 
-def custom_case_start(case_id: str, job_id: str, **kwargs):
+def custom_case_start(case_id: str, job_id: str, deadline: float | None = None, **kwargs):
+    # The approval request must go out before the deadline; the human answer itself is not bounded.
+    deadline = case_deadline(deadline)
     log.info(
         f"AGENT HumanLoopAgent: Starting Case [blue]{case_id}[/blue] with params: {kwargs}"
     )
     kwargs["case_id"] = case_id
     random_sleep = random.uniform(0, 5)
     random_cost = random.uniform(0, 10)
-    case = Case.start_sync(
+    case = call_with_deadline(
+        deadline,
+        Case.start_sync,
         job_id=job_id,
         account=supervaize_account,
         name=f"Case {case_id}",
         description=f"case {case_id} in job {job_id} - random sleep {random_sleep} - random cost {random_cost}",
         case_id=case_id,
+        what=f"start case {case_id}",
+        on_late=close_late_case(f"start case {case_id}"),
     )
+    emit(job_id, "case_start", case_id)
+    try:
+        _run_until_approval(case, case_id, random_sleep, random_cost, deadline)
+    except DeadlineExceeded as e:
+        log.warning(f"AGENT HumanLoopAgent: Case id {case_id} timed out: {e}")
+        close_expired(case, e)
+        emit(job_id, "case_timeout", case_id, error=str(e))
+        raise
+    emit(job_id, "case_awaiting", case_id, cost=random_cost)
+    log.info(f"AGENT HumanLoopAgent: Case {case_id} waiting for human input")
+    return case
+
 
-    sleep(random_sleep)
+def _run_until_approval(case: Case, case_id: str, random_sleep: float, random_cost: float, deadline: float | None) -> None:
+    sleep_within(deadline, random_sleep, f"case {case_id}")
 
-    case.update_sync(
+    call_with_deadline(
+        deadline,
+        case.update_sync,
         CaseNodeUpdate(
             name=f"Update Case {case_id}",
             cost=random_cost,
@@ -43,11 +77,15 @@ def custom_case_start(case_id: str, job_id: str, **kwargs):
                 "message": f"This a case update after sleeping for {random_sleep} seconds! - cost was {random_cost}"
             },
             is_final=False,
-        )
+        ),
+        what=f"update case {case_id}",
     )
+    emit(case.job_id, "case_update", case_id, cost=random_cost)
 
     # Human-in-the-loop: every case asks for approval before completing
-    case.request_human_input_sync(
+    call_with_deadline(
+        deadline,
+        case.request_human_input_sync,
         CaseNodeUpdate(
             name="Human approval",
             cost=0.0,
@@ -79,9 +117,8 @@ def custom_case_start(case_id: str, job_id: str, **kwargs):
             is_final=False,
         ),
         "Please approve to continue or reject this case.",
+        what=f"request approval for case {case_id}",
     )
-    log.info(f"AGENT HumanLoopAgent: Case {case_id} waiting for human input")
-    return case
 
 
 def handle_human_input(**kwargs) -> JobResponse:
@@ -135,6 +172,7 @@ def handle_human_input(**kwargs) -> JobResponse:
             case_result={"message": "Case rejected", "status": "rejected"},
             final_cost=cost_so_far,
         )
+    emit(job_id, "case_close", case_id, cost=cost_so_far, status="approved" if approved and not rejected else "rejected")
     log.info(
         f"AGENT HumanLoopAgent: Human input processed for case {case_id} (approved={approved})"
     )
@@ -156,33 +194,66 @@ def job_start(**kwargs) -> JobResponse | None:
     job_id = job_context.job_id
 
     how_many = int(job_fields.get("How many cases to run", 1))
-    cases = 0
-    cost = 0.0
-
-    for i in range(how_many):
-        check, explanation = (
-            job_instructions.check(cases=cases, cost=cost)
-            if job_instructions
-            else (True, "No conditions")
-        )
-        if not check:
-            log.warning(f"AGENT HumanLoopAgent: STOPPING JOB: {explanation}")
-            break
-        case_id = f"C{i + 1}"
-        try:
-            case_result = custom_case_start(case_id=case_id, job_id=job_id, **kwargs)
-            cost += getattr(case_result, "cost", 0.0)
-            cases += 1
-        except Exception as e:
-            log.error(f"AGENT HumanLoopAgent: Error on case {case_id}: {e}")
-            if job_instructions and job_instructions.stop_on_error:
-                raise
+
+    # Cases run on the shared case scheduler (see scheduler.py).
+    case_ids: dict[Future, str] = {}
+
+    def collect(finished: Iterable[Future]) -> None:
+        for future in finished:
+            case_id = case_ids.pop(future)
+            if future.cancelled():  # dropped by a server shutdown before it started
+                ledger.record(case_id, "cancelled")
+                continue
+            try:
+                case_result = future.result()
+            except DeadlineExceeded as e:  # already closed as timed out; max_duration stops the job
+                log.warning(f"AGENT HumanLoopAgent: Case {case_id} timed out: {e}")
+                ledger.record(case_id, "timeout")
+                continue
+            except Exception as e:
+                log.error(f"AGENT HumanLoopAgent: Error on case {case_id}: {e}")
+                ledger.record(case_id, "failed")
+                if job_instructions and job_instructions.stop_on_error:
+                    raise
+                continue
+            # Cases are still open (awaiting approval): their cost so far is the sum of their updates.
+            ledger.record(case_id, "completed", case_cost(case_result))
+
+    deadline = job_deadline(job_instructions)
+    interrupted = False
+    # Case events, approvals included, are streamed on GET /api/jobs/{job_id}/events (see job_events.py).
+    with (
+        job_events.track(job_id, agent="human-in-the-loop-agent", expected_cases=how_many) as events,
+        cost_ledgers.open(job_id, job_instructions) as ledger,
+        case_scheduler.job(job_context, expected_cases=how_many) as job,
+    ):
+        for i in range(how_many):
+            collect(job.completed())
+            check, explanation = ledger.check(job_instructions, in_flight=job.in_flight)
+            if not check:
+                log.warning(f"AGENT HumanLoopAgent: STOPPING JOB: {explanation}")
+                break
+            case_id = f"C{i + 1}"
+            try:
+                # Only what the case needs: job_start's kwargs carry the workspace secrets
+                # (agent_parameters), which must not be written to a work queue broker.
+                future = job.submit(custom_case_start, case_id=case_id, job_id=job_id, fields=job_fields, deadline=deadline)
+            except SchedulerClosedError as e:
+                log.warning(f"AGENT HumanLoopAgent: STOPPING JOB: {e}")
+                interrupted = True
+                break
+            case_ids[future] = case_id
+            ledger.watch(case_id, future)
+        collect(job.wait())
+        cases, cost = ledger.completed, ledger.total_cost
+        events.end("stopped" if interrupted else "completed", cases=cases, cost=cost)
 
     return JobResponse(
         job_id=job_id,
-        status=EntityStatus.COMPLETED,
-        message=f"Started {cases} case(s) awaiting human approval",
-        payload={"cases_started": cases, "cost_so_far": cost},
+        status=EntityStatus.CANCELLED if interrupted else EntityStatus.COMPLETED,
+        message=f"Started {cases} case(s) awaiting human approval"
+        + (" - interrupted by server shutdown" if interrupted else ""),
+        payload={"cases_started": cases, "cost_so_far": cost, "costs": ledger.summary()},
         cost=cost,
     )
 
@@ -201,4 +272,13 @@ def job_status(**kwargs):
         job_context.get("job_id") if isinstance(job_context, dict) else None
     )
     log.info(f"AGENT HumanLoopAgent: job_status requested for job_id={job_id}")
-    return {"status": "idle", "job_id": job_id}
+    queue = case_scheduler.job_stats(job_id)
+    if queue is None:
+        return {"status": "idle", "job_id": job_id}
+    return {
+        "status": "running",
+        "job_id": job_id,
+        "cases": queue,
+        "progress": job_events.progress(job_id),
+        "costs": cost_ledgers.summary(job_id),
+    }
@@ -1,5 +1,6 @@
 import random
-from time import sleep
+from collections.abc import Iterable
+from concurrent.futures import Future
 from loguru import logger as log
 from supervaizer import (
     Case,
@@ -11,9 +12,23 @@ from supervaizer import (
 )
 
 from __init__ import supervaize_account
+from cost_ledger import case_cost, cost_ledgers
+from deadlines import (
+    DeadlineExceeded,
+    call_with_deadline,
+    case_deadline,
+    close_expired,
+    close_late_case,
+    job_deadline,
+    sleep_within,
+)
+from job_events import emit, job_events
+from scheduler import SchedulerClosedError, case_scheduler
 
 
-def custom_case_start(case_id: str, job_id: str, **kwargs):
+def custom_case_start(case_id: str, job_id: str, deadline: float | None = None, **kwargs):
+    """Run one case; every step is bounded by the job ``deadline`` and CASE_TIMEOUT (see deadlines.py)."""
+    deadline = case_deadline(deadline)
     log.info(
         f"AGENT ExampleAgent: Starting Case [blue]{case_id}[/blue] with params: {kwargs}"
     )
@@ -21,27 +36,43 @@ def custom_case_start(case_id: str, job_id: str, **kwargs):
     kwargs["case_id"] = case_id
     random_sleep = random.uniform(0, 5)
     random_cost = random.uniform(0, 10)
-    case = Case.start_sync(
+    case = call_with_deadline(
+        deadline,
+        Case.start_sync,
         job_id=job_id,
         account=supervaize_account,
         name=f"Case {case_id}",
         description=f"case {case_id} in job {job_id} - random sleep {random_sleep} - random cost {random_cost}",
+        what=f"start case {case_id}",
+        on_late=close_late_case(f"start case {case_id}"),
     )
+    emit(job_id, "case_start", case_id)
 
-    sleep(random_sleep)
+    try:
+        sleep_within(deadline, random_sleep, f"case {case_id}")
 
-    case.update_sync(
-        CaseNodeUpdate(
-            name=f"Update Case {case_id}",
-            cost=random_cost,
-            payload={
-                "message": f"This a case update after sleeping for {random_sleep} seconds! - cost was {random_cost}"
-            },
-            is_final=False,
+        call_with_deadline(
+            deadline,
+            case.update_sync,
+            CaseNodeUpdate(
+                name=f"Update Case {case_id}",
+                cost=random_cost,
+                payload={
+                    "message": f"This a case update after sleeping for {random_sleep} seconds! - cost was {random_cost}"
+                },
+                is_final=False,
+            ),
+            what=f"update case {case_id}",
         )
-    )
+        emit(job_id, "case_update", case_id, cost=random_cost)
 
-    case.close_sync(case_result={"message": "Case Completed"})
+        call_with_deadline(deadline, case.close_sync, case_result={"message": "Case Completed"}, what=f"close case {case_id}")
+    except DeadlineExceeded as e:
+        log.warning(f"AGENT ExampleAgent: Case id {case_id} timed out: {e}")
+        close_expired(case, e)
+        emit(job_id, "case_timeout", case_id, error=str(e))
+        raise
+    emit(job_id, "case_close", case_id, cost=random_cost)
 
     log.info(f"AGENT ExampleAgent: Case id {case_id} finished")
     return case
@@ -75,9 +106,6 @@ def job_start(**kwargs) -> JobResponse | None:
     for key, value in kwargs.items():
         log.debug(f"AGENT kwargs - {key}: {value}")
 
-    cases = 0
-    cost = 0.0
-
     job_fields = kwargs.get("fields", {})
     job_context: JobContext = kwargs.get("context", {})
     job_instructions: JobInstructions | None = job_context.job_instructions
@@ -120,40 +148,76 @@ def job_start(**kwargs) -> JobResponse | None:
     # Get main job field:
     how_many_times_to_say_hello = int(job_fields.get("How many times to say hello"))
 
-    for i in range(how_many_times_to_say_hello):
-        # Check if the conditions to continue the job are met.
-        check, explanation = (
-            job_instructions.check(cases=cases, cost=cost)
-            if job_instructions
-            else (True, "No conditions")
-        )
-        if check:  # REQUIRED - the job conditions must be met for the job to continue.
-            case_id = f"C{i + 1}"
+    # Cases run on the shared case scheduler (see scheduler.py): a few at a time,
+    # interleaved with other jobs' cases according to their priority class.
+    case_ids: dict[Future, str] = {}
+
+    def collect(finished: Iterable[Future]) -> None:
+        for future in finished:
+            case_id = case_ids.pop(future)
+            if future.cancelled():  # dropped by a server shutdown before it started
+                ledger.record(case_id, "cancelled")
+                continue
             try:
-                case_result = custom_case_start(
-                    case_id=case_id, job_id=job_id, **kwargs
-                )  # Execute case - case_is is optional.
-                cost += getattr(case_result, "cost", 1.1)  # Increment cost of job
-                cases += 1  # Increment number of cases
+                case_result = future.result()
+            except DeadlineExceeded as e:  # already closed as timed out; max_duration stops the job
+                log.warning(f"AGENT ExampleAgent: Case {case_id} timed out: {e}")
+                ledger.record(case_id, "timeout")
+                continue
             except Exception as e:
                 log.error(f"AGENT ExampleAgent: Error on case {case_id}: {e}")
+                ledger.record(case_id, "failed")
                 if job_instructions and job_instructions.stop_on_error:
                     log.error(f"AGENT ExampleAgent: STOPPING JOB ON ERROR: {e}")
                     raise Exception(e)
-                else:
-                    log.info(
-                        "AGENT ExampleAgent: CONTINUING JOB - stop_on_error is False"
-                    )
-        else:
-            log.warning(f"AGENT ExampleAgent: STOPPING JOB: {explanation}")
-            break
-
-    final_deliverable = {"VERY": "IMPORTANT"}
+                log.info("AGENT ExampleAgent: CONTINUING JOB - stop_on_error is False")
+                continue
+            ledger.record(case_id, "completed", case_cost(case_result))
+
+    # max_duration bounds each case too, not only the checks between cases (see deadlines.py).
+    deadline = job_deadline(job_instructions)
+    interrupted = False
+    # Case events are streamed on GET /api/jobs/{job_id}/events (see job_events.py);
+    # case costs are kept in the job's cost ledger (see cost_ledger.py).
+    with (
+        job_events.track(job_id, agent="hello-world-ai-agent", expected_cases=how_many_times_to_say_hello) as events,
+        cost_ledgers.open(job_id, job_instructions) as ledger,
+        case_scheduler.job(job_context, expected_cases=how_many_times_to_say_hello) as job,
+    ):
+        for i in range(how_many_times_to_say_hello):
+            collect(job.completed())
+            # Check if the conditions to continue the job are met - cases still running count as started.
+            check, explanation = ledger.check(job_instructions, in_flight=job.in_flight)
+            if not check:  # REQUIRED - the job conditions must be met for the job to continue.
+                log.warning(f"AGENT ExampleAgent: STOPPING JOB: {explanation}")
+                break
+            case_id = f"C{i + 1}"
+            # Only what the case needs: job_start's kwargs carry the workspace secrets
+            # (agent_parameters), which must not be written to a work queue broker.
+            try:
+                future = job.submit(
+                    custom_case_start,
+                    case_id=case_id,
+                    job_id=job_id,
+                    fields=job_fields,
+                    deadline=deadline,
+                )
+            except SchedulerClosedError as e:  # the server is draining: report what ran
+                log.warning(f"AGENT ExampleAgent: STOPPING JOB: {e}")
+                interrupted = True
+                break
+            case_ids[future] = case_id
+            ledger.watch(case_id, future)
+        collect(job.wait())
+        cost = ledger.total_cost
+        events.end("stopped" if interrupted else "completed", cases=ledger.completed, cost=cost)
+
+    final_deliverable = {"VERY": "IMPORTANT", "costs": ledger.summary()}
     # start = main(action="run")
     res = JobResponse(
         job_id=job_id,
-        status=EntityStatus.COMPLETED,
-        message="Job Completed",
+        status=EntityStatus.CANCELLED if interrupted else EntityStatus.COMPLETED,
+        message="Job interrupted by server shutdown" if interrupted else "Job Completed",
         payload=final_deliverable,
         cost=cost,
     )
@@ -186,4 +250,13 @@ def job_status(**kwargs):
         job_context.get("job_id") if isinstance(job_context, dict) else None
     )
     log.info(f"AGENT ExampleAgent: job_status requested for job_id={job_id}")
-    return {"status": "idle", "job_id": job_id}
+    queue = case_scheduler.job_stats(job_id)
+    if queue is None:
+        return {"status": "idle", "job_id": job_id}
+    return {
+        "status": "running",
+        "job_id": job_id,
+        "cases": queue,
+        "progress": job_events.progress(job_id),
+        "costs": cost_ledgers.summary(job_id),
+    }
@@ -0,0 +1,233 @@
+# supervaize_hello_world/async_data_routes.py
+"""Async-aware DataResource CRUD routes.
+
+The supervaizer SDK calls DataResource callbacks inline from its async route
+handlers: a sync callback blocks the event loop for its whole duration and a
+coroutine callback is never awaited. This module regenerates the same routes
+(same paths, operation ids, API key auth and write scopes) with handlers that
+await ``async def`` callbacks and run plain ones in the threadpool, and mounts
+them ahead of the SDK's routes so they take precedence. The OpenAPI schema
+documents these routes in place of the SDK's, which stay mounted but are never
+matched.
+
+An ``on_list`` callback that takes ``skip`` and ``limit`` keyword arguments is
+asked for the page itself; other callbacks return every item and the route
+slices the page.
+
+Resources listed as ``trusted`` return their callbacks' results as
+``FastJSONResponse`` (see fast_json.py), skipping response validation and
+``jsonable_encoder``: only list resources whose callbacks return plain JSON.
+
+Usage (after the Server is built)::
+
+    install_async_data_routes(sv_server, trusted={"contacts"})
+"""
+import inspect
+from collections.abc import Collection
+from typing import Any
+
+from fastapi import APIRouter, Body, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse
+from loguru import logger as log
+from supervaizer import Agent, DataResource, Server
+from supervaizer.access import require_api_key, require_scope
+from supervaizer.data_resource import DataResourceContext
+
+from admission import data_write_limit
+from fast_json import FastJSONResponse
+
+
+def _context_from_request(request: Request, agent_slug: str) -> DataResourceContext:
+    return DataResourceContext(
+        workspace_id=request.headers.get("X-Supervaize-Workspace-Id"),
+        workspace_slug=request.headers.get("X-Supervaize-Workspace-Slug"),
+        mission_id=request.headers.get("X-Supervaize-Mission-Id"),
+        agent_slug=agent_slug,
+        request_id=request.headers.get("X-Supervaize-Request-Id"),
+    )
+
+
+def _accepts(callback: Any, parameter: str) -> bool:
+    try:
+        return parameter in inspect.signature(callback).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+async def call_callback(callback: Any, context: DataResourceContext, *args: Any, **kwargs: Any) -> Any:
+    """Invoke a DataResource callback without blocking the event loop.
+
+    Coroutine functions are awaited on the loop; plain functions run in the
+    threadpool. ``PermissionError`` maps to 403, as in the SDK.
+    """
+    if callback is None:
+        raise HTTPException(status_code=501, detail="DataResource callback not configured")
+    if _accepts(callback, "context"):
+        kwargs["context"] = context
+    try:
+        if inspect.iscoroutinefunction(callback):
+            return await callback(*args, **kwargs)
+        result = await run_in_threadpool(callback, *args, **kwargs)
+        if inspect.isawaitable(result):
+            return await result
+        return result
+    except PermissionError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from exc
+
+
+def _operation_id(agent_slug: str, resource_name: str, action: str) -> str:
+    return f"{agent_slug}_{resource_name}_{action}"
+
+
+def create_async_data_routes(
+    agent: Agent, trusted: Collection[str] = (), include_in_schema: bool = True
+) -> APIRouter:
+    """Build CRUD routes for every DataResource declared on ``agent``; ``trusted`` resources skip encoding."""
+    router = APIRouter(prefix=agent.path, tags=["Data Resources"], include_in_schema=include_in_schema)
+    for resource in agent.data_resources:
+        _add_resource_routes(router, resource, agent.slug, fast=resource.name in trusted)
+    return router
+
+
+def _add_resource_routes(router: APIRouter, r: DataResource, agent_slug: str, fast: bool = False) -> None:
+    prefix = f"/data/{r.name}"
+    label = r.display_name_resolved
+    # Writes are rate-limited per workspace once the key is accepted (see admission.py).
+    write = [Depends(require_scope("write")), Depends(data_write_limit(agent_slug))]
+
+    def reply(content: Any, status_code: int = 200) -> Any:
+        if fast:
+            return FastJSONResponse(content, status_code=status_code)
+        if status_code != 200:
+            return JSONResponse(content=content, status_code=status_code)
+        return content  # validated and encoded by FastAPI
+
+    def add(path: str, handler: Any, method: str, action: str, summary: str, **kwargs: Any) -> None:
+        op_id = _operation_id(agent_slug, r.name, action)
+        router.add_api_route(
+            f"{prefix}{path}",
+            handler,
+            methods=[method],
+            summary=summary,
+            operation_id=op_id,
+            name=op_id,
+            **kwargs,
+        )
+
+    if r.on_list is not None:
+        paged = _accepts(r.on_list, "skip") and _accepts(r.on_list, "limit")
+
+        async def list_items(
+            request: Request,
+            skip: int = Query(default=0, ge=0),
+            limit: int = Query(default=100, ge=1, le=1000),
+        ) -> list[dict[str, Any]]:
+            log.info(f"📥 GET {prefix}/ [DataResource list: {r.name}]")
+            context = _context_from_request(request, agent_slug)
+            if paged:  # the callback returns the page itself
+                return reply(await call_callback(r.on_list, context, skip=skip, limit=limit))
+            result = await call_callback(r.on_list, context)
+            return reply(result[skip : skip + limit])
+
+        add("/", list_items, "GET", "list", f"List {label}")
+
+    if r.on_get is not None:
+
+        async def get_item(request: Request, item_id: str) -> dict[str, Any]:
+            log.info(f"📥 GET {prefix}/{item_id} [DataResource get: {r.name}]")
+            result = await call_callback(r.on_get, _context_from_request(request, agent_slug), item_id)
+            if result is None:
+                raise HTTPException(status_code=404, detail=f"{r.name} '{item_id}' not found")
+            return reply(result)
+
+        add("/{item_id}", get_item, "GET", "get", f"Get {label}")
+
+    if r.on_create is not None and not r.read_only:
+
+        async def create_item(request: Request, data: dict[str, Any] = Body(...)) -> JSONResponse:
+            log.info(f"📥 POST {prefix}/ [DataResource create: {r.name}]")
+            result = await call_callback(r.on_create, _context_from_request(request, agent_slug), data)
+            if not isinstance(result, dict) or "id" not in result:
+                raise HTTPException(status_code=500, detail=f"on_create for '{r.name}' must return a dict with 'id'")
+            return reply(result, status_code=201)
+
+        add("/", create_item, "POST", "create", f"Create {label}", status_code=201, dependencies=write)
+
+    if r.on_update is not None and not r.read_only:
+
+        async def update_item(request: Request, item_id: str, data: dict[str, Any] = Body(...)) -> dict[str, Any]:
+            log.info(f"📥 PUT {prefix}/{item_id} [DataResource update: {r.name}]")
+            result = await call_callback(r.on_update, _context_from_request(request, agent_slug), item_id, data)
+            if result is None:
+                raise HTTPException(status_code=404, detail=f"{r.name} '{item_id}' not found")
+            return reply(result)
+
+        add("/{item_id}", update_item, "PUT", "update", f"Update {label}", dependencies=write)
+
+    if r.on_delete is not None and not r.read_only:
+
+        async def delete_item(request: Request, item_id: str) -> JSONResponse:
+            log.info(f"📥 DELETE {prefix}/{item_id} [DataResource delete: {r.name}]")
+            success = await call_callback(r.on_delete, _context_from_request(request, agent_slug), item_id)
+            if not success:
+                raise HTTPException(status_code=404, detail=f"{r.name} '{item_id}' not found")
+            return JSONResponse(content={"deleted": True}, status_code=200)
+
+        add("/{item_id}", delete_item, "DELETE", "delete", f"Delete {label}", dependencies=write)
+
+    if r.importable and r.on_import is not None:
+
+        async def import_items(request: Request, records: list[dict[str, Any]] = Body(...)) -> dict[str, Any]:
+            log.info(f"📥 POST {prefix}/import/ [DataResource import: {r.name}]")
+            return reply(await call_callback(r.on_import, _context_from_request(request, agent_slug), records))
+
+        add("/import/", import_items, "POST", "import", f"Import {label} (bulk)", dependencies=write)
+
+
+def _prepend_routes(app: FastAPI, router: APIRouter) -> None:
+    """Include ``router`` so its routes are matched before every existing one."""
+    before = len(app.router.routes)
+    app.include_router(router)
+    added = app.router.routes[before:]
+    del app.router.routes[before:]
+    app.router.routes[:0] = added
+
+
+def _document_routes(app: FastAPI, router: APIRouter) -> None:
+    """Replace the OpenAPI entries of the paths ``router`` serves with its own.
+
+    The shadowed SDK routes carry the same operation ids, so ``router`` is
+    mounted out of the schema and its entries are laid over the generated one.
+    """
+    build = app.openapi
+    own: dict[str, Any] = {}
+
+    def openapi() -> dict[str, Any]:
+        schema = build()
+        if not own:
+            own.update(get_openapi(title=app.title, version=app.version, routes=router.routes))
+        for path, operations in own["paths"].items():
+            schema["paths"].setdefault(path, {}).update(operations)
+        components = schema.setdefault("components", {}).setdefault("schemas", {})
+        for name, component in own.get("components", {}).get("schemas", {}).items():
+            components.setdefault(name, component)
+        return schema
+
+    app.openapi = openapi  # type: ignore[method-assign]
+
+
+def install_async_data_routes(server: Server, trusted: Collection[str] = ()) -> None:
+    """Serve every agent's DataResources through the async-aware routes.
+
+    ``trusted`` names the resources whose callbacks return plain JSON (see fast_json.py).
+    """
+    served = APIRouter(prefix="/api", dependencies=[Depends(require_api_key)])
+    documented = APIRouter(prefix="/api", dependencies=[Depends(require_api_key)])
+    for agent in server.agents:
+        if agent.data_resources:
+            served.include_router(create_async_data_routes(agent, trusted, include_in_schema=False))
+            documented.include_router(create_async_data_routes(agent, trusted))
+    _prepend_routes(server.app, served)
+    _document_routes(server.app, documented)
@@ -0,0 +1,94 @@
+# supervaize_hello_world/benchmarks/bench_json.py
+"""Serialization of a large contacts list: FastAPI's default path vs FastJSONResponse.
+
+Serves the same rows from two routes of a bare FastAPI app, one returning
+the list like the DataResource routes did (validated against
+``list[dict[str, Any]]`` then encoded with ``jsonable_encoder``), the other
+returning a ``FastJSONResponse``, and times full requests through the test
+client plus the serialization step alone.
+
+    python benchmarks/bench_json.py --rows 10000 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fast_json  # noqa: E402
+from fast_json import FastJSONResponse  # noqa: E402
+
+
+def make_rows(count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": f"c{n}",
+            "first_name": f"First{n}",
+            "last_name": f"Last{n}",
+            "email": f"contact{n}@example.com",
+            "city": ("Paris", "London", "Zürich", "Lisboa")[n % 4],
+        }
+        for n in range(count)
+    ]
+
+
+def make_app(rows: list[dict[str, Any]]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default")
+    async def default_route() -> list[dict[str, Any]]:
+        return rows
+
+    @app.get("/fast")
+    async def fast_route() -> FastJSONResponse:
+        return FastJSONResponse(rows)
+
+    return app
+
+
+def timed(fn: Any, repeat: int) -> list[float]:
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    client = TestClient(make_app(rows))
+    assert client.get("/default").json() == client.get("/fast").json()
+
+    results = {
+        "encode: jsonable_encoder + JSONResponse": timed(lambda: JSONResponse(jsonable_encoder(rows)), args.repeat),
+        "encode: FastJSONResponse": timed(lambda: FastJSONResponse(rows), args.repeat),
+        "request: default route": timed(lambda: client.get("/default"), args.repeat),
+        "request: FastJSONResponse route": timed(lambda: client.get("/fast"), args.repeat),
+    }
+    encoder = "orjson" if fast_json.orjson is not None else "json (install orjson for the full speedup)"
+    print(f"{args.rows} rows, {args.repeat} runs, encoder: {encoder}")
+    print(f"{'case':<42} {'median ms':>10} {'min ms':>10}")
+    for name, samples in results.items():
+        print(f"{name:<42} {statistics.median(samples):>10.2f} {min(samples):>10.2f}")
+    for kind in ("encode", "request"):
+        default, fast = (statistics.median(samples) for name, samples in results.items() if name.startswith(kind))
+        print(f"{kind} speedup: x{default / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
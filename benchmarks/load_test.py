@@ -0,0 +1,290 @@
+# supervaize_hello_world/benchmarks/load_test.py
+"""Load generator simulating many concurrent missions against a running server.
+
+Three open-loop traffic sources, each with Poisson arrivals at its own rate:
+
+- missions: ``job_start`` on the Hello World agent (random "How many times to
+  say hello") or on the Human-in-the-Loop agent (random "How many cases to
+  run"); each job is followed on its event stream (``/api/jobs/{id}/events``)
+  until it ends, which gives its completion time;
+- human answers: every case of a human-loop job that asks for approval gets an
+  answer (approve or reject) after an exponential think time;
+- contacts CRUD: a list/get/create/update/delete mix over several workspaces.
+
+Arrivals do not wait for earlier requests (open loop), so a saturated server
+shows up as growing latencies, 429/503 rejections (admission control) and
+errors rather than as a slower request rate. ``--ramp 1,2,4,8`` replays the
+load at increasing multiples of the rates, one stage after the other, and
+reports each stage: the saturation point is where throughput stops following
+the offered rate.
+
+    python benchmarks/load_test.py --url http://localhost:8000 --api-key $KEY \\
+        --job-rate 2 --crud-rate 50 --duration 60 --ramp 1,2,4
+
+Cases call the Supervaize API (SUPERVAIZE_API_URL) of the server under test:
+point it at a staging or stub platform, not production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+HELLO_AGENT = "hello-world-ai-agent"
+HUMAN_LOOP_AGENT = "human-in-the-loop-agent"
+CONTACTS = f"/api/agents/{HELLO_AGENT}/data/contacts"
+CRUD_MIX = {"list": 0.5, "get": 0.2, "create": 0.15, "update": 0.1, "delete": 0.05}
+REJECTED = {429, 503}
+
+
+@dataclass
+class Stats:
+    """Outcomes of one kind of operation."""
+
+    latencies: list[float] = field(default_factory=list)
+    ok: int = 0
+    rejected: int = 0
+    errors: int = 0
+
+    def record(self, seconds: float, status: int | None) -> None:
+        if status is not None and 200 <= status < 300:
+            self.ok += 1
+            self.latencies.append(seconds)
+        elif status in REJECTED:
+            self.rejected += 1
+        else:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        total = self.ok + self.rejected + self.errors
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float | None:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1) if ordered else None
+
+        return {
+            "requests": total,
+            "ok": self.ok,
+            "throughput": round(self.ok / elapsed, 2) if elapsed else 0.0,
+            "rejected_rate": round(self.rejected / total, 4) if total else 0.0,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 1) if ordered else None,
+        }
+
+
+class LoadTest:
+    """One load stage: runs the traffic sources for ``duration`` seconds."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, multiplier: float) -> None:
+        self.client = client
+        self.args = args
+        self.multiplier = multiplier
+        self.stats: dict[str, Stats] = defaultdict(Stats)
+        self.contact_ids: dict[str, list[str]] = defaultdict(list)
+        self.tasks: set[asyncio.Task] = set()
+        self.overloaded = 0
+
+    async def run(self) -> dict[str, Any]:
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        await asyncio.gather(
+            self._arrivals(self.args.job_rate * self.multiplier, self.mission, deadline),
+            self._arrivals(self.args.crud_rate * self.multiplier, self.crud, deadline),
+        )
+        if self.tasks:  # let started missions finish (answers included), within the grace period
+            await asyncio.wait(self.tasks, timeout=self.args.grace)
+        for task in self.tasks:
+            task.cancel()
+        elapsed = time.perf_counter() - start
+        return {
+            "multiplier": self.multiplier,
+            "offered": {
+                "jobs_per_s": self.args.job_rate * self.multiplier,
+                "crud_per_s": self.args.crud_rate * self.multiplier,
+            },
+            "seconds": round(elapsed, 1),
+            "client_overloaded": self.overloaded,
+            # Throughput is over the arrival window, so stages with different grace tails compare.
+            "operations": {name: stats.summary(self.args.duration) for name, stats in sorted(self.stats.items())},
+        }
+
+    async def _arrivals(self, rate: float, operation: Any, deadline: float) -> None:
+        if rate <= 0:
+            return
+        while True:
+            await asyncio.sleep(random.expovariate(rate))
+            if time.perf_counter() >= deadline:
+                return
+            if len(self.tasks) >= self.args.max_in_flight:
+                self.overloaded += 1  # the generator itself is the bottleneck
+                continue
+            task = asyncio.create_task(operation())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def request(self, name: str, method: str, url: str, **kwargs: Any) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats[name].record(time.perf_counter() - start, None)
+            return None
+        self.stats[name].record(time.perf_counter() - start, response.status_code)
+        return response
+
+    # -- missions -------------------------------------------------------------
+
+    async def mission(self) -> None:
+        human_loop = random.random() < self.args.human_loop_share
+        job_id = f"load-{uuid.uuid4().hex[:12]}"
+        if human_loop:
+            agent, fields = HUMAN_LOOP_AGENT, {"How many cases to run": random.randint(1, self.args.max_cases)}
+        else:
+            agent, fields = HELLO_AGENT, {"How many times to say hello": random.randint(1, self.args.max_hellos)}
+        body = {
+            "job_context": {
+                "workspace_id": random.choice(self.args.workspaces),
+                "job_id": job_id,
+                "started_by": "load-test",
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "mission_id": f"mission-{random.randrange(self.args.missions)}",
+                "mission_name": "load test",
+            },
+            "job_fields": fields,
+        }
+        started = time.perf_counter()
+        response = await self.request(f"job_start {agent}", "POST", f"/api/supervaizer/agents/{agent}/jobs", json=body)
+        if response is None or response.status_code != 202:
+            return
+        await self.follow(job_id, agent, started)
+
+    async def follow(self, job_id: str, agent: str, started: float) -> None:
+        """Read the job's events: answer approval requests, time the job until it ends."""
+        answers: list[asyncio.Task] = []
+        ended = False
+        try:
+            async with self.client.stream("GET", f"/api/jobs/{job_id}/events", timeout=None) as stream:
+                async for line in stream.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[len("data: "):])
+                    if event["type"] == "case_awaiting":
+                        answers.append(asyncio.create_task(self.answer(job_id, event["case_id"])))
+                    elif event["type"] == "job_end" and not ended:
+                        ended = True
+                        self.stats[f"job_complete {agent}"].record(
+                            time.perf_counter() - started, 200 if event.get("status") == "completed" else 500
+                        )
+                        if agent != HUMAN_LOOP_AGENT:  # human-loop streams go on until every case is answered
+                            break
+        except httpx.HTTPError:
+            self.stats[f"job_complete {agent}"].record(time.perf_counter() - started, None)
+        if answers:
+            await asyncio.gather(*answers)
+
+    async def answer(self, job_id: str, case_id: str) -> None:
+        await asyncio.sleep(random.expovariate(1 / self.args.think_time) if self.args.think_time > 0 else 0)
+        approved = random.random() < self.args.approve_ratio
+        await self.request(
+            "human_answer",
+            "POST",
+            f"/api/supervaizer/jobs/{job_id}/cases/{case_id}/update",
+            json={"answer": {"Approved": approved, "Rejected": not approved}},
+        )
+
+    # -- contacts -------------------------------------------------------------
+
+    async def crud(self) -> None:
+        workspace = random.choice(self.args.workspaces)
+        headers = {"X-Supervaize-Workspace-Id": workspace}
+        ids = self.contact_ids[workspace]
+        operation = random.choices(list(CRUD_MIX), weights=list(CRUD_MIX.values()))[0]
+        if operation in ("get", "update", "delete") and not ids:
+            operation = "create"
+        if operation == "list":
+            await self.request("contacts list", "GET", f"{CONTACTS}/", params={"limit": 100}, headers=headers)
+        elif operation == "get":
+            await self.request("contacts get", "GET", f"{CONTACTS}/{random.choice(ids)}", headers=headers)
+        elif operation == "create":
+            suffix = uuid.uuid4().hex[:10]
+            contact = {"first_name": "Load", "last_name": suffix, "email": f"{suffix}@load.test", "city": "Paris"}
+            response = await self.request("contacts create", "POST", f"{CONTACTS}/", json=contact, headers=headers)
+            if response is not None and response.status_code == 201:
+                ids.append(response.json()["id"])
+        elif operation == "update":
+            contact_id = random.choice(ids)
+            await self.request("contacts update", "PUT", f"{CONTACTS}/{contact_id}", json={"city": "Lyon"}, headers=headers)
+        else:
+            contact_id = ids.pop(random.randrange(len(ids)))
+            await self.request("contacts delete", "DELETE", f"{CONTACTS}/{contact_id}", headers=headers)
+
+
+def print_report(report: dict[str, Any]) -> None:
+    offered = report["offered"]
+    print(
+        f"\n== x{report['multiplier']:g}: {offered['jobs_per_s']:g} jobs/s, {offered['crud_per_s']:g} CRUD/s offered "
+        f"- {report['seconds']}s, {report['client_overloaded']} arrival(s) dropped by the generator"
+    )
+    columns = ("requests", "throughput", "rejected_rate", "error_rate", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+    print(f"{'operation':<40}" + "".join(f"{name:>14}" for name in columns))
+    for name, summary in report["operations"].items():
+        print(f"{name:<40}" + "".join(f"{'-' if summary[c] is None else summary[c]:>14}" for c in columns))
+
+
+async def main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    headers = {"X-API-Key": args.api_key} if args.api_key else {}
+    reports = []
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        for multiplier in args.ramp:
+            report = await LoadTest(client, args, multiplier).run()
+            print_report(report)
+            reports.append(report)
+    return reports
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("LOAD_TEST_URL", "http://localhost:8000"))
+    parser.add_argument("--api-key", default=os.getenv("SUPERVAIZER_API_KEY"))
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of arrivals per stage")
+    parser.add_argument("--job-rate", type=float, default=1.0, help="job_start arrivals per second")
+    parser.add_argument("--crud-rate", type=float, default=20.0, help="Contacts requests per second")
+    parser.add_argument("--ramp", default="1", help="Comma-separated rate multipliers, one stage each")
+    parser.add_argument("--human-loop-share", type=float, default=0.3, help="Share of jobs on the human-loop agent")
+    parser.add_argument("--max-hellos", type=int, default=10, help="Upper bound of 'How many times to say hello'")
+    parser.add_argument("--max-cases", type=int, default=5, help="Upper bound of 'How many cases to run'")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds before a human answers")
+    parser.add_argument("--approve-ratio", type=float, default=0.8)
+    parser.add_argument("--missions", type=int, default=20, help="Distinct mission ids")
+    parser.add_argument("--workspaces", default="default,acme,globex", help="Comma-separated workspace ids")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--max-in-flight", type=int, default=2000, help="Client-side cap on open operations")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--grace", type=float, default=60.0, help="Seconds to let missions finish after a stage")
+    parser.add_argument("--json", help="Also write the reports to this file")
+    args = parser.parse_args(argv)
+    args.ramp = [float(value) for value in args.ramp.split(",")]
+    args.workspaces = [value.strip() for value in args.workspaces.split(",") if value.strip()]
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    results = asyncio.run(main(arguments))
+    if arguments.json:
+        with open(arguments.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,246 @@
+# supervaize_hello_world/case_cache.py
+"""Opt-in memoization of case results across jobs.
+
+Missions often re-run a job with the same fields, redoing identical case work
+and API spend. For the agents listed in ``CASE_CACHE_AGENTS`` (slugs, comma
+separated; none by default), a case whose agent, method, inputs and relevant
+parameters match an earlier successful case is answered from a local SQLite
+file (``CASE_CACHE_PATH``) instead of being scheduled:
+
+- the key is a SHA-256 of those values in canonical JSON, so job ids,
+  timestamps and secrets stay out of it as long as the agent leaves them out
+  of ``inputs``;
+- entries expire ``CASE_CACHE_TTL`` seconds after being stored and the least
+  recently used ones are evicted beyond ``CASE_CACHE_MAX_ENTRIES``;
+- results are stored in the work queue's summary form (id, name, status,
+  cost), which is what ``job_start`` reads from a case;
+- failed cases are never cached.
+
+A hit skips the case function entirely, platform Case included: only opt in
+agents whose cases are deterministic in their inputs (the email research
+agent), never ones with random results or side effects (the hello world
+agent). Each job reports its hit rate in the JobResponse payload
+(``CaseMemo.report()``).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+from loguru import logger as log
+
+from scheduler import JobHandle
+from work_queue import decode_result, encode_result
+
+CASE_CACHE_AGENTS = frozenset(slug.strip() for slug in os.getenv("CASE_CACHE_AGENTS", "").split(",") if slug.strip())
+
+
+def case_key(agent: str, method: str, inputs: dict[str, Any], params: dict[str, Any] | None = None) -> str:
+    """Stable hash of what determines a case result."""
+    canonical = json.dumps(
+        {"agent": agent, "method": method, "inputs": inputs, "params": params or {}},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CaseCache:
+    """Size-bounded LRU of case results with a TTL, in a SQLite file.
+
+    Args:
+        path: SQLite database file (created if missing).
+        max_entries: Entries kept before the least recently used are evicted.
+        ttl: Seconds an entry stays valid after it was stored.
+
+    Thread-safe: each thread uses its own connection.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS case_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            used_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS case_cache_by_use ON case_cache (used_at);
+        CREATE INDEX IF NOT EXISTS case_cache_by_age ON case_cache (stored_at);
+    """
+
+    def __init__(self, path: str, max_entries: int = 10_000, ttl: float = 86_400.0) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._counters = threading.Lock()
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "CaseCache | None":
+        """The cache configured by CASE_CACHE_PATH, CASE_CACHE_MAX_ENTRIES and
+        CASE_CACHE_TTL; None when no agent opted in (CASE_CACHE_AGENTS)."""
+        if not CASE_CACHE_AGENTS:
+            return None
+        return cls(
+            os.getenv("CASE_CACHE_PATH", "case_cache.db"),
+            max_entries=int(os.getenv("CASE_CACHE_MAX_ENTRIES", "10000")),
+            ttl=float(os.getenv("CASE_CACHE_TTL", "86400")),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """``(True, result)`` for a live entry, else ``(False, None)``."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value FROM case_cache WHERE key = ? AND stored_at >= ?", (key, now - self.ttl)
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE case_cache SET used_at = ? WHERE key = ?", (now, key))
+        with self._counters:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return (False, None) if row is None else (True, decode_result(row[0]))
+
+    def put(self, key: str, result: Any) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO case_cache (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, encode_result(result), now, now),
+            )
+            conn.execute("DELETE FROM case_cache WHERE stored_at < ?", (now - self.ttl,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM case_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM case_cache WHERE key IN"
+                    " (SELECT key FROM case_cache ORDER BY used_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM case_cache")
+        with self._counters:
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        (entries,) = self._conn().execute("SELECT COUNT(*) FROM case_cache").fetchone()
+        with self._counters:
+            hits, misses = self.hits, self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+class CaseMemo:
+    """One job's use of the case cache: submits cases through it and counts hits.
+
+    With ``cache=None`` (the default, caching disabled) every case is simply
+    submitted to the job.
+    """
+
+    def __init__(self, cache: CaseCache | None, agent: str) -> None:
+        self.cache = cache
+        self.agent = agent
+        self.hits = 0
+        self.misses = 0
+        self._cached: set[Future[Any]] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache is not None
+
+    def submit(
+        self,
+        job: JobHandle,
+        fn: Callable[..., Any],
+        inputs: dict[str, Any],
+        *args: Any,
+        params: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> Future[Any]:
+        """Submit ``fn(*args, **kwargs)`` to ``job`` unless a result for ``inputs`` is cached.
+
+        ``inputs`` and ``params`` identify the case for the cache; the actual
+        call arguments are not hashed.
+        """
+        cache = self.cache
+        if cache is None:
+            return job.submit(fn, *args, **kwargs)
+        key = case_key(self.agent, f"{fn.__module__}.{fn.__qualname__}", inputs, params)
+        found, result = cache.get(key)
+        if found:
+            self.hits += 1
+            log.debug(f"[CaseCache] {self.agent}: hit for {inputs}")
+            future = job.resolved(result)
+            self._cached.add(future)
+            return future
+        self.misses += 1
+        future = job.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def from_cache(self, future: Future[Any]) -> bool:
+        """Whether ``future`` was answered from the cache rather than run (asked once per future).
+
+        Its result is the stored one, with the cost of the run that produced
+        it: the job's ledger records it as ``cached``, not charged again.
+        """
+        try:
+            self._cached.remove(future)
+        except KeyError:
+            return False
+        return True
+
+    def _store(self, key: str, future: Future[Any]) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            self.cache.put(key, future.result())
+        except Exception as e:  # A full disk must not fail the case.
+            log.warning(f"[CaseCache] {self.agent}: could not store a result: {e}")
+
+    def report(self) -> dict[str, Any]:
+        """Hit counts of this job, for the JobResponse payload."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+case_cache = CaseCache.from_env()
+
+
+def case_cache_for(agent: str) -> CaseCache | None:
+    """The case cache if ``agent`` opted in with CASE_CACHE_AGENTS, else None (caching disabled)."""
+    return case_cache if agent in CASE_CACHE_AGENTS else None
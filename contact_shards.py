@@ -0,0 +1,269 @@
+# supervaize_hello_world/contact_shards.py
+"""Per-workspace partitioning of the contacts DataResource.
+
+Every workspace gets its own ContactStore (its own gate, stripes and index),
+so a tenant running a huge import or hammering writes only contends with
+itself. Each shard has a row quota, and at most ``max_resident`` shards stay
+in memory: the least recently used ones are written to ``spill_dir`` as binary
+snapshots (see contacts_snapshot.py) and transparently reloaded on their next
+access.
+
+Shards are *pinned* while a request uses them; a pinned shard is never
+evicted, so no write can land in a store that has already been spilled.
+
+The same files double as a warm cache across restarts: ``checkpoint()`` (run
+periodically by ``start_checkpointing``) writes every shard changed since its
+last write, and a new process pointed at the directory reloads each shard on
+first use instead of re-importing it.
+
+Without a ``spill_dir`` each process spills to its own temporary directory,
+removed at exit. A shared directory may hold other processes' shards:
+``reset()`` only deletes the files this process wrote.
+"""
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from loguru import logger as log
+
+from contacts_snapshot import SnapshotError, read_snapshot, write_snapshot
+from contacts_store import ContactStore
+
+DEFAULT_WORKSPACE = "default"
+SPILL_SUFFIX = ".contacts.snap"
+
+
+def _private_spill_dir() -> Path:
+    path = tempfile.mkdtemp(prefix="supervaize_contacts-")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return Path(path)
+
+
+class ContactShards:
+    """Registry of per-workspace ContactStores with LRU eviction to disk.
+
+    Args:
+        seed: Contacts every new shard starts with.
+        unique_field: Unique field of each shard's store.
+        max_rows: Row quota of each shard (None for unbounded).
+        max_resident: Number of shards kept in memory.
+        spill_dir: Directory shard snapshots are written to (on eviction and
+            checkpoint); defaults to a ``supervaize_contacts-*`` directory of
+            this process in the system temp dir, removed at exit.
+    """
+
+    def __init__(
+        self,
+        seed: Iterable[dict[str, Any]] = (),
+        unique_field: str = "email",
+        max_rows: int | None = None,
+        max_resident: int = 32,
+        spill_dir: str | os.PathLike[str] | None = None,
+    ) -> None:
+        self.seed = [dict(contact) for contact in seed]
+        self.unique_field = unique_field
+        self.max_rows = max_rows
+        self.max_resident = max(1, max_resident)
+        self.spill_dir = Path(spill_dir) if spill_dir else _private_spill_dir()
+        self._resident: OrderedDict[str, ContactStore] = OrderedDict()
+        # Shards removed from memory whose spill file is still being written.
+        self._spilling: dict[str, ContactStore] = {}
+        self._pins: dict[str, int] = {}
+        # Store version last written to disk, per workspace.
+        self._saved: dict[str, int] = {}
+        # Spill files this process wrote: the only ones reset() deletes.
+        self._written: set[Path] = set()
+        self._lock = threading.Lock()
+        # Serializes snapshot writes so an older dump never replaces a newer one.
+        self._io_lock = threading.Lock()
+        self._checkpointer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # -- access -------------------------------------------------------------
+
+    @contextmanager
+    def pin(self, workspace_id: str | None) -> Iterator[ContactStore]:
+        """Borrow the shard of ``workspace_id``, loading it from disk if needed."""
+        workspace_id = workspace_id or DEFAULT_WORKSPACE
+        store = self._acquire(workspace_id)
+        try:
+            yield store
+        finally:
+            self._release(workspace_id)
+
+    @asynccontextmanager
+    async def apin(self, workspace_id: str | None) -> AsyncIterator[ContactStore]:
+        """Async ``pin``: resident shards are O(1), disk loads leave the event loop."""
+        workspace_id = workspace_id or DEFAULT_WORKSPACE
+        if self.is_resident(workspace_id):
+            store = self._acquire(workspace_id)
+        else:
+            store = await asyncio.to_thread(self._acquire, workspace_id)
+        try:
+            yield store
+        finally:
+            self._release(workspace_id)
+
+    def is_resident(self, workspace_id: str) -> bool:
+        with self._lock:
+            return workspace_id in self._resident
+
+    def stats(self) -> dict[str, Any]:
+        """Resident shard sizes and the number of shards spilled to disk."""
+        with self._lock:
+            resident = {ws: len(store) for ws, store in self._resident.items()}
+        spilled = sum(1 for _ in self.spill_dir.glob(f"*{SPILL_SUFFIX}")) if self.spill_dir.exists() else 0
+        return {"resident": resident, "spilled": spilled, "max_resident": self.max_resident}
+
+    def reset(self) -> None:
+        """Drop every shard in memory and the spill files this process wrote."""
+        with self._lock, self._io_lock:
+            self._resident.clear()
+            self._spilling.clear()
+            self._pins.clear()
+            self._saved.clear()
+            for path in self._written:
+                path.unlink(missing_ok=True)
+            self._written.clear()
+
+    # -- internals ----------------------------------------------------------
+
+    def _acquire(self, workspace_id: str) -> ContactStore:
+        with self._lock:
+            store = self._lookup(workspace_id)
+            if store is not None:
+                self._make_resident(workspace_id, store)
+                return store
+        # Disk I/O happens outside the registry lock; a concurrent loader of the
+        # same workspace may win the race, in which case its store is kept.
+        loaded = self._load(workspace_id)
+        with self._lock:
+            store = self._lookup(workspace_id)
+            if store is None:
+                store = loaded
+            self._make_resident(workspace_id, store)
+            victims = self._pick_victims()
+        for victim_id, victim in victims:
+            self._spill(victim_id, victim)
+        return store
+
+    def _lookup(self, workspace_id: str) -> ContactStore | None:
+        """In-memory shard, including one still being spilled; caller holds the lock."""
+        store = self._resident.get(workspace_id)
+        return store if store is not None else self._spilling.get(workspace_id)
+
+    def _make_resident(self, workspace_id: str, store: ContactStore) -> None:
+        """Mark as most recently used and pin; caller holds the registry lock."""
+        # Taking a shard back from _spilling makes its pending spill a no-op.
+        self._spilling.pop(workspace_id, None)
+        self._resident[workspace_id] = store
+        self._resident.move_to_end(workspace_id)
+        self._pins[workspace_id] = self._pins.get(workspace_id, 0) + 1
+
+    def _release(self, workspace_id: str) -> None:
+        with self._lock:
+            remaining = self._pins.get(workspace_id, 0) - 1
+            if remaining > 0:
+                self._pins[workspace_id] = remaining
+            else:
+                self._pins.pop(workspace_id, None)
+
+    def _pick_victims(self) -> list[tuple[str, ContactStore]]:
+        """Unpinned LRU shards beyond ``max_resident``; caller holds the registry lock."""
+        victims = []
+        overflow = len(self._resident) - self.max_resident
+        for workspace_id in list(self._resident):
+            if overflow <= 0:
+                break
+            if self._pins.get(workspace_id):
+                continue
+            store = self._resident.pop(workspace_id)
+            self._spilling[workspace_id] = store
+            victims.append((workspace_id, store))
+            overflow -= 1
+        return victims
+
+    def _path(self, workspace_id: str) -> Path:
+        return self.spill_dir / f"{quote(workspace_id, safe='')}{SPILL_SUFFIX}"
+
+    def _write(self, workspace_id: str, store: ContactStore) -> bool:
+        """Snapshot ``store`` unless it is unchanged since its last write."""
+        with self._io_lock:
+            if self._saved.get(workspace_id) == store.version:
+                return False
+            version, rows, index = store.dump()
+            path = self._path(workspace_id)
+            size = write_snapshot(path, store.unique_field, rows, index)
+            self._saved[workspace_id] = version
+            self._written.add(path)
+        log.debug(f"Contacts: wrote shard '{workspace_id}' ({len(rows)} rows, {size} bytes)")
+        return True
+
+    def _spill(self, workspace_id: str, store: ContactStore) -> None:
+        self._write(workspace_id, store)
+        with self._lock:
+            if self._spilling.get(workspace_id) is store:
+                del self._spilling[workspace_id]
+                log.info(f"Contacts: evicted shard '{workspace_id}' ({len(store)} rows) to {self.spill_dir}")
+        # Otherwise it was reclaimed while being written: the resident copy stays authoritative.
+
+    def _load(self, workspace_id: str) -> ContactStore:
+        store = ContactStore(unique_field=self.unique_field, max_rows=self.max_rows)
+        path = self._path(workspace_id)
+        try:
+            unique_field, rows, index = read_snapshot(path)
+        except FileNotFoundError:
+            store.reset(self.seed)
+            return store
+        except SnapshotError as exc:
+            log.warning(f"Contacts: ignoring unreadable snapshot of shard '{workspace_id}': {exc}")
+            store.reset(self.seed)
+            return store
+        store.restore(rows, index if unique_field == self.unique_field else None)
+        with self._io_lock:
+            self._saved[workspace_id] = store.version
+        log.info(f"Contacts: restored shard '{workspace_id}' ({len(rows)} rows) from {path}")
+        return store
+
+    # -- persistence --------------------------------------------------------
+
+    def checkpoint(self) -> int:
+        """Write every resident shard changed since its last write; returns how many were written."""
+        with self._lock:
+            resident = list(self._resident.items())
+        return sum(self._write(workspace_id, store) for workspace_id, store in resident)
+
+    def start_checkpointing(self, interval: float) -> None:
+        """Checkpoint every ``interval`` seconds from a daemon thread."""
+        if self._checkpointer is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.checkpoint()
+                except Exception as exc:  # keep the loop alive; the next tick retries
+                    log.error(f"Contacts: checkpoint failed: {exc}")
+
+        self._checkpointer = threading.Thread(target=run, name="contacts-checkpoint", daemon=True)
+        self._checkpointer.start()
+        log.info(f"Contacts: checkpointing to {self.spill_dir} every {interval:g}s")
+
+    def stop_checkpointing(self, final: bool = True) -> None:
+        """Stop the checkpoint thread, optionally writing a last checkpoint."""
+        self._stop.set()
+        if self._checkpointer is not None:
+            self._checkpointer.join()
+            self._checkpointer = None
+        if final:
+            self.checkpoint()
@@ -0,0 +1,469 @@
+# supervaize_hello_world/contacts_store.py
+"""Thread-safe in-memory contact store backing the contacts DataResource.
+
+FastAPI runs sync callbacks in a threadpool, so the store is accessed
+concurrently. Locking is fine-grained:
+
+- Single-row mutations take the gate in *shared* mode plus the lock stripe of
+  the row id, so read-modify-write updates never lose writes while updates to
+  different rows proceed in parallel.
+- The unique-field index has its own short-lived lock (always acquired after
+  a stripe, never before), so uniqueness checks are atomic.
+- Bulk imports and snapshots take the gate in *exclusive* mode: a list taken
+  during an import sees either none or all of the batch.
+
+Rows are never mutated in place (updates store a new dict), so a snapshot is a
+cheap list of references that stays consistent after the gate is released.
+
+AsyncContactStore wraps the store behind coroutines: it is the reference shape
+for DataResources served by the async routes in async_data_routes.py.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from loguru import logger as log
+
+# ---------------------------------------------------------------------------
+# Contact ids — ULIDs, same format as the platform job_ids
+# ---------------------------------------------------------------------------
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Every 10-bit value as two Crockford symbols: encoding costs one lookup per 2 chars.
+_CROCKFORD_PAIRS = [a + b for a in _CROCKFORD for b in _CROCKFORD]
+_LOW_BITS = 40
+_LOW_MASK = (1 << _LOW_BITS) - 1
+_RANDOM_BITS = 80
+
+_ulid_lock = threading.Lock()
+_ulid_last_ms = 0
+_ulid_last_random = 0
+
+
+def _encode_base32(value: int, bits: int) -> str:
+    """Crockford base32 of ``value`` on ``bits`` bits (a multiple of 10)."""
+    pairs = _CROCKFORD_PAIRS
+    return "".join(pairs[(value >> shift) & 1023] for shift in range(bits - 10, -10, -10))
+
+
+def new_ulids(count: int = 1) -> list[str]:
+    """Generate ``count`` monotonic ULIDs in one batch.
+
+    48-bit millisecond timestamp followed by an 80-bit random part. Within the
+    same millisecond (or if the clock goes backwards) the random part is
+    incremented instead of redrawn, so ids always sort in generation order.
+    The timestamp and the high half of the random part are encoded once per
+    batch; only the low 40 bits change from one id to the next.
+    """
+    global _ulid_last_ms, _ulid_last_random
+    with _ulid_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _ulid_last_ms:
+            ms, random_part = now_ms, int.from_bytes(os.urandom(10), "big") >> 1
+        else:
+            ms, random_part = _ulid_last_ms, _ulid_last_random + 1
+        if random_part + count >= 1 << _RANDOM_BITS:
+            # Random part exhausted for this millisecond: borrow the next one.
+            ms, random_part = ms + 1, int.from_bytes(os.urandom(10), "big") >> 1
+        _ulid_last_ms, _ulid_last_random = ms, random_part + count - 1
+
+    # 48-bit timestamp -> 10 symbols (top symbol carries 3 bits).
+    prefix = _CROCKFORD[ms >> 45] + _encode_base32(ms & ((1 << 45) - 1), 50)[1:]
+    low = random_part & _LOW_MASK
+    if low + count <= _LOW_MASK + 1:
+        head = prefix + _encode_base32(random_part >> _LOW_BITS, 40)
+        pairs = _CROCKFORD_PAIRS
+        return [
+            head + pairs[v >> 30] + pairs[(v >> 20) & 1023] + pairs[(v >> 10) & 1023] + pairs[v & 1023]
+            for v in range(low, low + count)
+        ]
+    # The batch carries into the high half: encode every id in full.
+    return [prefix + _encode_base32(random_part + i, _RANDOM_BITS) for i in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Locking primitives
+# ---------------------------------------------------------------------------
+
+
+class _Gate:
+    """Shared/exclusive lock; waiting exclusive holders block new shared ones."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._shared = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._cond:
+            while self._exclusive or self._exclusive_waiting:
+                self._cond.wait()
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                if not self._shared:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._exclusive_waiting += 1
+            while self._exclusive or self._shared:
+                self._cond.wait()
+            self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
+class DuplicateContactError(ValueError):
+    """Raised when a write would duplicate the store's unique field."""
+
+    def __init__(self, field: str, value: str, owner: str) -> None:
+        super().__init__(f"A contact with {field} '{value}' already exists ({owner})")
+        self.field = field
+        self.value = value
+        self.owner = owner
+
+
+class ContactQuotaExceededError(Exception):
+    """Raised when a write would grow a store past its row quota."""
+
+    def __init__(self, limit: int, requested: int) -> None:
+        super().__init__(f"Contact quota exceeded: {requested} rows requested, limit is {limit}")
+        self.limit = limit
+        self.requested = requested
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+
+class ContactStore:
+    """Lock-striped contact store with a hash index on one unique field.
+
+    Args:
+        unique_field: Field imports upsert on and writes keep unique
+            (case-insensitive). Empty string disables the index.
+        stripes: Number of row lock stripes.
+        max_rows: Row quota; creates and imports past it raise
+            ContactQuotaExceededError. None means unbounded. Imports are
+            checked exactly; racing single creates may overshoot by at most
+            the number of concurrent writers.
+    """
+
+    def __init__(self, unique_field: str = "email", stripes: int = 64, max_rows: int | None = None) -> None:
+        self.unique_field = unique_field
+        self.max_rows = max_rows
+        # Bumped by every write; lets checkpoints skip stores that did not change.
+        self.version = 0
+        self._rows: dict[str, dict[str, Any]] = {}
+        self._by_key: dict[str, str] = {}
+        # (version, rows in id order) of the last listing, reused by ``page`` until the next write.
+        self._listing: tuple[int, list[dict[str, Any]]] | None = None
+        self._gate = _Gate()
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._index_lock = threading.Lock()
+        self._create_lock = threading.Lock()
+
+    # -- helpers ------------------------------------------------------------
+
+    def _stripe(self, contact_id: str) -> threading.Lock:
+        return self._stripes[hash(contact_id) % len(self._stripes)]
+
+    def unique_value(self, record: dict[str, Any]) -> str | None:
+        """Normalized unique-field value of a record, or None when absent/disabled."""
+        if not self.unique_field:
+            return None
+        value = record.get(self.unique_field)
+        if value is None:
+            return None
+        value = str(value).strip().lower()
+        return value or None
+
+    def _claim_key(self, key: str | None, contact_id: str, previous_key: str | None = None) -> None:
+        """Point ``key`` at ``contact_id``; caller holds the gate (and the row stripe)."""
+        if key == previous_key:
+            return
+        with self._index_lock:
+            owner = self._by_key.get(key) if key else None
+            if owner is not None and owner != contact_id:
+                raise DuplicateContactError(self.unique_field, key, owner)
+            if key:
+                self._by_key[key] = contact_id
+            if previous_key and self._by_key.get(previous_key) == contact_id:
+                del self._by_key[previous_key]
+
+    def _fresh_id(self, contact_id: str) -> str:
+        """``contact_id``, or a newly drawn id if a row already has it; caller holds the gate."""
+        while contact_id in self._rows:
+            log.warning(f"Contacts: id collision on {contact_id}, drawing a new id")
+            contact_id = new_ulids()[0]
+        return contact_id
+
+    def _insert(self, data: dict[str, Any], contact_id: str) -> dict[str, Any]:
+        """Insert under ``contact_id``; the caller made it fresh (``_fresh_id``) and claimed the key."""
+        contact = {**data, "id": contact_id}
+        self._rows[contact_id] = contact
+        self.version += 1
+        return contact
+
+    # -- reads --------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, contact_id: str) -> dict[str, Any] | None:
+        return self._rows.get(contact_id)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Point-in-time list of all contacts, in id (= insertion) order.
+
+        Generated ids are monotonic, so dict insertion order already is id
+        order and listing (and the SDK's skip/limit pagination) needs no sort.
+        """
+        with self._gate.exclusive():
+            return list(self._rows.values())
+
+    def page(self, skip: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        """Contacts ``skip`` to ``skip + limit`` of ``snapshot()``.
+
+        The listing is built once per version of the store (under the
+        exclusive gate) and reused without locking until the next write, so
+        paging through an unchanged store costs each page's copy only,
+        whatever its size or offset.
+        """
+        rows = self._current_listing()[1]
+        return rows[skip:] if limit is None else rows[skip : skip + limit]
+
+    def iter_pages(self, size: int = 1000) -> Iterator[list[dict[str, Any]]]:
+        """All contacts in listing order, ``size`` at a time.
+
+        Pages are slices of the cached listing (see ``page``), so an iteration
+        holds one page, not a copy of the store. Writers keep running between
+        pages: contacts created meanwhile are appended and come last, and
+        after a delete the next page resumes right after the last contact of
+        the previous page that still exists. A contact present for the whole
+        iteration is yielded exactly once.
+        """
+        version, position, previous = None, 0, []
+        while True:
+            listing = self._current_listing()
+            if version is not None and listing[0] != version:
+                position = self._resume(listing[1], position, previous)
+            version, rows = listing
+            chunk = rows[position : position + size]
+            if not chunk:
+                return
+            yield chunk
+            position += len(chunk)
+            previous = chunk
+
+    def _current_listing(self) -> tuple[int, list[dict[str, Any]]]:
+        listing = self._listing
+        if listing is None or listing[0] != self.version:
+            with self._gate.exclusive():
+                listing = self._listing = (self.version, list(self._rows.values()))
+        return listing
+
+    @staticmethod
+    def _resume(rows: list[dict[str, Any]], position: int, previous: list[dict[str, Any]]) -> int:
+        """Where ``iter_pages`` continues in a changed listing.
+
+        Rows keep their relative order (updates replace in place, creates
+        append) and deletes only shift them towards the start, so the last
+        surviving row of the previous page sits before ``position``.
+        """
+        ids = {row["id"] for row in previous}
+        for index in range(min(position, len(rows)) - 1, -1, -1):
+            if rows[index]["id"] in ids:
+                return index + 1
+        log.warning("Contacts: the page before the cursor was deleted, resuming by position")
+        return min(position, len(rows))
+
+    # -- writes -------------------------------------------------------------
+
+    def create(self, data: dict[str, Any]) -> dict[str, Any]:
+        # Always generate a server-side id; ignore any id supplied in the payload.
+        data = {k: v for k, v in data.items() if k != "id"}
+        with self._gate.shared(), self._create_lock:
+            if self.max_rows is not None and len(self._rows) >= self.max_rows:
+                raise ContactQuotaExceededError(self.max_rows, len(self._rows) + 1)
+            # Drawn and inserted under one lock, so concurrent creates insert in id
+            # order; the id is made fresh before the unique key is pointed at it.
+            contact_id = self._fresh_id(new_ulids()[0])
+            self._claim_key(self.unique_value(data), contact_id)
+            return self._insert(data, contact_id)
+
+    def update(self, contact_id: str, data: dict[str, Any]) -> dict[str, Any] | None:
+        return self.apply(contact_id, lambda previous: {**previous, **data})
+
+    def apply(
+        self, contact_id: str, change: Callable[[dict[str, Any]], dict[str, Any]]
+    ) -> dict[str, Any] | None:
+        """Atomically replace a contact with ``change(previous)``; None if missing."""
+        with self._gate.shared(), self._stripe(contact_id):
+            previous = self._rows.get(contact_id)
+            if previous is None:
+                return None
+            contact = {**change(previous), "id": contact_id}
+            self._claim_key(self.unique_value(contact), contact_id, self.unique_value(previous))
+            self._rows[contact_id] = contact
+            self.version += 1
+            return contact
+
+    def delete(self, contact_id: str) -> bool:
+        with self._gate.shared(), self._stripe(contact_id):
+            contact = self._rows.pop(contact_id, None)
+            if contact is None:
+                return False
+            self.version += 1
+            key = self.unique_value(contact)
+            if key:
+                with self._index_lock:
+                    if self._by_key.get(key) == contact_id:
+                        del self._by_key[key]
+            return True
+
+    def import_records(self, records: Iterable[dict[str, Any]]) -> dict[str, Any]:
+        """Upsert records on the unique field in a single O(n) pass.
+
+        Records whose unique value is already known update that contact in
+        place, so re-importing the same file is idempotent. Records without a
+        unique value (or with the index disabled) are always inserted. The
+        whole batch is applied under the exclusive gate, and rejected up front
+        if its new rows would exceed ``max_rows``.
+        """
+        records = [{k: v for k, v in record.items() if k != "id"} for record in records]
+        created = updated = unchanged = 0
+        with self._gate.exclusive():
+            new_ids = iter(new_ulids(len(records)))  # after every id already inserted
+            if self.max_rows is not None:
+                self._check_import_quota(records)
+            for data in records:
+                key = self.unique_value(data)
+                existing_id = self._by_key.get(key) if key else None
+                if existing_id is None:
+                    contact = self._insert(data, self._fresh_id(next(new_ids)))
+                    if key:
+                        self._by_key[key] = contact["id"]
+                    created += 1
+                    continue
+                previous = self._rows[existing_id]
+                contact = {**previous, **data, "id": existing_id}
+                if contact == previous:
+                    unchanged += 1
+                    continue
+                self._rows[existing_id] = contact
+                self.version += 1
+                updated += 1
+            total = len(self._rows)
+        return {"created": created, "updated": updated, "unchanged": unchanged, "total": total}
+
+    def _check_import_quota(self, records: list[dict[str, Any]]) -> None:
+        """Count the rows an import would add; caller holds the exclusive gate."""
+        seen: set[str] = set()
+        inserts = 0
+        for data in records:
+            key = self.unique_value(data)
+            if key is None:
+                inserts += 1
+            elif key not in self._by_key and key not in seen:
+                seen.add(key)
+                inserts += 1
+        if len(self._rows) + inserts > self.max_rows:
+            raise ContactQuotaExceededError(self.max_rows, len(self._rows) + inserts)
+
+    def reset(self, contacts: Iterable[dict[str, Any]] = ()) -> None:
+        """Replace the whole content (keeps the given ids)."""
+        with self._gate.exclusive():
+            self._rows.clear()
+            self._by_key.clear()
+            for contact in contacts:
+                contact = dict(contact)
+                self._rows[contact["id"]] = contact
+                key = self.unique_value(contact)
+                if key:
+                    self._by_key[key] = contact["id"]
+            self.version += 1
+
+    def dump(self) -> tuple[int, dict[str, dict[str, Any]], dict[str, str]]:
+        """Consistent ``(version, rows, index)`` copy for snapshotting.
+
+        Rows are immutable, so shallow dict copies taken under the exclusive
+        gate are enough.
+        """
+        with self._gate.exclusive():
+            return self.version, dict(self._rows), dict(self._by_key)
+
+    def restore(self, rows: dict[str, dict[str, Any]], index: dict[str, str] | None = None) -> None:
+        """Adopt ``rows`` (and its unique index) wholesale, e.g. from a snapshot.
+
+        The dicts are taken over without copying. Pass ``index=None`` when it
+        was built for another unique field and must be recomputed.
+        """
+        if index is None:
+            index = {}
+            for contact_id, contact in rows.items():
+                key = self.unique_value(contact)
+                if key:
+                    index[key] = contact_id
+        with self._gate.exclusive():
+            self._rows = rows
+            self._by_key = index
+            self.version += 1
+
+
+class AsyncContactStore:
+    """Coroutine facade over a ContactStore — the reference async DataResource store.
+
+    Every call that takes the gate runs in a thread (``asyncio.to_thread``):
+    while an import, a snapshot or an export holds the gate exclusively, even
+    a single-row write would wait for it, and waiting on the event loop
+    would stall every other request of the worker (other routes, SSE
+    streams, health checks). Only ``get``, a lock-free dict lookup, runs
+    inline. A database or HTTP backed store keeps these signatures and
+    awaits its driver instead.
+
+    Args:
+        store: Underlying thread-safe store (shared with sync readers such as
+            the streaming export).
+    """
+
+    def __init__(self, store: ContactStore) -> None:
+        self.store = store
+
+    async def snapshot(self) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self.store.snapshot)
+
+    async def page(self, skip: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self.store.page, skip, limit)
+
+    async def get(self, contact_id: str) -> dict[str, Any] | None:
+        return self.store.get(contact_id)
+
+    async def create(self, data: dict[str, Any]) -> dict[str, Any]:
+        return await asyncio.to_thread(self.store.create, data)
+
+    async def update(self, contact_id: str, data: dict[str, Any]) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self.store.update, contact_id, data)
+
+    async def delete(self, contact_id: str) -> bool:
+        return await asyncio.to_thread(self.store.delete, contact_id)
+
+    async def import_records(self, records: list[dict[str, Any]]) -> dict[str, Any]:
+        return await asyncio.to_thread(self.store.import_records, records)
@@ -0,0 +1,199 @@
+# supervaize_hello_world/cost_ledger.py
+"""Per-job cost ledger: one row per case, kept in compact arrays.
+
+Jobs used to add case costs one float at a time, with a made-up fallback
+when a result carried no cost. A ``CostLedger`` records every case the job
+collects instead: its cost, its duration (submission to completion) and its
+status, in ``array`` columns (8 bytes per cost and duration, 1 per status),
+so a job of 100k cases costs a couple of megabytes and aggregates in a few
+passes over contiguous memory:
+
+- totals are ``math.fsum`` sums, correctly rounded whatever the number of
+  cases, and are what the budget check (``check``) compares to ``max_cost``;
+- a case whose result has no cost is recorded as unpriced (NaN) and counted
+  as such, never priced with a default;
+- a case answered from the case cache (see case_cache.py) is recorded as
+  ``cached``: the cost of the run it reuses is reported as ``cached_cost``,
+  never added to the job's total or to the budget check;
+- ``summary()`` gives the totals per status, cost and duration percentiles,
+  the cost per second of the job and the cost outliers (Tukey's fences).
+
+Running jobs register their ledger in ``cost_ledgers`` so that ``job_status``
+can report it; the final summary goes into the JobResponse payload.
+"""
+import math
+import statistics
+import threading
+import time
+from array import array
+from collections.abc import Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any
+
+from loguru import logger as log
+from supervaizer import JobInstructions
+
+STATUSES = ("completed", "failed", "timeout", "cancelled", "cached")
+_CACHED = STATUSES.index("cached")
+MAX_OUTLIERS = 10
+
+_COST_ATTRIBUTES = ("total_cost", "calculated_cost", "cost")
+
+
+def case_cost(result: Any) -> float | None:
+    """Cost reported by a case result, or None when it has none.
+
+    Reads ``total_cost`` (set when a Case is closed), then ``calculated_cost``
+    (the sum of its updates, for cases left open such as human-loop ones),
+    then ``cost`` - from a Case, a work queue summary or a dict.
+    """
+    get = result.get if isinstance(result, dict) else lambda name: getattr(result, name, None)
+    found = None
+    for name in _COST_ATTRIBUTES:
+        value = get(name)
+        if value is None:
+            continue
+        if value:
+            return float(value)
+        found = 0.0
+    return found
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    if len(values) == 1:
+        cuts = values * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98], "max": max(values)}
+
+
+class CostLedger:
+    """Cost, duration and status of each case of one job (see module docstring)."""
+
+    def __init__(self, job_id: str, max_cost: float | None = None) -> None:
+        self.job_id = job_id
+        self.max_cost = max_cost
+        self.started = time.monotonic()
+        self.case_ids: list[str] = []
+        self.costs = array("d")
+        self.durations = array("d")
+        self.statuses = array("B")
+        self._submitted: dict[str, float] = {}
+        self._finished: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, case_id: str, future: Future[Any]) -> None:
+        """Time ``case_id`` from now until ``future`` completes."""
+        self._submitted[case_id] = time.monotonic()
+        future.add_done_callback(lambda _: self._finished.setdefault(case_id, time.monotonic()))
+
+    def record(self, case_id: str, status: str, cost: float | None = None) -> None:
+        """Add the row of a collected case; ``cost=None`` records it as unpriced.
+
+        For a ``cached`` case, ``cost`` is the cost of the run it reuses.
+        """
+        now = time.monotonic()
+        finished = self._finished.pop(case_id, now)
+        submitted = self._submitted.pop(case_id, finished)
+        if status == "completed" and cost is None:
+            log.warning(f"[CostLedger] Job {self.job_id}: case {case_id} reported no cost; recorded as unpriced")
+        with self._lock:
+            self.case_ids.append(case_id)
+            self.costs.append(math.nan if cost is None else cost)
+            self.durations.append(finished - submitted)
+            self.statuses.append(STATUSES.index(status))
+
+    def count(self, status: str) -> int:
+        return self.statuses.count(STATUSES.index(status))
+
+    @property
+    def completed(self) -> int:
+        """Cases with a result, run or answered from the cache."""
+        return self.count("completed") + self.count("cached")
+
+    @property
+    def total_cost(self) -> float:
+        """Exact (correctly rounded) sum of the priced cases the job ran (cached ones cost nothing)."""
+        with self._lock:
+            return math.fsum(
+                cost
+                for cost, status in zip(self.costs, self.statuses)
+                if status != _CACHED and not math.isnan(cost)
+            )
+
+    def check(self, job_instructions: JobInstructions | None, in_flight: int = 0) -> tuple[bool, str]:
+        """``JobInstructions.check`` on the ledger's totals; running cases count as started."""
+        if job_instructions is None:
+            return True, "No conditions"
+        return job_instructions.check(cases=self.completed + in_flight, cost=self.total_cost)
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregates of the recorded cases, for job_status and the JobResponse payload."""
+        with self._lock:
+            case_ids = list(self.case_ids)
+            costs = self.costs.tolist()
+            durations = self.durations.tolist()
+            statuses = self.statuses.tobytes()
+        cached = [cost for cost, status in zip(costs, statuses) if status == _CACHED]
+        costs = [math.nan if status == _CACHED else cost for cost, status in zip(costs, statuses)]
+        priced = [cost for cost in costs if not math.isnan(cost)]
+        total = math.fsum(priced)
+        elapsed = time.monotonic() - self.started
+        summary: dict[str, Any] = {
+            "cases": len(costs),
+            "statuses": {status: statuses.count(code) for code, status in enumerate(STATUSES)},
+            "unpriced": len(costs) - len(priced) - len(cached),
+            "total_cost": total,
+            "cached_cost": math.fsum(cost for cost in cached if not math.isnan(cost)),
+            "mean_cost": total / len(priced) if priced else 0.0,
+            "cost": _percentiles(sorted(priced)),
+            "duration": _percentiles(sorted(durations)),
+            "cost_per_second": total / elapsed if elapsed > 0 else 0.0,
+            "outliers": self._outliers(case_ids, costs, priced),
+        }
+        if self.max_cost is not None:
+            summary["budget"] = {"max_cost": self.max_cost, "remaining": self.max_cost - total}
+        return summary
+
+    @staticmethod
+    def _outliers(case_ids: list[str], costs: list[float], priced: list[float]) -> list[dict[str, Any]]:
+        """Cases costing more than Q3 + 1.5 IQR, the most expensive first."""
+        if len(priced) < 4:
+            return []
+        q1, _, q3 = statistics.quantiles(priced, n=4, method="inclusive")
+        fence = q3 + 1.5 * (q3 - q1)
+        above = sorted(
+            ((cost, case_id) for case_id, cost in zip(case_ids, costs) if cost > fence), reverse=True
+        )
+        return [{"case_id": case_id, "cost": cost} for cost, case_id in above[:MAX_OUTLIERS]]
+
+
+class CostLedgers:
+    """Ledgers of the running jobs, by job id."""
+
+    def __init__(self) -> None:
+        self._ledgers: dict[str, CostLedger] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self, job_id: str, job_instructions: JobInstructions | None = None) -> Iterator[CostLedger]:
+        ledger = CostLedger(job_id, max_cost=job_instructions.max_cost if job_instructions else None)
+        with self._lock:
+            self._ledgers[job_id] = ledger
+        try:
+            yield ledger
+        finally:
+            with self._lock:
+                if self._ledgers.get(job_id) is ledger:
+                    del self._ledgers[job_id]
+
+    def summary(self, job_id: str | None) -> dict[str, Any] | None:
+        with self._lock:
+            ledger = self._ledgers.get(job_id)
+        return ledger.summary() if ledger is not None else None
+
+
+cost_ledgers = CostLedgers()
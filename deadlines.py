@@ -0,0 +1,151 @@
+# supervaize_hello_world/deadlines.py
+"""Job and case deadlines derived from ``JobInstructions.max_duration``.
+
+``JobInstructions.check`` only stops a job *between* cases, so one slow case
+(or a hung ``Case.start_sync``) could still run unbounded. Instead:
+
+- ``job_deadline`` turns ``max_duration`` into an absolute deadline, counted
+  from the job's start;
+- each case receives the job deadline and, once it starts, tightens it with
+  ``case_deadline`` by ``CASE_TIMEOUT`` when set;
+- inside a case, ``call_with_deadline`` bounds every Case API call and
+  ``sleep_within`` / ``check_deadline`` bound the case's own work, raising
+  ``DeadlineExceeded`` once the time is up;
+- ``close_expired`` then closes the platform Case as timed out, with the cost
+  it reached, instead of leaving it open - including a Case whose start only
+  answered after the deadline (``close_late_case``).
+
+Deadlines are plain epoch timestamps (``time.time()``), so they stay valid
+when a case runs in another worker process (see work_queue.py). ``None``
+means no deadline.
+"""
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from loguru import logger as log
+from supervaizer import Case, JobInstructions
+
+T = TypeVar("T")
+
+# Upper bound of a single case in seconds, on top of the job's max_duration (unset: none).
+CASE_TIMEOUT = float(os.getenv("CASE_TIMEOUT", "0")) or None
+# Time allowed to close a case after its deadline passed.
+CLOSE_GRACE = float(os.getenv("CASE_CLOSE_GRACE", "5"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a case's deadline passes before its work is done."""
+
+
+def job_deadline(instructions: JobInstructions | None) -> float | None:
+    """Deadline of a job from ``max_duration``, counted from its start time when known."""
+    if instructions is None or not instructions.max_duration:
+        return None
+    # job_start_time is a perf_counter() reading set by JobInstructions.check.
+    elapsed = time.perf_counter() - instructions.job_start_time if instructions.job_start_time else 0.0
+    return time.time() - elapsed + instructions.max_duration
+
+
+def case_deadline(job_deadline: float | None, timeout: float | None = CASE_TIMEOUT) -> float | None:
+    """Deadline of a case starting now: the job's, tightened by ``timeout``."""
+    if timeout is None:
+        return job_deadline
+    own = time.time() + timeout
+    return own if job_deadline is None else min(job_deadline, own)
+
+
+def remaining(deadline: float | None) -> float | None:
+    """Seconds left before ``deadline`` (never negative), None without deadline."""
+    return None if deadline is None else max(0.0, deadline - time.time())
+
+
+def check_deadline(deadline: float | None, what: str) -> None:
+    if deadline is not None and time.time() >= deadline:
+        raise DeadlineExceeded(f"{what}: deadline exceeded")
+
+
+def sleep_within(deadline: float | None, seconds: float, what: str) -> None:
+    """Sleep ``seconds``, or until the deadline and raise if it comes first."""
+    left = remaining(deadline)
+    if left is not None and left < seconds:
+        time.sleep(left)
+        raise DeadlineExceeded(f"{what}: deadline exceeded after {left:.2f}s of {seconds:.2f}s")
+    time.sleep(seconds)
+
+
+def call_with_deadline(
+    deadline: float | None,
+    fn: Callable[..., T],
+    *args: Any,
+    what: str,
+    on_late: Callable[[T], None] | None = None,
+    **kwargs: Any,
+) -> T:
+    """Call ``fn`` but give up when ``deadline`` passes.
+
+    The SDK's Case calls take no timeout, so with a deadline the call runs on
+    a daemon thread and is abandoned (left to finish in the background) when
+    the deadline passes first. If an abandoned call still succeeds, its result
+    goes to ``on_late`` - e.g. ``close_late_case`` for a ``Case.start_sync``
+    whose Case nobody would otherwise close.
+    """
+    check_deadline(deadline, what)
+    if deadline is None:
+        return fn(*args, **kwargs)
+    outcome: dict[str, Any] = {}
+    finished = threading.Event()
+    handover = threading.Lock()  # the caller gives up, or the call finishes, not both
+
+    def target() -> None:
+        try:
+            value = fn(*args, **kwargs)
+        except BaseException as exc:
+            outcome["error"] = exc
+            finished.set()
+            return
+        with handover:
+            outcome["value"] = value
+            late = outcome.get("abandoned", False)
+            finished.set()
+        if late and on_late is not None:
+            try:
+                on_late(value)
+            except Exception as e:
+                log.error(f"[Deadlines] {what}: handling the late result failed: {e}")
+
+    threading.Thread(target=target, name=f"deadline-{what}", daemon=True).start()
+    if not finished.wait(remaining(deadline)):
+        with handover:
+            if not finished.is_set():
+                outcome["abandoned"] = True
+                raise DeadlineExceeded(f"{what}: no answer before the deadline")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def close_expired(case: Case, error: DeadlineExceeded) -> None:
+    """Close a case whose deadline passed, reporting the cost it reached."""
+    try:
+        call_with_deadline(
+            time.time() + CLOSE_GRACE,
+            case.close_sync,
+            case_result={"message": str(error), "status": "timeout"},
+            final_cost=case.calculated_cost,
+            what=f"close case {case.id}",
+        )
+    except Exception as e:
+        log.error(f"[Deadlines] Could not close timed out case {case.id}: {e}")
+
+
+def close_late_case(what: str) -> Callable[[Case], None]:
+    """``on_late`` callback closing, as timed out, a Case whose start answered after the deadline."""
+
+    def close(case: Case) -> None:
+        log.warning(f"[Deadlines] {what}: Case {case.id} was created after the deadline, closing it")
+        close_expired(case, DeadlineExceeded(f"{what}: answered after the deadline"))
+
+    return close
@@ -0,0 +1,173 @@
+# supervaize_hello_world/dynamic_choices.py
+"""Dynamic choices for agent start forms, served from precomputed option indexes.
+
+A start method field declared with ``dynamic_choices="<key>"`` gets its
+options at runtime instead of shipping them in the agent definition:
+
+- ``POST /api/supervaizer/agents/{slug}/start/dynamic_choices`` (SDK route,
+  via ``Agent.dynamic_choices_callback``) returns the first
+  ``DYNAMIC_CHOICES_LIMIT`` options of every key the agent's fields use;
+- ``GET /api/supervaizer/agents/{slug}/start/dynamic_choices/{key}?q=...&limit=...``
+  filters them server-side as the user types, in the workspace named by the
+  ``X-Supervaize-Workspace-Id`` header (as the DataResource routes).
+
+Each source is turned once into a ``ChoiceIndex``: options sorted by label
+plus a sorted list of search terms (the value and every word-start suffix of
+the label), so a prefix lookup is two bisections rather than a scan of every
+option. Static sources are indexed at registration. Sources registered with a
+``version`` callable (e.g. a workspace's contacts) are rebuilt when their
+version changes; per-workspace indexes are kept in a bounded LRU.
+"""
+import heapq
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from loguru import logger as log
+from supervaizer import Agent, Server
+from supervaizer.access import require_api_key
+
+DYNAMIC_CHOICES_LIMIT = int(os.getenv("DYNAMIC_CHOICES_LIMIT", "50"))
+MAX_SEARCH_LIMIT = 500
+
+
+class ChoiceIndex:
+    """Immutable ``(value, label)`` options with prefix search on values and label words."""
+
+    def __init__(self, options: Iterable[tuple[str, str]]) -> None:
+        unique = {str(value): str(label) for value, label in options}
+        self.options = sorted(unique.items(), key=lambda option: (option[1].casefold(), option[0]))
+        terms: list[tuple[str, int]] = []
+        for position, (value, label) in enumerate(self.options):
+            folded = label.casefold()
+            keys = {value.casefold(), folded}
+            keys.update(folded[start:] for start in range(1, len(folded)) if folded[start - 1] == " ")
+            terms.extend((key, position) for key in keys)
+        terms.sort()
+        self._terms = [term for term, _ in terms]
+        self._positions = [position for _, position in terms]
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    def search(self, prefix: str = "", limit: int = DYNAMIC_CHOICES_LIMIT) -> list[list[str]]:
+        """Options whose value or a label word starts with ``prefix``, in label order."""
+        query = " ".join(prefix.casefold().split())
+        if not query:
+            return [list(option) for option in self.options[:limit]]
+        start = bisect_left(self._terms, query)
+        end = bisect_left(self._terms, query + "\U0010ffff", lo=start)
+        positions = heapq.nsmallest(limit, set(self._positions[start:end]))
+        return [list(self.options[position]) for position in positions]
+
+
+@dataclass
+class _Source:
+    build: Callable[[str | None], Iterable[tuple[str, str]]]
+    version: Callable[[str | None], Any] | None
+    per_workspace: bool
+
+
+class ChoiceCatalog:
+    """Named option sources and their cached indexes.
+
+    Args:
+        max_indexes: Per-workspace indexes kept before the least recently used are dropped.
+    """
+
+    def __init__(self, max_indexes: int = 256) -> None:
+        self.max_indexes = max_indexes
+        self._sources: dict[str, _Source] = {}
+        self._indexes: OrderedDict[tuple[str, str | None], tuple[Any, ChoiceIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        key: str,
+        build: Callable[[str | None], Iterable[tuple[str, str]]],
+        version: Callable[[str | None], Any] | None = None,
+        per_workspace: bool = False,
+    ) -> None:
+        """Declare a source: ``build(workspace_id)`` returns ``(value, label)`` pairs.
+
+        Without ``version`` the options are static and indexed right away.
+        """
+        with self._lock:
+            self._sources[key] = _Source(build, version, per_workspace)
+            for cached in [k for k in self._indexes if k[0] == key]:
+                del self._indexes[cached]
+        if version is None and not per_workspace:
+            self.index(key)
+
+    def keys(self) -> list[str]:
+        return list(self._sources)
+
+    def index(self, key: str, workspace_id: str | None = None) -> ChoiceIndex:
+        """The current index of a source, rebuilt when its version changed."""
+        source = self._sources[key]
+        cache_key = (key, workspace_id if source.per_workspace else None)
+        current = source.version(workspace_id) if source.version else None
+        with self._lock:
+            cached = self._indexes.get(cache_key)
+            if cached is not None and cached[0] == current:
+                self._indexes.move_to_end(cache_key)
+                return cached[1]
+        index = ChoiceIndex(source.build(workspace_id))
+        log.debug(f"[DynamicChoices] Indexed {len(index)} option(s) for {cache_key}")
+        with self._lock:
+            self._indexes[cache_key] = (current, index)
+            self._indexes.move_to_end(cache_key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def search(
+        self, key: str, prefix: str = "", limit: int = DYNAMIC_CHOICES_LIMIT, workspace_id: str | None = None
+    ) -> list[list[str]]:
+        return self.index(key, workspace_id).search(prefix, limit)
+
+    def callback(self, keys: Iterable[str]) -> Callable[[str, dict[str, Any]], dict[str, list[list[str]]]]:
+        """An ``Agent.dynamic_choices_callback`` returning the first options of ``keys``."""
+        keys = list(keys)
+
+        def dynamic_choices(method_name: str, context: dict[str, Any]) -> dict[str, list[list[str]]]:
+            workspace_id = context.get("workspace_id")
+            return {key: self.search(key, workspace_id=workspace_id) for key in keys}
+
+        return dynamic_choices
+
+
+choice_catalog = ChoiceCatalog()
+
+
+def dynamic_keys(agent: Agent) -> list[str]:
+    """Dynamic choice keys used by an agent's start method fields."""
+    fields = agent.methods.job_start.fields if agent.methods else None
+    return [field.dynamic_choices for field in fields or [] if field.dynamic_choices]
+
+
+def install_dynamic_choices_routes(server: Server, catalog: ChoiceCatalog = choice_catalog) -> None:
+    """Add the prefix search route for every agent with dynamic choice fields."""
+    agents = {agent.slug: agent for agent in server.agents}
+    router = APIRouter(prefix="/api/supervaizer/agents", tags=["Supervision"], dependencies=[Depends(require_api_key)])
+
+    # A plain def: (re)building a large index runs in the threadpool, not on the event loop.
+    @router.get("/{agent_slug}/start/dynamic_choices/{key}", summary="Search dynamic choices of a start field")
+    def search_dynamic_choices(
+        agent_slug: str,
+        key: str,
+        q: str = Query("", description="Prefix of the value or of any word of the label"),
+        limit: int = Query(DYNAMIC_CHOICES_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+        workspace_id: str | None = Header(default=None, alias="X-Supervaize-Workspace-Id"),
+    ) -> dict[str, Any]:
+        agent = agents.get(agent_slug)
+        if agent is None or key not in dynamic_keys(agent) or key not in catalog.keys():
+            raise HTTPException(status_code=404, detail=f"No dynamic choices {key!r} for agent {agent_slug!r}")
+        return {"key": key, "choices": catalog.search(key, q, limit, workspace_id)}
+
+    server.app.include_router(router)
@@ -0,0 +1,57 @@
+# supervaize_hello_world/fast_json.py
+"""Direct JSON serialization for responses whose content is already plain JSON.
+
+FastAPI serializes a route's return value in two passes: it validates it
+against the response model inferred from the return annotation, then walks it
+with ``jsonable_encoder`` before ``json.dumps``. For a 1000-row contacts page
+the walk costs far more than the encoding itself.
+
+Routes whose content is known to be plain JSON (dicts and lists of str,
+numbers, bools and None; datetimes and UUIDs are fine too) can return a
+``FastJSONResponse`` instead: FastAPI sends a returned Response as is, and
+``dumps`` encodes it in one pass with orjson when it is installed
+(``pip install orjson``), with the stdlib ``json`` otherwise.
+
+The body is the same as ``JSONResponse``'s (compact, UTF-8, no NaN). Which
+DataResources take this path is decided when their routes are installed
+(see ``install_async_data_routes(trusted=...)``).
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import Response
+
+try:
+    import orjson  # optional: several times faster than the stdlib encoder
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # The types orjson encodes natively besides plain JSON, encoded the same way;
+    # anything else is an error with either encoder.
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain JSON content to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode(
+        "utf-8"
+    )
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by ``dumps``, without ``jsonable_encoder``."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
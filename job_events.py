@@ -0,0 +1,338 @@
+# supervaize_hello_world/job_events.py
+"""Job progress pushed to clients as Server-Sent Events.
+
+``GET /api/jobs/{job_id}/events`` streams a job's case events while the
+agents emit them, so dashboards no longer poll ``job_status``:
+
+    job_start, case_start, case_update, case_awaiting, case_close,
+    case_timeout, job_end
+
+Each event is one SSE message (``id``, ``event`` and a JSON ``data`` line).
+Event ids increase per job; a reconnecting client sends ``Last-Event-ID``
+(or ``?last_event_id=``) and gets the events it missed, as long as they are
+still in the job's history (the last ``JOB_EVENTS_HISTORY`` events).
+
+Every subscriber has its own bounded buffer (``JOB_EVENTS_BUFFER``). A slow
+client never slows the agents down: when its buffer is full the oldest
+events are dropped, and the next message it gets is a ``dropped`` event with
+the number of lost events, so it can resync from ``job_status``.
+
+The stream ends once the job has ended and none of its cases is still open
+(human-loop cases stay open until their approval is answered), or right away
+for a job that finished without events here (e.g. forgotten from the
+history). A job unknown to both the events and the server's jobs is a 404.
+
+Events are published in-process: in distributed mode (see work_queue.py)
+case events happen in the worker processes and only job events reach the
+stream, which then opens with a ``notice`` event saying so.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger as log
+from supervaizer import Job, Server
+from supervaizer.access import require_api_key
+from supervaizer.job import Jobs
+from supervaizer.lifecycle import Lifecycle
+
+JOB_EVENTS_BUFFER = int(os.getenv("JOB_EVENTS_BUFFER", "256"))
+JOB_EVENTS_HISTORY = int(os.getenv("JOB_EVENTS_HISTORY", "256"))
+# Jobs whose events are kept, least recently active forgotten first.
+JOB_EVENTS_KEEP_JOBS = 1024
+HEARTBEAT_SECONDS = 15.0
+
+CLOSING_EVENTS = {"case_close", "case_timeout"}
+
+
+class Subscription:
+    """One client's bounded event buffer; oldest events are dropped when it is full.
+
+    ``push`` is called from any thread (case workers); ``next_batch`` awaits
+    on the subscriber's event loop.
+    """
+
+    def __init__(self, job_id: str, maxlen: int, loop: asyncio.AbstractEventLoop) -> None:
+        self.job_id = job_id
+        self.dropped = 0
+        self._events: deque[dict[str, Any]] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._unreported = 0
+
+    def push(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+                self._unreported += 1
+            self._events.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # the client's loop is gone; it is being unsubscribed
+            pass
+
+    def empty(self) -> bool:
+        with self._lock:
+            return not self._events
+
+    async def next_batch(self, timeout: float) -> list[dict[str, Any]]:
+        """Buffered events (oldest first), waiting up to ``timeout`` for one; ``[]`` on timeout.
+
+        A ``dropped`` event leads the batch when events were lost since the last one.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        with self._lock:
+            self._ready.clear()
+            batch = list(self._events)
+            self._events.clear()
+            lost, self._unreported = self._unreported, 0
+        if lost:
+            batch.insert(0, {"type": "dropped", "job_id": self.job_id, "count": lost})
+        return batch
+
+
+class _JobLog:
+    def __init__(self) -> None:
+        self.next_id = 1
+        self.history: deque[dict[str, Any]] = deque(maxlen=JOB_EVENTS_HISTORY)
+        self.subscribers: list[Subscription] = []
+        self.open_cases: set[str] = set()
+        self.started = False
+        self.ended = False
+
+    @property
+    def done(self) -> bool:
+        return self.ended and not self.open_cases
+
+
+class JobEventBus:
+    """Per-job event history and live subscribers (see module docstring)."""
+
+    def __init__(self, buffer: int = JOB_EVENTS_BUFFER, keep_jobs: int = JOB_EVENTS_KEEP_JOBS) -> None:
+        self.buffer = buffer
+        self.keep_jobs = keep_jobs
+        self._jobs: OrderedDict[str, _JobLog] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log(self, job_id: str) -> _JobLog:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _JobLog()
+            while len(self._jobs) > self.keep_jobs:
+                forgotten, old = next(iter(self._jobs.items()))
+                if old.subscribers:  # never forget a job someone is watching
+                    break
+                del self._jobs[forgotten]
+        self._jobs.move_to_end(job_id)
+        return job
+
+    def publish(self, job_id: str, type: str, case_id: str | None = None, **data: Any) -> dict[str, Any]:
+        """Record an event of ``job_id`` and push it to the job's subscribers."""
+        with self._lock:
+            job = self._log(job_id)
+            event = {"id": job.next_id, "type": type, "job_id": job_id, "at": time.time(), **data}
+            if case_id is not None:
+                event["case_id"] = case_id
+                if type == "case_start":
+                    job.open_cases.add(case_id)
+                elif type in CLOSING_EVENTS:
+                    job.open_cases.discard(case_id)
+            if type == "job_start":
+                job.started = True
+            elif type == "job_end":
+                job.ended = True
+            job.next_id += 1
+            job.history.append(event)
+            subscribers = list(job.subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    @contextmanager
+    def track(self, job_id: str, **data: Any) -> Iterator["JobTracker"]:
+        """Publish ``job_start`` now and ``job_end`` on exit (``failed`` if the job raised)."""
+        self.publish(job_id, "job_start", **data)
+        tracker = JobTracker(self, job_id)
+        try:
+            yield tracker
+        except BaseException as e:
+            if not tracker.ended:
+                self.publish(job_id, "job_end", status="failed", error=str(e))
+            raise
+        if not tracker.ended:
+            self.publish(job_id, "job_end", status="completed")
+
+    def subscribe(self, job_id: str, last_event_id: int = 0, loop: asyncio.AbstractEventLoop | None = None) -> Subscription:
+        """Subscribe to ``job_id``, starting with its recorded events after ``last_event_id``."""
+        subscription = Subscription(job_id, self.buffer, loop or asyncio.get_running_loop())
+        with self._lock:
+            job = self._log(job_id)
+            for event in job.history:
+                if event["id"] > last_event_id:
+                    subscription.push(event)
+            job.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            job = self._jobs.get(subscription.job_id)
+            if job is not None and subscription in job.subscribers:
+                job.subscribers.remove(subscription)
+
+    def done(self, job_id: str) -> bool:
+        """The job has ended and has no open case left."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.done
+
+    def knows(self, job_id: str) -> bool:
+        """Events of ``job_id`` were published or are awaited by a subscriber."""
+        with self._lock:
+            return job_id in self._jobs
+
+    def tracked(self, job_id: str) -> bool:
+        """``job_start`` of ``job_id`` was published (so ``job_end`` will be)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.started
+
+    def progress(self, job_id: str) -> dict[str, Any] | None:
+        """Last event and open cases of a job, None if it has no events."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.history:
+                return None
+            return {
+                "events": job.next_id - 1,
+                "last_event": job.history[-1]["type"],
+                "open_cases": sorted(job.open_cases),
+                "subscribers": len(job.subscribers),
+            }
+
+
+class JobTracker:
+    """Handle of ``JobEventBus.track``: publishes the job's events."""
+
+    def __init__(self, bus: JobEventBus, job_id: str) -> None:
+        self.bus = bus
+        self.job_id = job_id
+        self.ended = False
+
+    def end(self, status: str, **data: Any) -> None:
+        self.bus.publish(self.job_id, "job_end", status=status, **data)
+        self.ended = True
+
+
+job_events = JobEventBus()
+
+
+def emit(job_id: str, type: str, case_id: str | None = None, **data: Any) -> None:
+    """Publish a case event from agent code; never fails the case."""
+    try:
+        job_events.publish(job_id, type, case_id=case_id, **data)
+    except Exception as e:
+        log.error(f"[JobEvents] Could not publish {type} of job {job_id}: {e}")
+
+
+def format_event(event: dict[str, Any]) -> str:
+    """One SSE message."""
+    lines = [f"event: {event['type']}", f"data: {json.dumps(event, default=str)}"]
+    if "id" in event:
+        lines.insert(0, f"id: {event['id']}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _server_job(job_id: str) -> Job | None:
+    # Storage is only read for jobs not in memory: loading one registers it
+    # again, replacing the live job with its last persisted state.
+    return Jobs().get_job(job_id) or Jobs().get_job(job_id, include_persisted=True)
+
+
+def job_finished(job_id: str) -> bool:
+    """The server's job ``job_id`` reached a terminal status."""
+    job = _server_job(job_id)
+    return job is not None and job.status in Lifecycle.get_terminal_states()
+
+
+def distributed_notice(job_id: str) -> dict[str, Any] | None:
+    """The ``notice`` opening a stream when case events stay in the worker processes."""
+    if os.getenv("SUPERVAIZER_EXECUTION_MODE", "local") != "distributed":
+        return None
+    return {
+        "type": "notice",
+        "job_id": job_id,
+        "message": "Distributed execution: case events of worker processes are not streamed, only job events",
+    }
+
+
+async def stream_events(
+    bus: JobEventBus,
+    request: Request,
+    job_id: str,
+    last_event_id: int = 0,
+    heartbeat: float = HEARTBEAT_SECONDS,
+    finished: Callable[[str], bool] = job_finished,
+) -> AsyncIterator[str]:
+    """SSE messages of ``job_id`` until it is done (see module docstring) or the client leaves.
+
+    ``finished`` ends streams of jobs that will publish nothing more: jobs
+    the bus never saw start, once the server reports them finished.
+    """
+    yield "retry: 3000\n\n"
+    notice = distributed_notice(job_id)
+    if notice is not None:
+        yield format_event(notice)
+    if not bus.knows(job_id) and finished(job_id):
+        return  # nothing recorded and nothing to come
+    subscription = bus.subscribe(job_id, last_event_id)
+    try:
+        while True:
+            if subscription.empty() and (bus.done(job_id) or (not bus.tracked(job_id) and finished(job_id))):
+                break
+            batch = await subscription.next_batch(heartbeat)
+            for event in batch:
+                yield format_event(event)
+            if not batch:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+    finally:
+        bus.unsubscribe(subscription)
+
+
+job_events_routes = APIRouter(prefix="/api/jobs", tags=["Job events"], dependencies=[Depends(require_api_key)])
+
+
+@job_events_routes.get("/{job_id}/events", summary="Stream a job's case events (Server-Sent Events)")
+async def get_job_events(
+    request: Request,
+    job_id: str,
+    last_event_id: int = 0,
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    if not job_events.knows(job_id) and _server_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    return StreamingResponse(
+        stream_events(job_events, request, job_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def install_job_events_routes(server: Server) -> None:
+    """Expose the job event streams on the server app."""
+    server.app.include_router(job_events_routes)
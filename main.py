@@ -1,4 +1,6 @@
-from supervaizer_control import app, sv_server
+import json
+
+from supervaizer_control import app, static_cache, sv_server
 from supervaizer.__version__ import API_VERSION, VERSION
 
 # Expose the FastAPI app instance
@@ -20,3 +22,14 @@ def api_context() -> dict:
         "full_url": f"{sv_server.scheme}://{sv_server.host}:{sv_server.port}",
         "show_admin": bool(sv_server.api_key),
     }
+
+
+# index.html fetches the context on every load: serve it precomputed, rebuilt
+# only when the server URLs change (see static_cache.py).
+static_cache.add(
+    "/api/context",
+    lambda: json.dumps(api_context()),
+    version=lambda: (sv_server.public_url, sv_server.scheme, sv_server.host, sv_server.port, bool(sv_server.api_key)),
+    media_type="application/json",
+    max_age=60,
+)
@@ -0,0 +1,18 @@
+# supervaize_hello_world/platform_account.py
+"""The Supervaize account the agents' Cases report to.
+
+Kept apart from supervaizer_control.py so that worker processes (see
+work_queue.py) importing an agent module get the account without building
+the API server, its routes and its contacts shards.
+"""
+import os
+
+from supervaizer import Account
+
+# Always provide a default value to prevent error.
+# Get from app.supervaize.com
+supervaize_account: Account = Account(
+    workspace_id=os.getenv("SUPERVAIZE_WORKSPACE_ID") or "dummy_workspace_id",
+    api_key=os.getenv("SUPERVAIZE_API_KEY") or "dummy_api_key",
+    api_url=os.getenv("SUPERVAIZE_API_URL") or "https://app.supervaize.com",
+)
@@ -0,0 +1,239 @@
+# supervaize_hello_world/platform_http.py
+"""Pooled HTTP clients for the calls made to the Supervaize platform.
+
+Every Case start/update/close and server event goes through
+``supervaizer.account_service``, which posts with two module-level httpx
+clients (one sync, one async) built with default pool limits.
+``install_platform_http`` closes them and installs clients sized for the
+case scheduler:
+
+- up to ``PLATFORM_HTTP_MAX_CONNECTIONS`` connections (default: one per
+  scheduler worker plus ``PLATFORM_HTTP_HEADROOM`` for job loops, server
+  events and calls abandoned by a deadline), all kept alive for
+  ``PLATFORM_HTTP_KEEPALIVE`` seconds, so that concurrent cases reuse warm
+  TCP/TLS connections instead of opening new ones;
+- HTTP/2 when ``PLATFORM_HTTP2`` is ``auto`` (the default) and the ``h2``
+  package is installed (``pip install httpx[http2]``), or when it is ``1``;
+  one connection then multiplexes the concurrent calls;
+- ``SUPERVAIZE_HTTP_MAX_RETRIES`` connection retries, as before.
+
+Each client counts its requests and the connections and TLS handshakes it
+had to open (from httpcore's ``trace`` extension), so ``GET /api/platform-http``
+reports the reuse rate next to the pool's current use.
+
+Only the calls that go through ``account_service`` are pooled; the few
+one-off calls ``Account`` makes with ``httpx.get``/``httpx.post`` are not.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+from fastapi import APIRouter, Depends
+from loguru import logger as log
+from supervaizer import Server
+from supervaizer import account_service
+from supervaizer.access import require_api_key
+
+PLATFORM_HTTP_HEADROOM = int(os.getenv("PLATFORM_HTTP_HEADROOM", "4"))
+PLATFORM_HTTP_KEEPALIVE = float(os.getenv("PLATFORM_HTTP_KEEPALIVE", "30"))
+PLATFORM_HTTP2 = os.getenv("PLATFORM_HTTP2", "auto")
+
+_NEW_CONNECTION = "connection.connect_tcp.complete"
+_TLS_HANDSHAKE = "connection.start_tls.complete"
+
+
+def http2_enabled(setting: str = PLATFORM_HTTP2) -> bool:
+    if setting.lower() == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return setting.lower() in ("1", "true", "yes")
+
+
+class PoolStats:
+    """Request and connection counters of one client (updated from its trace hooks)."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def finished(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def traced(self, name: str) -> None:
+        if name == _NEW_CONNECTION:
+            with self._lock:
+                self.connections_opened += 1
+        elif name == _TLS_HANDSHAKE:
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "active": self.active,
+                "peak_active": self.peak_active,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+            }
+
+
+def _pool_usage(transport: httpx.BaseTransport | httpx.AsyncBaseTransport) -> dict[str, Any]:
+    """Open and idle connections of an httpx transport's httpcore pool."""
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {
+        "open": len(connections),
+        "idle": sum(1 for connection in connections if connection.is_idle()),
+        "http2": sum(1 for connection in connections if "HTTP/2" in connection.info()),
+    }
+
+
+def _traced(request: httpx.Request, stats: PoolStats) -> Callable[..., Any]:
+    previous = request.extensions.get("trace")
+
+    def trace(name: str, info: dict[str, Any]) -> None:
+        stats.traced(name)
+        if previous is not None:
+            previous(name, info)
+
+    return trace
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """``HTTPTransport`` counting its requests and new connections."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.stats = PoolStats()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _traced(request, self.stats)
+        self.stats.started()
+        try:
+            return super().handle_request(request)
+        finally:
+            self.stats.finished()
+
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """``AsyncHTTPTransport`` counting its requests and new connections."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.stats = PoolStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        previous = request.extensions.get("trace")
+        stats = self.stats
+
+        async def trace(name: str, info: dict[str, Any]) -> None:
+            stats.traced(name)
+            if previous is not None:
+                await previous(name, info)
+
+        request.extensions["trace"] = trace
+        stats.started()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            stats.finished()
+
+
+class PlatformHTTP:
+    """The sync and async pooled clients, with their settings and stats."""
+
+    def __init__(
+        self,
+        max_connections: int,
+        keepalive: float = PLATFORM_HTTP_KEEPALIVE,
+        http2: bool = False,
+        retries: int = 2,
+    ) -> None:
+        self.max_connections = max(1, max_connections)
+        self.keepalive = keepalive
+        self.http2 = http2
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=keepalive,
+        )
+        self.transport = PooledTransport(limits=limits, http2=http2, retries=retries)
+        self.async_transport = AsyncPooledTransport(limits=limits, http2=http2, retries=retries)
+        self.client = httpx.Client(transport=self.transport)
+        self.async_client = httpx.AsyncClient(transport=self.async_transport)
+
+    @classmethod
+    def from_env(cls, workers: int) -> "PlatformHTTP":
+        """Configured by PLATFORM_HTTP_MAX_CONNECTIONS (default ``workers`` + PLATFORM_HTTP_HEADROOM),
+        PLATFORM_HTTP_KEEPALIVE, PLATFORM_HTTP2 and SUPERVAIZE_HTTP_MAX_RETRIES."""
+        return cls(
+            max_connections=int(os.getenv("PLATFORM_HTTP_MAX_CONNECTIONS") or workers + PLATFORM_HTTP_HEADROOM),
+            http2=http2_enabled(),
+            retries=int(os.getenv("SUPERVAIZE_HTTP_MAX_RETRIES", "2")),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "keepalive": self.keepalive,
+            "http2": self.http2,
+            "sync": {**self.transport.stats.snapshot(), "pool": _pool_usage(self.transport)},
+            "async": {**self.async_transport.stats.snapshot(), "pool": _pool_usage(self.async_transport)},
+        }
+
+
+_closing: set[asyncio.Task[None]] = set()
+
+
+def _close_async_client(client: httpx.AsyncClient) -> None:
+    """Close ``client`` from sync code: on the running loop when there is one, else in a new loop."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(client.aclose())
+        return
+    task = loop.create_task(client.aclose())
+    _closing.add(task)  # the loop only keeps a weak reference to its tasks
+    task.add_done_callback(_closing.discard)
+
+
+def install_platform_http(server: Server, workers: int) -> PlatformHTTP:
+    """Route account_service's platform calls through pooled clients sized for ``workers``
+    and add ``GET /api/platform-http`` (pool stats)."""
+    platform_http = PlatformHTTP.from_env(workers)
+    previous, previous_async = account_service._sync_httpx_client, account_service._httpx_client
+    account_service._sync_httpx_client = platform_http.client
+    account_service._httpx_client = platform_http.async_client
+    # Installed at startup: neither previous client has open connections to wait for.
+    previous.close()
+    _close_async_client(previous_async)
+    log.info(
+        f"[PlatformHTTP] Pool of {platform_http.max_connections} connection(s), "
+        f"keep-alive {platform_http.keepalive}s, HTTP/2 {'on' if platform_http.http2 else 'off'}"
+    )
+    router = APIRouter(prefix="/api", tags=["Platform HTTP"], dependencies=[Depends(require_api_key)])
+
+    @router.get("/platform-http", summary="Connection pool of the Supervaize platform calls")
+    async def get_platform_http_stats() -> dict[str, Any]:
+        return platform_http.stats()
+
+    server.app.include_router(router)
+    server.app.state.platform_http = platform_http
+    return platform_http
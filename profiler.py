@@ -0,0 +1,243 @@
+# supervaize_hello_world/profiler.py
+"""On-demand sampling profiler for a running server.
+
+A background thread reads every thread's Python stack (``sys._current_frames``)
+each ``interval`` seconds and counts identical stacks. Nothing is traced
+between samples, so the overhead stays low and predictable (one stack walk per
+thread per sample) and it is safe to run under production load.
+
+Routes (``/api/profiler``, API key with write scope; only installed when the
+server has an API key, like the admin interface):
+
+- ``POST /start?seconds=30`` samples the whole process for up to ``seconds``;
+  ``POST /start?job_id=...`` samples only the threads working for that job
+  (its job_start loop and running cases, see ``CaseScheduler.job_threads``)
+  until the job ends;
+- ``POST /stop`` stops sampling and returns the profile;
+- ``GET /profile`` returns the current or last profile, ``GET /`` its status.
+
+Profiles are collapsed stacks (``root;caller;callee count`` per line), the
+input of flamegraph.pl, speedscope and inferno. Samples are wall-clock: a
+whole-process profile skips threads idling in ``threading``/``selectors``/
+``queue`` waits (like py-spy without ``--idle``); a job profile keeps them,
+as waiting is part of the job's time.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Collection
+from types import CodeType, FrameType
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from loguru import logger as log
+from supervaizer import Server
+from supervaizer.access import require_scope
+
+from scheduler import CaseScheduler
+
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.01"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+MAX_STACK_DEPTH = 128
+
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """Counts the stacks of the sampled threads (see module docstring).
+
+    Args:
+        interval: Seconds between samples.
+        threads: Returns the idents of the threads to sample; None samples them all.
+        include_idle: Keep samples of threads waiting in ``threading``/``selectors``/``queue``.
+    """
+
+    def __init__(
+        self,
+        interval: float = PROFILER_INTERVAL,
+        threads: Callable[[], Collection[int]] | None = None,
+        include_idle: bool = False,
+    ) -> None:
+        self.interval = max(0.001, interval)
+        self.threads = threads
+        self.include_idle = include_idle
+        self.samples = 0
+        self.started_at: float | None = None
+        self.stopped_at: float | None = None
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float | None = None, until: Callable[[], bool] | None = None) -> None:
+        """Sample in the background for ``seconds`` at most, or until ``until()`` is true."""
+        self.started_at = time.time()
+        deadline = time.monotonic() + seconds if seconds else None
+        self._thread = threading.Thread(target=self._run, args=(deadline, until), name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self, deadline: float | None, until: Callable[[], bool] | None) -> None:
+        own = threading.get_ident()
+        try:
+            while not self._stop.wait(self.interval):
+                if (deadline is not None and time.monotonic() >= deadline) or (until is not None and until()):
+                    break
+                self.sample(skip=own)
+        finally:
+            self.stopped_at = time.time()
+
+    def sample(self, skip: int | None = None) -> None:
+        """Take one sample of every wanted thread."""
+        wanted = set(self.threads()) if self.threads is not None else None
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == skip or (wanted is not None and ident not in wanted):
+                continue
+            if not self.include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                continue
+            stacks.append(self._stack(frame))
+        with self._lock:
+            self._stacks.update(stacks)
+            self.samples += 1
+
+    def _stack(self, frame: FrameType | None) -> tuple[str, ...]:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                # ';' separates frames in the collapsed format.
+                label = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                label = self._labels[code] = label.replace(";", ":")
+            labels.append(label)
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+    def collapsed(self) -> str:
+        """The profile in collapsed-stack format, most frequent stacks first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks)
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            distinct = len(self._stacks)
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "stacks": distinct,
+            "interval": self.interval,
+            "seconds": round(end - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+class ProfilerControl:
+    """One profile at a time for a server; keeps the last one for download."""
+
+    def __init__(self, scheduler: CaseScheduler, max_seconds: float = PROFILER_MAX_SECONDS) -> None:
+        self.scheduler = scheduler
+        self.max_seconds = max_seconds
+        self.profiler: SamplingProfiler | None = None
+        self.job_id: str | None = None
+        self._lock = threading.Lock()
+
+    def start(
+        self, seconds: float | None = None, interval: float = PROFILER_INTERVAL, job_id: str | None = None
+    ) -> dict[str, Any]:
+        """Profile the process for ``seconds``, or job ``job_id`` until it ends (within ``max_seconds``)."""
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        with self._lock:
+            if self.profiler is not None and self.profiler.running:
+                raise ProfilerBusyError("A profile is already running; stop it first")
+            until = None
+            if job_id is None:
+                profiler = SamplingProfiler(interval)
+            else:
+                profiler = SamplingProfiler(interval, threads=lambda: self.scheduler.job_threads(job_id), include_idle=True)
+                until = self._job_ended(job_id)
+            self.profiler, self.job_id = profiler, job_id
+            profiler.start(seconds, until)
+        log.warning(f"[Profiler] Sampling {'job ' + job_id if job_id else 'all threads'} for up to {seconds}s")
+        return self.status()
+
+    def _job_ended(self, job_id: str) -> Callable[[], bool]:
+        seen = False
+
+        def ended() -> bool:
+            nonlocal seen
+            registered = self.scheduler.job_stats(job_id) is not None
+            seen = seen or registered
+            return seen and not registered
+
+        return ended
+
+    def stop(self) -> str:
+        if self.profiler is None:
+            raise LookupError("No profile was taken yet")
+        self.profiler.stop()
+        log.info(f"[Profiler] Stopped: {self.status()}")
+        return self.profiler.collapsed()
+
+    def status(self) -> dict[str, Any]:
+        if self.profiler is None:
+            return {"running": False}
+        return {**self.profiler.status(), "job_id": self.job_id}
+
+
+def create_profiler_routes(control: ProfilerControl) -> APIRouter:
+    router = APIRouter(prefix="/api/profiler", tags=["Profiler"], dependencies=[Depends(require_scope("write"))])
+
+    @router.get("/", summary="Profiler status")
+    async def profiler_status() -> dict[str, Any]:
+        return control.status()
+
+    @router.post("/start", summary="Start sampling the process or one job")
+    def start_profiler(seconds: float | None = None, interval: float = PROFILER_INTERVAL, job_id: str | None = None) -> dict[str, Any]:
+        try:
+            return control.start(seconds, interval, job_id)
+        except ProfilerBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e)) from e
+
+    @router.post("/stop", summary="Stop sampling and get the collapsed stacks", response_class=PlainTextResponse)
+    def stop_profiler() -> str:
+        try:
+            return control.stop()
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e)) from e
+
+    @router.get("/profile", summary="Collapsed stacks of the current or last profile", response_class=PlainTextResponse)
+    def get_profile() -> str:
+        if control.profiler is None:
+            raise HTTPException(status_code=404, detail="No profile was taken yet")
+        return control.profiler.collapsed()
+
+    return router
+
+
+def install_profiler_routes(server: Server, scheduler: CaseScheduler) -> ProfilerControl | None:
+    """Add the profiler routes when the server has an API key (as for the admin interface)."""
+    if not server.api_key:
+        log.info("[Profiler] No API key: profiler routes not installed")
+        return None
+    control = ProfilerControl(scheduler)
+    server.app.include_router(create_profiler_routes(control))
+    server.app.state.profiler = control
+    return control
@@ -0,0 +1,381 @@
+# supervaize_hello_world/scheduler.py
+"""Priority case scheduler shared by the agents' ``job_start`` methods.
+
+Jobs no longer run their cases inline: each job submits them to a shared pool
+of case workers, and the scheduler decides whose case runs next.
+
+- Every job gets a *priority class* from its JobContext and size: per-mission
+  and per-user (``started_by``) overrides first, then small jobs are
+  ``interactive`` and very large ones ``batch``.
+- Queued cases are grouped in flows, one per (mission, class). Flows are
+  served by stride scheduling: each dispatch advances the flow's pass by
+  ``1 / weight`` and the flow with the lowest pass goes next, so a mission's
+  share of the workers is proportional to its class weight, whatever its
+  backlog. A 10k-case batch keeps progressing, but an interactive case is
+  dispatched as soon as a worker frees up.
+- A job keeps at most ``window`` cases in flight, so a big job cannot flood
+  the queue and its instruction checks (max cases/cost) stay close to exact.
+
+Queue depth per flow and per job is available from ``stats()`` /
+``job_stats()``, the agents' ``job_status`` and ``GET /api/scheduler``.
+"""
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from loguru import logger as log
+from supervaizer import JobContext, Server
+from supervaizer.access import require_api_key
+
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BATCH = "batch"
+
+# Share of the workers a flow of each class gets relative to the others.
+CLASS_WEIGHTS = {INTERACTIVE: 8, NORMAL: 2, BATCH: 1}
+
+INTERACTIVE_MAX_CASES = int(os.getenv("SCHEDULER_INTERACTIVE_MAX_CASES", "5"))
+BATCH_MIN_CASES = int(os.getenv("SCHEDULER_BATCH_MIN_CASES", "1000"))
+
+
+class SchedulerClosedError(RuntimeError):
+    """Raised when a case is submitted after the scheduler was closed for shutdown."""
+
+
+def _parse_classes(spec: str) -> dict[str, str]:
+    """Parse ``"key=class,key2=class"`` (e.g. SCHEDULER_MISSION_CLASSES)."""
+    classes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, priority = item.partition("=")
+        if priority.strip() not in CLASS_WEIGHTS:
+            raise ValueError(f"Unknown priority class in {item!r}; expected one of {list(CLASS_WEIGHTS)}")
+        classes[key.strip()] = priority.strip()
+    return classes
+
+
+class _Flow:
+    __slots__ = ("key", "weight", "pass_value", "queue", "running")
+
+    def __init__(self, key: tuple[str, str], weight: int, pass_value: float) -> None:
+        self.key = key
+        self.weight = weight
+        self.pass_value = pass_value
+        self.queue: deque[tuple[Future[Any], "JobHandle", Callable[..., Any], tuple, dict]] = deque()
+        self.running = 0
+
+
+class CaseScheduler:
+    """Weighted-fair dispatcher of agent cases onto a fixed pool of worker threads.
+
+    Args:
+        workers: Cases executing at the same time, across all jobs and agents.
+        window: Default number of in-flight cases per job.
+        mission_classes: Priority class by mission id.
+        user_classes: Priority class by ``started_by``.
+
+    ``runner``, when set, executes each dispatched case in place of a direct
+    call: ``runner(handle, fn, args, kwargs)``. work_queue.py uses it to hand
+    cases to remote worker processes while dispatch order stays fair.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        window: int = 4,
+        mission_classes: dict[str, str] | None = None,
+        user_classes: dict[str, str] | None = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.window = max(1, window)
+        self.mission_classes = dict(mission_classes or {})
+        self.user_classes = dict(user_classes or {})
+        self._cond = threading.Condition()
+        self._flows: dict[tuple[str, str], _Flow] = {}
+        self._jobs: dict[str, "JobHandle"] = {}
+        self._virtual_time = 0.0
+        self._threads: list[threading.Thread] = []
+        # Job each busy thread works for (case workers and job_start loops), for profiler.py.
+        self._thread_jobs: dict[int, str] = {}
+        self._closed = False
+        self.runner: Callable[["JobHandle", Callable[..., Any], tuple, dict], Any] | None = None
+
+    @classmethod
+    def from_env(cls) -> "CaseScheduler":
+        """Configured by SCHEDULER_WORKERS, SCHEDULER_JOB_WINDOW,
+        SCHEDULER_MISSION_CLASSES and SCHEDULER_USER_CLASSES."""
+        return cls(
+            workers=int(os.getenv("SCHEDULER_WORKERS", "8")),
+            window=int(os.getenv("SCHEDULER_JOB_WINDOW", "4")),
+            mission_classes=_parse_classes(os.getenv("SCHEDULER_MISSION_CLASSES", "")),
+            user_classes=_parse_classes(os.getenv("SCHEDULER_USER_CLASSES", "")),
+        )
+
+    # -- jobs ---------------------------------------------------------------
+
+    def classify(self, context: JobContext, expected_cases: int) -> str:
+        """Priority class of a job: mission override, user override, then size."""
+        if context.mission_id in self.mission_classes:
+            return self.mission_classes[context.mission_id]
+        if context.started_by in self.user_classes:
+            return self.user_classes[context.started_by]
+        if expected_cases <= INTERACTIVE_MAX_CASES:
+            return INTERACTIVE
+        if expected_cases >= BATCH_MIN_CASES:
+            return BATCH
+        return NORMAL
+
+    def job(self, context: JobContext, expected_cases: int, window: int | None = None) -> "JobHandle":
+        """Register a job; use as a context manager around its case loop."""
+        priority = self.classify(context, expected_cases)
+        handle = JobHandle(self, context.job_id, context.mission_id or context.job_id, priority, window or self.window)
+        with self._cond:
+            self._jobs[handle.job_id] = handle
+        log.info(f"[Scheduler] Job {handle.job_id}: {expected_cases} case(s), class {priority}")
+        return handle
+
+    def _forget(self, handle: "JobHandle") -> None:
+        """Drop a finished job: cancel its queued cases, prune flows nobody uses."""
+        with self._cond:
+            if self._jobs.get(handle.job_id) is handle:
+                del self._jobs[handle.job_id]
+            live = {(job.mission, job.priority) for job in self._jobs.values()}
+            for key, flow in list(self._flows.items()):
+                kept: deque = deque()
+                for entry in flow.queue:
+                    if entry[1] is handle:
+                        entry[0].cancel()
+                        handle.queued -= 1
+                    else:
+                        kept.append(entry)
+                flow.queue = kept
+                # Flows outlive short idle gaps between a job's submissions, so
+                # their pass (the fairness history) is kept until the last job ends.
+                if key not in live and not flow.queue and not flow.running:
+                    del self._flows[key]
+
+    def _prune(self, flow: _Flow) -> None:
+        """Delete an idle flow no registered job feeds; caller holds the condition."""
+        if all((job.mission, job.priority) != flow.key for job in self._jobs.values()):
+            self._flows.pop(flow.key, None)
+
+    # -- shutdown -----------------------------------------------------------
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """Refuse new cases (SchedulerClosedError); queued and running ones still complete."""
+        with self._cond:
+            self._closed = True
+
+    def cancel_queued(self) -> int:
+        """Cancel every queued case; running cases finish. Returns how many were cancelled."""
+        cancelled = 0
+        handles: set[JobHandle] = set()
+        with self._cond:
+            for flow in self._flows.values():
+                while flow.queue:
+                    future, handle, *_ = flow.queue.popleft()
+                    handle.queued -= 1
+                    handles.add(handle)
+                    cancelled += future.cancel()
+        for handle in handles:
+            handle.notify_completion()
+        return cancelled
+
+    # -- dispatch -----------------------------------------------------------
+
+    def _enqueue(self, handle: "JobHandle", fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future[Any]:
+        future: Future[Any] = Future()
+        key = (handle.mission, handle.priority)
+        with self._cond:
+            if self._closed:
+                raise SchedulerClosedError(f"Job {handle.job_id}: server is shutting down, case not started")
+            self._ensure_workers()
+            flow = self._flows.get(key)
+            if flow is None:
+                flow = self._flows[key] = _Flow(key, CLASS_WEIGHTS[handle.priority], self._virtual_time)
+            elif not flow.queue and not flow.running:
+                # An idle flow does not bank credit: it rejoins at the current virtual time.
+                flow.pass_value = max(flow.pass_value, self._virtual_time)
+            flow.queue.append((future, handle, fn, args, kwargs))
+            handle.queued += 1
+            self._cond.notify()
+        return future
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"case-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self) -> tuple[Future[Any], "JobHandle", Callable[..., Any], tuple, dict, _Flow]:
+        """Pop the head of the flow with the lowest pass; caller holds the condition."""
+        while True:
+            ready = [flow for flow in self._flows.values() if flow.queue]
+            if ready:
+                flow = min(ready, key=lambda f: f.pass_value)
+                future, handle, fn, args, kwargs = flow.queue.popleft()
+                handle.queued -= 1
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._virtual_time = flow.pass_value
+                flow.pass_value += 1 / flow.weight
+                flow.running += 1
+                handle.running += 1
+                return future, handle, fn, args, kwargs, flow
+            self._cond.wait()
+
+    def _work(self) -> None:
+        ident = threading.get_ident()
+        while True:
+            with self._cond:
+                future, handle, fn, args, kwargs, flow = self._next()
+                self._thread_jobs[ident] = handle.job_id
+            try:
+                runner = self.runner
+                result = runner(handle, fn, args, kwargs) if runner else fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                with self._cond:
+                    self._thread_jobs.pop(ident, None)
+                    flow.running -= 1
+                    handle.running -= 1
+                    handle.done += 1
+                    if not flow.queue and not flow.running and handle.job_id not in self._jobs:
+                        self._prune(flow)
+                    handle.notify_completion()
+
+    # -- visibility ---------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth per flow and totals."""
+        with self._cond:
+            flows = [
+                {
+                    "mission": mission,
+                    "class": priority,
+                    "weight": flow.weight,
+                    "queued": len(flow.queue),
+                    "running": flow.running,
+                }
+                for (mission, priority), flow in self._flows.items()
+            ]
+            jobs = len(self._jobs)
+        return {
+            "workers": self.workers,
+            "jobs": jobs,
+            "queued": sum(f["queued"] for f in flows),
+            "running": sum(f["running"] for f in flows),
+            "flows": flows,
+        }
+
+    def job_threads(self, job_id: str) -> set[int]:
+        """Idents of the threads working for a job right now: its job_start loop and running cases."""
+        with self._cond:
+            return {ident for ident, job in self._thread_jobs.items() if job == job_id}
+
+    def job_stats(self, job_id: str | None) -> dict[str, Any] | None:
+        """Class and case counts of a registered job, or None."""
+        with self._cond:
+            handle = self._jobs.get(job_id) if job_id else None
+            if handle is None:
+                return None
+            return {
+                "class": handle.priority,
+                "queued": handle.queued,
+                "running": handle.running,
+                "done": handle.done,
+            }
+
+
+class JobHandle:
+    """One job's view of the scheduler: bounded submission and result collection."""
+
+    def __init__(self, scheduler: CaseScheduler, job_id: str, mission: str, priority: str, window: int) -> None:
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.mission = mission
+        self.priority = priority
+        self.window = window
+        # Counters are guarded by the scheduler's condition.
+        self.queued = 0
+        self.running = 0
+        self.done = 0
+        self._pending: list[Future[Any]] = []
+        self._finished = threading.Condition(threading.Lock())
+
+    def __enter__(self) -> "JobHandle":
+        with self.scheduler._cond:
+            self.scheduler._thread_jobs[threading.get_ident()] = self.job_id
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        with self.scheduler._cond:
+            self.scheduler._thread_jobs.pop(threading.get_ident(), None)
+        # Cases still queued are dropped (e.g. after stop_on_error); running ones finish.
+        self.scheduler._forget(self)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future[Any]:
+        """Queue a case; blocks while ``window`` cases of this job are in flight."""
+        with self._finished:
+            while sum(not f.done() for f in self._pending) >= self.window:
+                self._finished.wait()
+        future = self.scheduler._enqueue(self, fn, args, kwargs)
+        self._pending.append(future)
+        return future
+
+    def resolved(self, result: Any) -> Future[Any]:
+        """Record a case whose result is already known (e.g. a cache hit) without running it."""
+        future: Future[Any] = Future()
+        future.set_result(result)
+        self._pending.append(future)
+        return future
+
+    def completed(self) -> Iterator[Future[Any]]:
+        """Finished cases not yet collected, without blocking."""
+        # One done() snapshot: a case finishing while we look is either yielded now or kept pending.
+        finished, pending = [], []
+        for future in self._pending:
+            (finished if future.done() else pending).append(future)
+        self._pending = pending
+        yield from finished
+
+    def wait(self) -> Iterator[Future[Any]]:
+        """Every remaining case, in completion order."""
+        while self._pending:
+            with self._finished:
+                while not any(f.done() for f in self._pending):
+                    self._finished.wait()
+            yield from self.completed()
+
+    def notify_completion(self) -> None:
+        with self._finished:
+            self._finished.notify_all()
+
+
+case_scheduler = CaseScheduler.from_env()
+
+scheduler_routes = APIRouter(prefix="/api", tags=["Scheduler"], dependencies=[Depends(require_api_key)])
+
+
+@scheduler_routes.get("/scheduler", summary="Case scheduler queue depth")
+async def get_scheduler_stats() -> dict[str, Any]:
+    return case_scheduler.stats()
+
+
+def install_scheduler_routes(server: Server) -> None:
+    """Expose the scheduler's queue depth on the server app."""
+    server.app.include_router(scheduler_routes)
@@ -0,0 +1,177 @@
+# supervaize_hello_world/shutdown.py
+"""Graceful shutdown: drain in-flight jobs before the server process exits.
+
+Without it, a redeploy or rolling restart cuts jobs off inside ``job_start``,
+leaving their Cases open on the platform and their cost unreported. The
+server app's lifespan is wrapped so that, on shutdown:
+
+1. job starts are refused with ``503`` (admission control's ``draining``) and
+   the case scheduler is closed: running jobs stop submitting cases and return
+   a CANCELLED JobResponse with the cases and cost collected so far (a
+   status the SDK finishes the job with, so the platform gets them);
+2. queued and running cases get up to ``SHUTDOWN_DRAIN_TIMEOUT`` seconds to
+   finish (queued cases still left are then cancelled);
+3. Cases that are still open are settled: cases waiting for a human answer
+   are checkpointed to the SDK storage, so ``Case.resume`` picks them up after
+   the restart, and the others are closed as interrupted with their cost;
+4. flush hooks run (e.g. the contacts snapshot checkpoint).
+
+``POST /api/shutdown/drain`` starts step 1 ahead of SIGTERM, e.g. from a
+pre-stop hook (write-scoped API key), and returns what is still in flight.
+"""
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import APIRouter, Depends, FastAPI
+from loguru import logger as log
+from supervaizer import Case, EntityStatus, Server
+from supervaizer.access import require_scope
+from supervaizer.case import Cases
+from supervaizer.storage import StorageManager
+
+from admission import AdmissionController
+from scheduler import CaseScheduler
+
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+
+INTERRUPTED_RESULT = {"message": "Interrupted by server shutdown", "status": "interrupted"}
+
+
+def open_cases() -> list[Case]:
+    """Cases of this process that are not closed yet."""
+    registry = Cases().cases_by_job
+    return [case for job_cases in list(registry.values()) for case in list(job_cases.values()) if case.status.is_running]
+
+
+def checkpoint_case(case: Case) -> None:
+    StorageManager().save_object("Case", case.to_dict)
+
+
+class GracefulShutdown:
+    """Drain sequence for one server (see module docstring).
+
+    Args:
+        admission: Admission controller refusing job starts while draining.
+        scheduler: Case scheduler closed for new cases.
+        timeout: Seconds in-flight jobs get to finish.
+        poll_interval: Seconds between in-flight checks.
+    """
+
+    def __init__(
+        self,
+        admission: AdmissionController,
+        scheduler: CaseScheduler,
+        timeout: float = SHUTDOWN_DRAIN_TIMEOUT,
+        poll_interval: float = 0.1,
+    ) -> None:
+        self.admission = admission
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.hooks: list[Callable[[], Any]] = []
+
+    def add_hook(self, hook: Callable[[], Any]) -> None:
+        """Run ``hook()`` (in a thread) once jobs are drained and cases settled."""
+        self.hooks.append(hook)
+
+    @property
+    def draining(self) -> bool:
+        return self.admission.draining
+
+    def begin(self) -> None:
+        """Stop admitting jobs and cases; idempotent."""
+        if not self.admission.draining:
+            log.warning("[Shutdown] Draining: job starts are refused from now on")
+        self.admission.draining = True
+        self.scheduler.close()
+
+    def in_flight(self) -> dict[str, int]:
+        cases = self.scheduler.stats()
+        return {
+            "jobs": max(self.admission.active_jobs(), cases["jobs"]),
+            "queued_cases": cases["queued"],
+            "running_cases": cases["running"],
+        }
+
+    def idle(self) -> bool:
+        return not any(self.in_flight().values())
+
+    async def drain(self, cases: Callable[[], Iterable[Case]] = open_cases) -> dict[str, Any]:
+        """Run the whole drain sequence; returns a summary."""
+        self.begin()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while not self.idle() and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+
+        left = self.in_flight()
+        cancelled = 0
+        if any(left.values()):
+            cancelled = self.scheduler.cancel_queued()
+            log.warning(f"[Shutdown] Drain deadline reached with {left} in flight; {cancelled} queued case(s) cancelled")
+
+        closed, checkpointed = await asyncio.to_thread(self._settle, cases)
+        for hook in self.hooks:
+            try:
+                await asyncio.to_thread(hook)
+            except Exception as e:
+                log.error(f"[Shutdown] Flush hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+        report = {
+            "drained": not any(left.values()),
+            "seconds": round(time.monotonic() - started, 3),
+            "left_in_flight": left,
+            "cancelled_cases": cancelled,
+            "closed_cases": closed,
+            "checkpointed_cases": checkpointed,
+        }
+        log.info(f"[Shutdown] {report}")
+        return report
+
+    @staticmethod
+    def _settle(cases: Callable[[], Iterable[Case]]) -> tuple[int, int]:
+        closed = checkpointed = 0
+        for case in cases():
+            try:
+                if case.status == EntityStatus.AWAITING:
+                    checkpoint_case(case)
+                    checkpointed += 1
+                else:
+                    case.close_sync(case_result=INTERRUPTED_RESULT, final_cost=case.calculated_cost)
+                    closed += 1
+            except Exception as e:  # one unreachable case must not block the others
+                log.error(f"[Shutdown] Could not settle case {case.id} of job {case.job_id}: {e}")
+        return closed, checkpointed
+
+
+def install_graceful_shutdown(
+    server: Server, admission: AdmissionController, scheduler: CaseScheduler, timeout: float | None = None
+) -> GracefulShutdown:
+    """Drain on app shutdown and add the drain route; the handler is on ``app.state.shutdown``."""
+    shutdown = GracefulShutdown(admission, scheduler, SHUTDOWN_DRAIN_TIMEOUT if timeout is None else timeout)
+    app: FastAPI = server.app
+    sdk_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[Any]:
+        async with sdk_lifespan(app) as state:
+            yield state
+            await shutdown.drain()
+
+    app.router.lifespan_context = lifespan
+
+    # Draining refuses every new job: read-only keys cannot start it.
+    router = APIRouter(prefix="/api/shutdown", tags=["Shutdown"], dependencies=[Depends(require_scope("write"))])
+
+    @router.post("/drain", summary="Stop admitting jobs ahead of a shutdown")
+    async def start_drain() -> dict[str, Any]:
+        shutdown.begin()
+        return {"draining": True, "in_flight": shutdown.in_flight()}
+
+    app.include_router(router)
+    app.state.shutdown = shutdown
+    return shutdown
@@ -0,0 +1,229 @@
+# supervaize_hello_world/static_cache.py
+"""Precomputed responses for the static and near-static pages.
+
+The landing page (``/`` from ``index.html``), the ``/api/context`` it fetches
+on every load and the agents' instructions pages were rebuilt (and the
+instructions template re-rendered) on every request, and sent uncompressed
+without caching headers. ``StaticCacheMiddleware`` serves them instead from
+bodies built once:
+
+- each body is compressed up front (gzip, plus brotli when the optional
+  ``brotli`` package is installed) and the smallest encoding the client
+  accepts is sent;
+- every encoding has a strong ETag, so a revalidating browser gets a bodyless
+  ``304``;
+- ``Cache-Control`` lets browsers and proxies keep pages for
+  ``STATIC_CACHE_MAX_AGE`` seconds (``private`` for pages behind the API key).
+
+A page is rebuilt when its ``version`` changes: the file's mtime for the HTML
+files, the server URLs for ``/api/context``. Pages behind the API key check it
+like ``require_api_key`` before anything is sent.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Request
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from loguru import logger as log
+from supervaizer import Agent, Server
+from supervaizer.access import require_api_key
+
+try:
+    import brotli  # optional: adds the ``br`` encoding
+except ImportError:
+    brotli = None
+
+STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", "3600"))
+
+# Bodies smaller than this are not worth compressing.
+MIN_COMPRESS_SIZE = 512
+# Preference when the client accepts several encodings equally.
+ENCODINGS = ("br", "gzip", "identity")
+
+
+class CachedBody:
+    """One response body in every encoding, each with its strong ETag."""
+
+    def __init__(self, body: bytes, media_type: str) -> None:
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: dict[str, tuple[bytes, str]] = {"identity": (body, f'"{digest}"')}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for encoding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Best available encoding for an ``Accept-Encoding`` header."""
+        accepted: dict[str, float] = {}
+        for item in accept_encoding.lower().split(","):
+            name, _, params = item.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip()] = quality
+        best, best_quality = "identity", 0.0
+        for encoding in ENCODINGS:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if encoding in self.variants and encoding != "identity" and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+
+class CachedPage:
+    """A route served from a ``CachedBody``, rebuilt when ``version()`` changes.
+
+    Args:
+        build: Returns the body (str is encoded as UTF-8).
+        version: Returns a value changing with the body's inputs; None builds once.
+        media_type: Content type of the body.
+        max_age: ``Cache-Control`` max-age in seconds.
+        protected: Require the API key, like ``require_api_key`` routes.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], str | bytes],
+        version: Callable[[], Hashable] | None = None,
+        media_type: str = "text/html; charset=utf-8",
+        max_age: int = STATIC_CACHE_MAX_AGE,
+        protected: bool = False,
+    ) -> None:
+        self.build = build
+        self.version = version
+        self.media_type = media_type
+        self.protected = protected
+        self.cache_control = f"{'private' if protected else 'public'}, max-age={max_age}"
+        self._built: tuple[Hashable, CachedBody] | None = None
+        self._lock = threading.Lock()
+
+    def body(self) -> CachedBody:
+        current = self.version() if self.version else None
+        built = self._built
+        if built is not None and built[0] == current:
+            return built[1]
+        with self._lock:
+            if self._built is None or self._built[0] != current:
+                body = self.build()
+                self._built = (current, CachedBody(body.encode() if isinstance(body, str) else body, self.media_type))
+            return self._built[1]
+
+
+class StaticCache:
+    """Cached pages by path; served by ``StaticCacheMiddleware``."""
+
+    def __init__(self) -> None:
+        self.pages: dict[str, CachedPage] = {}
+
+    def add(self, path: str, build: Callable[[], str | bytes], **options: Any) -> CachedPage:
+        """Serve ``path`` from ``build()`` (see ``CachedPage`` for the options); built right away."""
+        page = self.pages[path] = CachedPage(build, **options)
+        page.body()
+        return page
+
+    def add_file(self, path: str, file: Path, **options: Any) -> CachedPage:
+        """Serve a static file, rebuilt when it is modified."""
+        return self.add(path, file.read_bytes, version=lambda: file.stat().st_mtime_ns, **options)
+
+
+class StaticCacheMiddleware:
+    """Pure ASGI middleware answering GET/HEAD on the cached paths."""
+
+    def __init__(self, app: Any, cache: StaticCache) -> None:
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        page = self.cache.pages.get(scope["path"]) if scope["type"] == "http" else None
+        if page is None or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if page.protected and not _authorized(scope, headers.get("x-api-key")):
+            await self.app(scope, receive, send)  # the route answers 401
+            return
+
+        body = page.body()
+        encoding = body.negotiate(headers.get("accept-encoding", ""))
+        data, etag = body.variants[encoding]
+        response_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", page.cache_control.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if etag in _etags(headers.get("if-none-match", "")):
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        response_headers += [
+            (b"content-type", body.media_type.encode()),
+            (b"content-length", str(len(data)).encode()),
+        ]
+        if encoding != "identity":
+            response_headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else data})
+
+
+def _etags(if_none_match: str) -> set[str]:
+    # If-None-Match uses the weak comparison: W/"x" matches "x".
+    return {tag.strip().removeprefix("W/") for tag in if_none_match.split(",") if tag.strip()}
+
+
+def _authorized(scope: dict[str, Any], api_key: str | None) -> bool:
+    try:
+        require_api_key(Request(scope), x_api_key=api_key)
+    except HTTPException:
+        return False
+    return True
+
+
+def instructions_page(agent: Agent) -> Callable[[], str | bytes]:
+    """Render an agent's instructions page like the SDK route does (template or static HTML)."""
+    file = Path(agent.instructions_path)
+
+    def build() -> str | bytes:
+        content = file.read_text(encoding="utf-8")
+        if "{{" not in content and "{%" not in content:
+            return content
+        env = Environment(loader=FileSystemLoader(str(file.parent)), autoescape=select_autoescape())
+        return env.get_template(file.name).render(registration_info=agent.registration_info)
+
+    return build
+
+
+def install_static_cache(server: Server, root: Path | None = None) -> StaticCache:
+    """Serve the landing and instructions pages precomputed; the cache is on ``app.state.static_cache``.
+
+    More pages (e.g. ``/api/context``) can be added later with ``add``.
+    """
+    root = root or Path.cwd()
+    cache = StaticCache()
+    index = root / "index.html"
+    if index.is_file():  # the SDK's own home page is a template, left alone
+        cache.add_file("/", index)
+    for agent in server.agents:
+        file = Path(agent.instructions_path)
+        if file.is_file():
+            cache.add(
+                f"/api/supervaizer{agent.path}/{agent.instructions_path}",
+                instructions_page(agent),
+                version=lambda file=file: file.stat().st_mtime_ns,
+                protected=True,
+            )
+    app: FastAPI = server.app
+    app.add_middleware(StaticCacheMiddleware, cache=cache)
+    app.state.static_cache = cache
+    log.info(f"[StaticCache] Serving {sorted(cache.pages)} precomputed (brotli: {brotli is not None})")
+    return cache
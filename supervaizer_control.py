@@ -8,19 +8,29 @@
 # It must be copied / renamed to supervaizer_control.py
 # and edited to configure your agent(s)
 
-import os
 import shortuuid
 from supervaizer import (
     Agent,
     AgentMethods,
     Server,
-    Account,
     AgentMethod,
     AgentMethodField,
     ParametersSetup,
     Parameter,
 )
-from agent_data_resource import contacts_resource
+from admission import install_admission_control
+from agent_data_resource import checkpoint_contacts, contacts_resource, contacts_routes
+from agent_email import email_agent
+from async_data_routes import install_async_data_routes
+from dynamic_choices import install_dynamic_choices_routes
+from job_events import install_job_events_routes
+from platform_account import supervaize_account
+from platform_http import install_platform_http
+from profiler import install_profiler_routes
+from scheduler import case_scheduler, install_scheduler_routes
+from shutdown import install_graceful_shutdown
+from static_cache import install_static_cache
+from work_queue import configure_from_env
 
 #### SIMPLE AGENT ####
 agent_name = "Hello World AI Agent"
@@ -85,6 +95,7 @@ simple_agent: Agent = Agent(
     ),
     parameters_setup=simple_agent_parameters,
     data_resources=[contacts_resource],
+    custom_routes=contacts_routes,
 )
 
 
@@ -142,21 +153,48 @@ human_loop_agent: Agent = Agent(
 )
 
 
-# Always provide a default value to prevent error.
-# Get from app.supervaize.com
-supervaize_account: Account = Account(
-    workspace_id=os.getenv("SUPERVAIZE_WORKSPACE_ID") or "dummy_workspace_id",
-    api_key=os.getenv("SUPERVAIZE_API_KEY") or "dummy_api_key",
-    api_url=os.getenv("SUPERVAIZE_API_URL") or "https://app.supervaize.com",
-)
-
 # Define the supervaizer server capabilities
 sv_server: Server = Server(
-    agents=[simple_agent, human_loop_agent],
+    agents=[simple_agent, human_loop_agent, email_agent()],
     a2a_endpoints=True,  # Enable A2A endpoints
     supervisor_account=supervaize_account,  # Account from Supervaize
 )
 
+# Serve DataResources through routes that await async callbacks (see async_data_routes.py).
+# Contacts are plain JSON dicts: they skip FastAPI's response encoding (see fast_json.py).
+install_async_data_routes(sv_server, trusted={"contacts"})
+
+# Platform calls (Case start/update/close, events) share keep-alive connection pools
+# sized for the case scheduler's workers (see platform_http.py).
+install_platform_http(sv_server, case_scheduler.workers)
+
+# Bound concurrent/queued jobs per agent and rate-limit DataResource writes (see admission.py).
+# Limits default to the JOBS_MAX_* / DATA_WRITES_* env vars; pass a dict keyed by agent slug to override.
+admission = install_admission_control(sv_server)
+
+# Prefix search over the dynamic choices of the agents' start forms (see dynamic_choices.py)
+install_dynamic_choices_routes(sv_server)
+
+# Queue depth of the case scheduler shared by the agents' job_start (see scheduler.py)
+install_scheduler_routes(sv_server)
+
+# Case events of running jobs pushed as Server-Sent Events (see job_events.py)
+install_job_events_routes(sv_server)
+
+# Landing and instructions pages served precomputed, compressed and with ETags (see static_cache.py)
+static_cache = install_static_cache(sv_server)
+
+# Admin-only sampling profiler: whole process for N seconds or one job (see profiler.py)
+install_profiler_routes(sv_server, case_scheduler)
+
+# SUPERVAIZER_EXECUTION_MODE=distributed hands cases to `python worker.py` processes (see work_queue.py)
+configure_from_env(case_scheduler)
+
+# On shutdown, refuse new jobs, let in-flight cases finish within SHUTDOWN_DRAIN_TIMEOUT,
+# settle the Cases still open and checkpoint contacts (see shutdown.py).
+shutdown = install_graceful_shutdown(sv_server, admission, case_scheduler)
+shutdown.add_hook(checkpoint_contacts)
+
 
 # Expose the FastAPI app instance for deployment
 app = sv_server.app
@@ -6,14 +6,24 @@ from fastapi.testclient import TestClient
 import agent_data_resource as _dr_module
 
 
+def pytest_addoption(parser):
+    parser.addoption("--perf", action="store_true", help="also run the scaling tests (marked perf)")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip ``perf`` tests unless ``--perf`` is given: they seed up to 100k contacts."""
+    if config.getoption("--perf"):
+        return
+    skip = pytest.mark.skip(reason="scaling test: run with --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture(autouse=True)
 def reset_contacts():
-    """Reset in-memory contacts store before each test."""
-    _dr_module._contacts.clear()
-    _dr_module._contacts.update({
-        "c1": {"id": "c1", "first_name": "Alice", "last_name": "Smith", "email": "alice@example.com", "city": "Paris"},
-        "c2": {"id": "c2", "first_name": "Bob", "last_name": "Jones", "email": "bob@example.com", "city": "London"},
-    })
+    """Reset in-memory contacts store (Alice c1, Bob c2) before each test."""
+    _dr_module._reset_contacts()
 
 
 @pytest.fixture(scope="session")
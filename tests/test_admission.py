@@ -0,0 +1,108 @@
+# supervaize_hello_world/tests/test_admission.py
+"""Admission control: bounded job concurrency/queue and rate-limited DataResource writes."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import BackgroundTasks, Depends, FastAPI
+
+from admission import AdmissionController, AdmissionMiddleware, AgentLimits, TokenBucket, data_write_limit
+
+LIMITS = AgentLimits(max_concurrent_jobs=1, max_queued_jobs=1, data_writes_per_second=1, data_write_burst=2)
+
+
+def _app(release: threading.Event, running: list[int], peak: list[int]) -> FastAPI:
+    """Mirrors the SDK: the job runs as a background task after the 202 is sent."""
+    app = FastAPI()
+    app.state.server = SimpleNamespace(api_key="secret")
+
+    def job() -> None:
+        running.append(1)
+        peak.append(len(running))
+        release.wait(5)
+        running.pop()
+
+    @app.post("/api/supervaizer/agents/demo/jobs", status_code=202)
+    async def start_job(background_tasks: BackgroundTasks) -> dict:
+        background_tasks.add_task(job)
+        return {"status": "accepted"}
+
+    @app.post("/api/agents/demo/data/contacts/", dependencies=[Depends(data_write_limit("demo"))])
+    async def create_contact() -> dict:
+        return {"id": "x"}
+
+    app.state.admission = AdmissionController(default=LIMITS)
+    app.add_middleware(AdmissionMiddleware, controller=app.state.admission)
+    return app
+
+
+def test_job_queue_applies_backpressure():
+    release = threading.Event()
+    running: list[int] = []
+    peak: list[int] = []
+    app = _app(release, running, peak)
+    controller: AdmissionController = app.user_middleware[0].kwargs["controller"]
+
+    async def scenario() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/api/supervaizer/agents/demo/jobs"))
+            second = asyncio.create_task(client.post("/api/supervaizer/agents/demo/jobs"))
+            while controller.gate("demo").stats() != {"running": 1, "queued": 1, "max_concurrent": 1, "max_queued": 1}:
+                await asyncio.sleep(0.01)
+            rejected = await client.post("/api/supervaizer/agents/demo/jobs")
+            release.set()
+            return [await first, await second, rejected]
+
+    first, second, rejected = asyncio.run(scenario())
+    assert (first.status_code, second.status_code) == (202, 202)
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert max(peak) == 1  # the queued job only ran once the first finished
+    assert len(peak) == 2
+    assert controller.gate("demo").stats()["running"] == 0
+
+
+def test_data_writes_are_rate_limited_per_workspace():
+    app = _app(threading.Event(), [], [])
+
+    async def scenario() -> list[int]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            acme = {"X-Supervaize-Workspace-Id": "acme", "X-API-Key": "secret"}
+            codes = [(await client.post("/api/agents/demo/data/contacts/", headers=acme)).status_code for _ in range(3)]
+            other = {"X-Supervaize-Workspace-Id": "other", "X-API-Key": "secret"}
+            return codes + [(await client.post("/api/agents/demo/data/contacts/", headers=other)).status_code]
+
+    assert asyncio.run(scenario()) == [200, 200, 429, 200]
+
+
+def test_rejected_keys_do_not_drain_a_workspace_bucket():
+    app = _app(threading.Event(), [], [])
+
+    async def scenario() -> list[int]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            forged = {"X-Supervaize-Workspace-Id": "acme", "X-API-Key": "wrong"}
+            codes = [(await client.post("/api/agents/demo/data/contacts/", headers=forged)).status_code for _ in range(5)]
+            acme = {"X-Supervaize-Workspace-Id": "acme", "X-API-Key": "secret"}
+            return codes + [(await client.post("/api/agents/demo/data/contacts/", headers=acme)).status_code]
+
+    assert asyncio.run(scenario()) == [401] * 5 + [200]
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=100, burst=1)
+    assert bucket.take() == 0
+    wait = bucket.take()
+    assert 0 < wait <= 0.01
+    time.sleep(wait + 0.005)
+    assert bucket.take() == 0
+
+
+def test_admission_is_installed_on_the_server(client):
+    from supervaizer_control import sv_server
+    assert isinstance(sv_server.app.state.admission, AdmissionController)
+    assert client.post("/api/agents/hello-world-ai-agent/data/contacts/", json={"first_name": "Z"}).status_code == 201
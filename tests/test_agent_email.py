@@ -0,0 +1,86 @@
+# supervaize_hello_world/tests/test_agent_email.py
+"""Email agent: concurrent research fan-out capped by "Max number of results"."""
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from supervaizer import EntityStatus, JobContext
+
+import agent_email
+
+
+class _FakeCase:
+    def update_sync(self, update) -> None:
+        pass
+
+    def close_sync(self, case_result, final_cost=None) -> None:
+        pass
+
+
+def _context(job_id: str) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m-email",
+        mission_name="m-email",
+    )
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Replace the platform case and the research backend; records concurrent searches."""
+    state = {"running": 0, "peak": 0, "calls": []}
+    lock = threading.Lock()
+
+    def fake_search(company, country, language, advanced, limit, deadline=None):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["calls"].append((country, language))
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return [{"title": f"{company} {country} {language} {n}"} for n in range(min(2, limit))]
+
+    monkeypatch.setattr(agent_email.Case, "start_sync", classmethod(lambda cls, **kw: _FakeCase()))
+    monkeypatch.setattr(agent_email, "_account", lambda: None)
+    monkeypatch.setattr(agent_email, "search_company", fake_search)
+    monkeypatch.setattr(agent_email, "RESEARCH_PARALLELISM", 2)
+    return state
+
+
+def test_agent_is_registered(client):
+    response = client.get("/api/supervaizer/agents/email-agent")
+    assert response.status_code == 200
+    assert "Max number of results" in [field["name"] for field in response.json()["methods"]["job_start"]["fields"]]
+
+
+def test_research_fans_out_per_country_and_language(searches):
+    fields = {
+        "Company to research": "Acme",
+        "Max number of results": "100",
+        "Type of research": "A",
+        "List of countries": ["PA", "PE", "PL"],
+        "languages": "en, es",
+    }
+    response = agent_email.job_start(fields=fields, context=_context("email-1"))
+    assert response.status == EntityStatus.COMPLETED
+    assert sorted(searches["calls"]) == sorted((c, l) for c in ("PA", "PE", "PL") for l in ("en", "es"))
+    assert response.payload["cases"] == 6
+    assert len(response.payload["results"]) == 12
+    assert searches["peak"] <= 2
+
+
+def test_max_results_caps_results_and_stops_new_cases(searches):
+    fields = {
+        "Company to research": "Acme",
+        "Max number of results": "3",
+        "List of countries": list(agent_email.COUNTRIES),
+    }
+    response = agent_email.job_start(fields=fields, context=_context("email-2"))
+    assert len(response.payload["results"]) == 3
+    # Two cases (in flight together) already reach the cap: only a few of the 7 targets run.
+    assert len(searches["calls"]) < len(agent_email.COUNTRIES)
@@ -0,0 +1,102 @@
+# supervaize_hello_world/tests/test_case_cache.py
+"""Case memoization: LRU/TTL on disk and cache hits in repeated agent jobs."""
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from supervaizer import JobContext
+
+import agent_email
+import case_cache as case_cache_module
+from case_cache import CaseCache, CaseMemo, case_cache_for, case_key
+from scheduler import CaseScheduler
+
+
+def _context(job_id: str) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+
+
+def test_key_ignores_dict_order_and_covers_every_part():
+    key = case_key("agent", "mod.fn", {"a": 1, "b": [1, 2]}, {"p": "x"})
+    assert key == case_key("agent", "mod.fn", {"b": [1, 2], "a": 1}, {"p": "x"})
+    assert key != case_key("other", "mod.fn", {"a": 1, "b": [1, 2]}, {"p": "x"})
+    assert key != case_key("agent", "mod.fn2", {"a": 1, "b": [1, 2]}, {"p": "x"})
+    assert key != case_key("agent", "mod.fn", {"a": 2, "b": [1, 2]}, {"p": "x"})
+    assert key != case_key("agent", "mod.fn", {"a": 1, "b": [1, 2]}, {"p": "y"})
+
+
+def test_lru_eviction_and_ttl(tmp_path):
+    cache = CaseCache(str(tmp_path / "cache.db"), max_entries=2, ttl=0.2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == (True, {"v": 1})  # "b" is now least recently used
+    cache.put("c", {"v": 3})
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    time.sleep(0.25)
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["hits"] == 3
+
+
+def test_results_keep_case_summary(tmp_path):
+    cache = CaseCache(str(tmp_path / "cache.db"))
+    cache.put("k", SimpleNamespace(id="C1", name="Case C1", cost=2.5, secret="not stored"))
+    found, result = cache.get("k")
+    assert found and result.cost == 2.5 and result.name == "Case C1"
+    assert not hasattr(result, "secret")
+
+
+def test_failed_cases_are_not_cached(tmp_path):
+    memo = CaseMemo(CaseCache(str(tmp_path / "cache.db")), agent="a")
+    scheduler = CaseScheduler(workers=1)
+
+    def boom() -> None:
+        raise RuntimeError("boom")
+
+    for _ in range(2):
+        with scheduler.job(_context("j"), 1) as job:
+            memo.submit(job, boom, {"n": 1})
+            assert [f.exception() is not None for f in job.wait()] == [True]
+    assert memo.report() == {"hits": 0, "misses": 2, "hit_rate": 0.0}
+
+
+def test_caching_is_opt_in_per_agent(monkeypatch, tmp_path):
+    cache = CaseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(case_cache_module, "case_cache", cache)
+    monkeypatch.setattr(case_cache_module, "CASE_CACHE_AGENTS", frozenset({"email-agent"}))
+    assert case_cache_for("email-agent") is cache
+    assert case_cache_for("hello-world-ai-agent") is None  # random cases with side effects
+
+
+def test_repeated_job_is_served_from_cache(monkeypatch, tmp_path):
+    """Re-running a job with the same fields skips every case and reports the hit rate."""
+    calls: list[str] = []
+
+    def fake_research(case_id: str, job_id: str, company: str, country: str, **kwargs):
+        calls.append(case_id)
+        return {"results": [{"title": f"{company} {country}"}], "cost": 1.5}
+
+    monkeypatch.setattr(agent_email, "research_case", fake_research)
+    monkeypatch.setattr(case_cache_module, "case_cache", CaseCache(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(case_cache_module, "CASE_CACHE_AGENTS", frozenset({"email-agent"}))
+    fields = {"Company to research": "Acme", "List of countries": ["FR", "DE", "ES", "IT"]}
+
+    first = agent_email.job_start(fields=fields, context=_context("job-1"))
+    assert first.payload["case_cache"] == {"hits": 0, "misses": 4, "hit_rate": 0.0}
+
+    second = agent_email.job_start(fields=fields, context=_context("job-2"))
+    assert second.payload["case_cache"] == {"hits": 4, "misses": 0, "hit_rate": 1.0}
+    assert second.payload["costs"]["statuses"]["cached"] == 4 and len(second.payload["results"]) == 4
+    assert second.payload["costs"]["total_cost"] == 0.0 and second.payload["costs"]["cached_cost"] == 6.0
+    assert len(calls) == 4
+
+    third = agent_email.job_start(fields={**fields, "Company to research": "Globex"}, context=_context("job-3"))
+    assert third.payload["case_cache"]["hits"] == 0  # different fields, different cases
+    assert len(calls) == 8
@@ -0,0 +1,88 @@
+# supervaize_hello_world/tests/test_contact_shards.py
+"""Per-workspace contact shards: quotas, isolation and eviction of cold shards."""
+import threading
+
+import pytest
+
+from contact_shards import ContactShards
+from contacts_store import ContactQuotaExceededError
+
+SEED = [{"id": "c1", "first_name": "Alice", "email": "alice@example.com"}]
+
+
+@pytest.fixture
+def shards(tmp_path):
+    return ContactShards(seed=SEED, max_rows=3, max_resident=2, spill_dir=tmp_path)
+
+
+def test_quota_is_per_shard(shards):
+    """A full shard rejects writes; other workspaces are unaffected."""
+    with shards.pin("noisy") as store:
+        store.create({"first_name": "B", "email": "b@x.test"})
+        store.create({"first_name": "C", "email": "c@x.test"})
+        with pytest.raises(ContactQuotaExceededError):
+            store.create({"first_name": "D", "email": "d@x.test"})
+        # Imports are checked before anything is applied; upserts add no rows.
+        with pytest.raises(ContactQuotaExceededError):
+            store.import_records([{"email": "b@x.test"}, {"email": "e@x.test"}])
+        assert store.import_records([{"email": "B@x.test", "city": "Lyon"}])["updated"] == 1
+        assert len(store) == 3
+    with shards.pin("quiet") as store:
+        store.create({"first_name": "B", "email": "b@x.test"})
+
+
+def test_cold_shards_are_evicted_to_disk_and_reloaded(shards):
+    """Shards beyond max_resident are spilled LRU-first and come back intact."""
+    for ws in ("a", "b", "c"):
+        with shards.pin(ws) as store:
+            store.create({"first_name": ws.upper(), "email": f"{ws}@x.test"})
+
+    stats = shards.stats()
+    assert set(stats["resident"]) == {"b", "c"}
+    assert stats["spilled"] == 1
+
+    with shards.pin("a") as store:
+        assert {c["email"] for c in store.snapshot()} == {"alice@example.com", "a@x.test"}
+    assert set(shards.stats()["resident"]) == {"c", "a"}
+
+
+def test_pinned_shards_are_not_evicted(shards):
+    """A shard in use stays in memory even when it is the least recently used."""
+    with shards.pin("busy") as busy:
+        for ws in ("b", "c", "d"):
+            with shards.pin(ws):
+                pass
+        busy.create({"first_name": "Late", "email": "late@x.test"})
+        assert shards.is_resident("busy")
+    with shards.pin("busy") as store:
+        assert len(store) == 2
+
+
+def test_bulk_work_in_one_workspace_does_not_block_another(shards):
+    """A tenant holding its shard exclusively (e.g. a big import) leaves others responsive."""
+    with shards.pin("noisy") as noisy:
+        with noisy._gate.exclusive():
+            result: list[int] = []
+            reader = threading.Thread(target=lambda: result.append(len(_read(shards, "quiet"))))
+            reader.start()
+            reader.join(timeout=2)
+            assert result == [1]
+
+
+def _read(shards: ContactShards, workspace_id: str) -> list[dict]:
+    with shards.pin(workspace_id) as store:
+        return store.snapshot()
+
+
+def test_reset_only_deletes_this_process_spill_files(shards, tmp_path):
+    """Another process sharing the spill dir keeps its shards when this one resets."""
+    other = ContactShards(seed=SEED, max_resident=1, spill_dir=tmp_path)
+    for ws in ("theirs", "theirs-too"):
+        with other.pin(ws) as store:
+            store.create({"first_name": "T", "email": "t@x.test"})
+    for ws in ("a", "b", "c"):
+        with shards.pin(ws):
+            pass
+    shards.reset()
+    assert [path.name for path in tmp_path.iterdir()] == ["theirs.contacts.snap"]
+    assert ContactShards().spill_dir != ContactShards().spill_dir  # private by default
@@ -0,0 +1,113 @@
+# supervaize_hello_world/tests/test_contacts_scaling.py
+"""Growth curve of the contacts DataResource operations (opt-in: ``pytest --perf``).
+
+Seeds one workspace per size with 1k, 10k and 100k contacts through
+``contacts_resource.on_import``, times every callback at each size and checks
+how the times grow with the store rather than their absolute values, so the
+checks hold on any machine:
+
+- get, update and create + delete are hash-map work: their time must not
+  grow with the store (within ``CONSTANT_BAND``);
+- import is one pass over the batch: its time per record must not grow;
+- list is given ``skip`` and ``limit`` and slices the page in the store:
+  paging through an unchanged store must not grow with it either.
+"""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+from supervaizer.data_resource import DataResourceContext
+
+import agent_data_resource
+from agent_data_resource import contacts_resource
+
+pytestmark = pytest.mark.perf
+
+SIZES = (1_000, 10_000, 100_000)
+PAGE = 100
+CALLS = 2_000
+REPEATS = 5
+# Allowed growth from the smallest to the largest store (cache misses of a
+# 100k-row dict, noise of a shared machine).
+CONSTANT_BAND = 3.0
+
+
+def _records(count: int, offset: int = 0) -> list[dict[str, Any]]:
+    return [
+        {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"perf{n}@example.com", "city": "Paris"}
+        for n in range(offset, offset + count)
+    ]
+
+
+async def _per_call(call: Callable[[int], Awaitable[Any]], calls: int = CALLS) -> float:
+    """Best of REPEATS runs of ``calls`` calls, in seconds per call."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for n in range(calls):
+            await call(n)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+async def _measure(size: int) -> dict[str, float]:
+    context = DataResourceContext(agent_slug="hello-world-ai-agent", workspace_id=f"perf-{size}")
+    seeded = len(await contacts_resource.on_list(context))  # a new workspace starts with the seed contacts
+    start = time.perf_counter()
+    summary = await contacts_resource.on_import(_records(size - seeded), context)
+    imported = (time.perf_counter() - start) / (size - seeded)
+    assert summary["total"] == size
+
+    rows = await contacts_resource.on_list(context)
+    ids = [row["id"] for row in rows[:: max(1, size // CALLS)]]
+
+    async def get(n: int) -> None:
+        assert await contacts_resource.on_get(ids[n % len(ids)], context) is not None
+
+    async def update(n: int) -> None:
+        await contacts_resource.on_update(ids[n % len(ids)], {"city": f"City{n}"}, context)
+
+    async def create_delete(n: int) -> None:
+        created = await contacts_resource.on_create({"first_name": "New", "email": f"new{n}@example.com"}, context)
+        await contacts_resource.on_delete(created["id"], context)
+
+    async def list_page(n: int) -> None:
+        skip = (n * PAGE) % size
+        assert len(await contacts_resource.on_list(context, skip=skip, limit=PAGE)) == PAGE
+
+    return {
+        "import": imported,
+        "get": await _per_call(get),
+        "update": await _per_call(update),
+        "create_delete": await _per_call(create_delete),
+        "list": await _per_call(list_page),
+    }
+
+
+@pytest.fixture(scope="module")
+def timings() -> dict[str, dict[int, float]]:
+    """Seconds per operation, by operation and store size."""
+    # The largest store is at the default shard quota; creates must not hit it.
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(agent_data_resource._shards, "max_rows", None)
+        by_size = {size: asyncio.run(_measure(size)) for size in SIZES}
+    return {op: {size: by_size[size][op] for size in SIZES} for op in by_size[SIZES[0]]}
+
+
+def _growth(times: dict[int, float]) -> float:
+    return times[SIZES[-1]] / times[SIZES[0]]
+
+
+@pytest.mark.parametrize("operation", ["get", "update", "create_delete"])
+def test_point_operations_do_not_grow_with_the_store(timings, operation):
+    assert _growth(timings[operation]) <= CONSTANT_BAND, timings[operation]
+
+
+def test_import_is_linear_in_the_batch(timings):
+    assert _growth(timings["import"]) <= CONSTANT_BAND, timings["import"]
+
+
+def test_list_pages_do_not_grow_with_the_store(timings):
+    assert _growth(timings["list"]) <= CONSTANT_BAND, timings["list"]
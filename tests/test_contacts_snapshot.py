@@ -0,0 +1,91 @@
+# supervaize_hello_world/tests/test_contacts_snapshot.py
+"""Binary snapshots of the contacts store: round trip, corruption checks, warm restart."""
+import time
+
+import pytest
+
+from contact_shards import ContactShards
+from contacts_snapshot import SnapshotError, read_snapshot, write_snapshot
+from contacts_store import ContactStore
+
+SEED = [{"id": "c1", "first_name": "Alice", "email": "alice@example.com"}]
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = ContactStore()
+    store.import_records({"first_name": f"N{i}", "email": f"n{i}@x.test"} for i in range(100))
+    _version, rows, index = store.dump()
+    write_snapshot(tmp_path / "s.snap", "email", rows, index)
+
+    unique_field, restored_rows, restored_index = read_snapshot(tmp_path / "s.snap")
+    assert (unique_field, restored_rows, restored_index) == ("email", rows, index)
+
+
+def test_corrupt_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "s.snap"
+    write_snapshot(path, "email", {"c1": dict(SEED[0])}, {"alice@example.com": "c1"})
+    data = bytearray(path.read_bytes())
+    data[-3] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="checksum"):
+        read_snapshot(path)
+    path.write_bytes(bytes(data[:-10]))
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+def test_checkpoint_restores_shards_in_a_new_process(tmp_path):
+    """A fresh registry on the same directory comes back with the checkpointed data."""
+    shards = ContactShards(seed=SEED, spill_dir=tmp_path)
+    with shards.pin("acme") as store:
+        store.import_records({"first_name": f"N{i}", "email": f"n{i}@x.test"} for i in range(50))
+    assert shards.checkpoint() == 1
+    assert shards.checkpoint() == 0  # unchanged shards are not rewritten
+
+    restarted = ContactShards(seed=SEED, spill_dir=tmp_path)
+    with restarted.pin("acme") as store:
+        assert len(store) == 51
+        store.create({"first_name": "New", "email": "new@x.test"})
+        with pytest.raises(ValueError):
+            store.create({"first_name": "Dup", "email": "N7@x.test"})  # index restored too
+    with restarted.pin("other") as store:
+        assert len(store) == 1  # never checkpointed: starts from the seed
+
+
+def test_unreadable_snapshot_falls_back_to_seed(tmp_path):
+    (tmp_path / "acme.contacts.snap").write_bytes(b"garbage")
+    shards = ContactShards(seed=SEED, spill_dir=tmp_path)
+    with shards.pin("acme") as store:
+        assert [c["id"] for c in store.snapshot()] == ["c1"]
+
+
+def test_periodic_checkpointing(tmp_path):
+    shards = ContactShards(seed=SEED, spill_dir=tmp_path)
+    shards.start_checkpointing(0.01)
+    try:
+        with shards.pin("acme") as store:
+            store.create({"first_name": "Bob", "email": "bob@x.test"})
+        deadline = time.monotonic() + 2
+        while not (tmp_path / "acme.contacts.snap").exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        shards.stop_checkpointing()
+    _field, rows, _index = read_snapshot(tmp_path / "acme.contacts.snap")
+    assert len(rows) == 2
+
+
+@pytest.mark.perf
+def test_restore_of_100k_contacts_is_fast(tmp_path):
+    """Restoring is one marshal.loads of the store's own dicts, no per-row work."""
+    store = ContactStore()
+    store.import_records({"first_name": f"N{i}", "city": "Paris", "email": f"n{i}@x.test"} for i in range(100_000))
+    _version, rows, index = store.dump()
+    write_snapshot(tmp_path / "big.snap", "email", rows, index)
+
+    started = time.perf_counter()
+    restored = ContactStore()
+    _field, rows, index = read_snapshot(tmp_path / "big.snap")
+    restored.restore(rows, index)
+    elapsed = time.perf_counter() - started
+    assert len(restored) == 100_000
+    assert elapsed < 1.0, f"restored {len(restored):,} contacts in {elapsed * 1000:.0f} ms"
@@ -0,0 +1,171 @@
+# supervaize_hello_world/tests/test_contacts_store_concurrency.py
+"""Concurrency stress tests for the lock-striped ContactStore.
+
+FastAPI runs the sync DataResource callbacks in a threadpool; these tests hammer
+the store from many threads and check that no write is lost and that readers
+never observe a half-applied import.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import contacts_store
+from contacts_store import ContactStore, DuplicateContactError
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def aggressive_switching():
+    """Force frequent thread switches so races surface within a short test."""
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(previous)
+
+
+def _run_threads(count: int, target) -> None:
+    start = threading.Barrier(count)
+
+    def runner(n: int) -> None:
+        start.wait()
+        target(n)
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        list(pool.map(runner, range(count)))
+
+
+def test_concurrent_merge_updates_lose_nothing():
+    """Concurrent partial updates of one contact all survive the merge."""
+    store = ContactStore()
+    contact = store.create({"first_name": "Alice", "email": "alice@example.com"})
+    per_thread = 200
+
+    _run_threads(THREADS, lambda n: [store.update(contact["id"], {f"t{n}_{i}": i}) for i in range(per_thread)])
+
+    final = store.get(contact["id"])
+    assert len([k for k in final if k.startswith("t")]) == THREADS * per_thread
+    assert final["first_name"] == "Alice"
+
+
+def test_concurrent_read_modify_write_is_atomic():
+    """apply() increments from many threads add up exactly."""
+    store = ContactStore()
+    contact = store.create({"first_name": "Counter", "hits": 0})
+    per_thread = 500
+
+    def bump(_n: int) -> None:
+        for _ in range(per_thread):
+            store.apply(contact["id"], lambda c: {**c, "hits": c["hits"] + 1})
+
+    _run_threads(THREADS, bump)
+    assert store.get(contact["id"])["hits"] == THREADS * per_thread
+
+
+def test_concurrent_creates_keep_email_unique():
+    """Racing creates of the same email admit exactly one winner."""
+    store = ContactStore()
+    winners = []
+
+    def create(n: int) -> None:
+        try:
+            winners.append(store.create({"first_name": f"T{n}", "email": "same@example.com"}))
+        except ValueError:
+            pass
+
+    _run_threads(THREADS, create)
+    assert len(winners) == 1
+    assert len(store) == 1
+
+
+def test_concurrent_creates_insert_in_id_order():
+    """Listing relies on insertion order being id order."""
+    store = ContactStore()
+    _run_threads(THREADS, lambda n: [store.create({"first_name": f"T{n}-{i}"}) for i in range(200)])
+    ids = [c["id"] for c in store.snapshot()]
+    assert len(ids) == THREADS * 200 and ids == sorted(ids)
+
+
+def test_id_collision_keeps_the_unique_index_on_the_new_row(monkeypatch):
+    store = ContactStore()
+    store.reset([{"id": "01TAKEN", "first_name": "Alice", "email": "alice@x.test"}])
+    drawn = iter([["01TAKEN"], ["01FRESH"]])
+    monkeypatch.setattr(contacts_store, "new_ulids", lambda count=1: next(drawn))
+
+    created = store.create({"first_name": "Bob", "email": "bob@x.test"})
+    assert created["id"] == "01FRESH"
+    with pytest.raises(DuplicateContactError) as duplicate:
+        store.update("01TAKEN", {"email": "bob@x.test"})
+    assert duplicate.value.owner == "01FRESH"
+    assert store.delete("01FRESH") and store.update("01TAKEN", {"email": "bob@x.test"})["email"] == "bob@x.test"
+
+
+def test_snapshot_never_sees_half_applied_import():
+    """A list or page taken while imports run contains whole batches only."""
+    store = ContactStore()
+    batch, batches = 500, 10
+    sizes: list[int] = []
+    done = threading.Event()
+
+    def reader() -> None:
+        while not done.is_set():
+            sizes.append(len(store.snapshot()))
+            sizes.append(len(store.page()))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for b in range(batches):
+        store.import_records({"first_name": f"B{b}", "email": f"b{b}_{i}@example.com"} for i in range(batch))
+    done.set()
+    thread.join()
+
+    assert len(store) == batch * batches
+    assert sizes and all(size % batch == 0 for size in sizes)
+
+
+def test_pages_are_rebuilt_after_every_write():
+    store = ContactStore()
+    ids = [store.create({"first_name": f"N{i}"})["id"] for i in range(5)]
+    assert [c["id"] for c in store.page(1, 2)] == ids[1:3]
+    store.update(ids[1], {"city": "Paris"})
+    store.delete(ids[2])
+    created = store.create({"first_name": "N5"})
+    assert [c["id"] for c in store.page(1)] == [ids[1], ids[3], ids[4], created["id"]]
+    assert store.page(1, 1)[0]["city"] == "Paris"
+
+
+def test_paged_iteration_survives_writes_between_pages():
+    """Every contact present throughout is yielded once; new ones come last."""
+    store = ContactStore()
+    ids = [store.create({"first_name": f"N{i}"})["id"] for i in range(10)]
+    seen: list[str] = []
+    for number, page in enumerate(store.iter_pages(size=3)):
+        seen += [c["id"] for c in page]
+        if number == 0:
+            store.delete(ids[1])  # already yielded: shifts the rest back
+            store.delete(ids[2])  # last of the page: resume after ids[0]
+            store.update(ids[4], {"city": "Paris"})
+        elif number == 1:
+            store.delete(ids[7])  # not yielded yet
+            created = store.create({"first_name": "N10"})["id"]
+    assert seen == ids[:7] + ids[8:] + [created]
+
+
+def test_writer_holding_a_stripe_blocks_only_its_rows():
+    """A slow write delays its own stripe only: reads and other rows go on."""
+    store = ContactStore()
+    ids = [store.create({"first_name": f"N{i}"})["id"] for i in range(64)]
+    busy = ids[0]
+    elsewhere = next(i for i in ids if store._stripe(i) is not store._stripe(busy))
+    same_stripe = threading.Event()
+    with store._gate.shared(), store._stripe(busy):  # a writer in the middle of updating ``busy``
+        assert store.get(busy)["first_name"] == "N0"
+        assert store.update(elsewhere, {"city": "Paris"})["city"] == "Paris"
+        assert store.create({"first_name": "New"})["id"] in store._rows
+        writer = threading.Thread(target=lambda: store.update(busy, {"city": "Rome"}) and same_stripe.set())
+        writer.start()
+        assert not same_stripe.wait(0.2)
+    writer.join(5)
+    assert same_stripe.is_set() and store.get(busy)["city"] == "Rome"
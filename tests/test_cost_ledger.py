@@ -0,0 +1,93 @@
+# supervaize_hello_world/tests/test_cost_ledger.py
+"""Cost ledger: real case costs only, exact totals and per-job aggregates."""
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from supervaizer import JobContext, JobInstructions
+
+import agent_simple
+from cost_ledger import CostLedger, case_cost, cost_ledgers
+
+
+def test_case_cost_reads_what_the_case_reported():
+    assert case_cost(SimpleNamespace(total_cost=3.0, calculated_cost=2.0)) == 3.0
+    assert case_cost(SimpleNamespace(total_cost=0.0, calculated_cost=2.0)) == 2.0  # still open
+    assert case_cost({"cost": 0.04}) == 0.04
+    assert case_cost(SimpleNamespace(total_cost=0.0)) == 0.0
+    assert case_cost(SimpleNamespace(id="C1")) is None  # no made-up cost
+
+
+def test_totals_are_exact_and_budget_checks_use_them():
+    ledger = CostLedger("job", max_cost=1.0)
+    for n in range(10):
+        ledger.record(f"C{n}", "completed", 0.1)
+    ledger.record("C10", "completed", None)
+    ledger.record("C11", "failed")
+    assert sum([0.1] * 10) < 1.0 and ledger.total_cost == 1.0
+    allowed, explanation = ledger.check(JobInstructions(max_cost=1.0))
+    assert not allowed and "Max cost" in explanation
+    assert ledger.check(None) == (True, "No conditions")
+    summary = ledger.summary()
+    assert summary["cases"] == 12 and summary["unpriced"] == 2
+    assert summary["statuses"] == {"completed": 11, "failed": 1, "timeout": 0, "cancelled": 0, "cached": 0}
+    assert summary["budget"] == {"max_cost": 1.0, "remaining": 0.0}
+
+
+def test_cached_cases_are_not_charged_again():
+    ledger = CostLedger("job", max_cost=2.0)
+    ledger.record("C1", "completed", 1.5)
+    ledger.record("C2", "cached", 1.5)
+    ledger.record("C3", "cached", 1.5)
+    assert ledger.total_cost == 1.5 and ledger.completed == 3
+    assert ledger.check(JobInstructions(max_cost=2.0))[0]
+    summary = ledger.summary()
+    assert summary["total_cost"] == 1.5 and summary["cached_cost"] == 3.0
+    assert summary["statuses"]["cached"] == 2 and summary["unpriced"] == 0
+    assert summary["cost"]["max"] == 1.5 and summary["mean_cost"] == 1.5
+
+
+def test_summary_percentiles_durations_and_outliers():
+    ledger = CostLedger("job")
+    futures = {}
+    for n in range(100):
+        futures[f"C{n}"] = future = Future()
+        ledger.watch(f"C{n}", future)
+    for n, future in enumerate(futures.values()):
+        future.set_result(None)
+        ledger.record(f"C{n}", "completed", 500.0 if n == 42 else float(n % 10))
+    summary = ledger.summary()
+    assert summary["cost"]["p50"] == 5.0 and summary["cost"]["max"] == 500.0
+    assert summary["outliers"] == [{"case_id": "C42", "cost": 500.0}]
+    assert 0 <= summary["duration"]["p99"] < 1
+    assert summary["cost_per_second"] > 0
+    assert len(ledger.costs.tobytes()) == 800 and len(ledger.statuses.tobytes()) == 100
+
+
+def test_job_reports_its_ledger(monkeypatch):
+    class Case:
+        def __init__(self) -> None:
+            self.updates = []
+            self.total_cost = 0.0
+
+        def update_sync(self, update) -> None:
+            self.updates.append(update)
+
+        def close_sync(self, case_result) -> None:
+            self.total_cost = sum(update.cost for update in self.updates)
+
+    monkeypatch.setattr(agent_simple.Case, "start_sync", classmethod(lambda cls, **kw: Case()))
+    monkeypatch.setattr(agent_simple.random, "uniform", lambda low, high: 0.0 if high == 5 else 2.5)
+    context = JobContext(
+        workspace_id="ws",
+        job_id="ledger-job",
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+    response = agent_simple.job_start(fields={"How many times to say hello": "4"}, context=context)
+    costs = response.payload["costs"]
+    assert costs["total_cost"] == 10.0 and costs["unpriced"] == 0
+    assert costs["statuses"]["completed"] == 4
+    assert cost_ledgers.summary("ledger-job") is None  # only running jobs are listed
@@ -5,6 +5,7 @@ These tests verify the full data resource lifecycle:
 list → get → create → update → delete → import
 All without a real network — TestClient exercises the actual route handlers.
 """
+import json
 
 BASE = "/api/agents/hello-world-ai-agent/data/contacts"
 
@@ -113,6 +114,43 @@ def test_bulk_import(client):
     assert "frank@example.com" in emails
 
 
+def test_reimport_is_idempotent(client):
+    """Importing the same records twice upserts on email instead of duplicating."""
+    records = [
+        {"first_name": "Eve", "email": "eve@example.com"},
+        {"first_name": "Frank", "email": "frank@example.com"},
+    ]
+    client.post(f"{BASE}/import/", json=records)
+    result = client.post(f"{BASE}/import/", json=records).json()
+    assert result == {"created": 0, "updated": 0, "unchanged": 2, "total": 4}
+
+
+def test_import_upserts_existing_contact_by_email(client):
+    """A record matching a seeded email (case-insensitive) updates that contact."""
+    resp = client.post(f"{BASE}/import/", json=[{"email": "ALICE@example.com", "city": "Lyon"}])
+    assert resp.json() == {"created": 0, "updated": 1, "unchanged": 0, "total": 2}
+    assert client.get(f"{BASE}/c1").json()["city"] == "Lyon"
+
+
+def test_generated_ids_are_monotonic_ulids(client):
+    """Created and imported contacts get 26-char ULIDs that sort in creation order."""
+    first = client.post(f"{BASE}/", json={"first_name": "Gina", "email": "gina@example.com"}).json()["id"]
+    client.post(f"{BASE}/import/", json=[{"first_name": f"P{i}", "email": f"p{i}@example.com"} for i in range(50)])
+    ids = [c["id"] for c in client.get(f"{BASE}/").json()[2:]]
+    assert ids[0] == first
+    assert all(len(i) == 26 for i in ids)
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_create_duplicate_email_conflicts(client):
+    """POST /data/contacts/ with an email already in the index returns 409."""
+    resp = client.post(f"{BASE}/", json={"first_name": "Alice 2", "email": "alice@example.com"})
+    assert resp.status_code == 409
+    resp = client.put(f"{BASE}/c2", json={"email": "alice@example.com"})
+    assert resp.status_code == 409
+
+
 def test_unauthenticated_request_rejected():
     """Requests without API key are rejected."""
     from fastapi.testclient import TestClient
@@ -165,3 +203,55 @@ def test_controller_contract_endpoint_advertises_required_templates(client):
         ControllerEndpoint.CONTROLLER_CONTRACT,
     ]:
         assert endpoint.value in endpoints
+
+
+def test_export_ndjson_streams_rows_without_sensitive_fields(client):
+    """GET /data/contacts/export/ streams NDJSON and masks sensitive fields by default."""
+    resp = client.get(f"{BASE}/export/")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["id"] for r in rows] == ["c1", "c2"]
+    assert all("email" not in r for r in rows)
+
+
+def test_export_csv_with_projection_and_sensitive_opt_in(client):
+    """CSV export honors field projection; sensitive fields need include_sensitive=true."""
+    resp = client.get(f"{BASE}/export/", params={"format": "csv", "fields": "first_name,email"})
+    assert resp.status_code == 200
+    assert resp.text.splitlines() == ["first_name", "Alice", "Bob"]
+
+    resp = client.get(
+        f"{BASE}/export/",
+        params={"format": "csv", "fields": "first_name,email", "include_sensitive": "true"},
+    )
+    assert resp.text.splitlines() == ["first_name,email", "Alice,alice@example.com", "Bob,bob@example.com"]
+
+
+def test_export_unknown_field_rejected(client):
+    """Projection on an undeclared field returns 400."""
+    resp = client.get(f"{BASE}/export/", params={"fields": "phone"})
+    assert resp.status_code == 400
+
+
+def test_workspaces_are_isolated(client):
+    """Contacts created in one workspace are invisible to the others."""
+    acme = {"X-Supervaize-Workspace-Id": "ws-acme"}
+    resp = client.post(f"{BASE}/", json={"first_name": "Carol", "email": "carol@acme.test"}, headers=acme)
+    assert resp.status_code == 201
+    carol_id = resp.json()["id"]
+
+    assert len(client.get(f"{BASE}/", headers=acme).json()) == 3
+    assert len(client.get(f"{BASE}/").json()) == 2
+    assert client.get(f"{BASE}/{carol_id}", headers={"X-Supervaize-Workspace-Id": "ws-other"}).status_code == 404
+    export = client.get(f"{BASE}/export/", params={"include_sensitive": True}, headers=acme)
+    assert "carol@acme.test" in export.text
+
+
+def test_openapi_documents_the_served_routes_once(client, recwarn):
+    """The schema describes the async routes, not the SDK routes they shadow."""
+    client.app.openapi_schema = None
+    paths = client.get("/openapi.json").json()["paths"]
+    assert list(paths[f"{BASE}/"]["post"]["responses"]) == ["201", "422"]  # the SDK route answers 200
+    assert [p["name"] for p in paths[f"{BASE}/"]["get"]["parameters"]][:2] == ["skip", "limit"]
+    assert not [w for w in recwarn if "Duplicate Operation ID" in str(w.message)]
@@ -0,0 +1,93 @@
+# supervaize_hello_world/tests/test_deadlines.py
+"""Deadlines: max_duration bounds each case and its Case API calls, not only the job loop."""
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from supervaizer import EntityStatus, JobContext, JobInstructions
+
+import agent_simple
+from deadlines import DeadlineExceeded, call_with_deadline, case_deadline, job_deadline
+
+
+class _FakeCase:
+    def __init__(self) -> None:
+        self.id = "case"
+        self.calculated_cost = 0.0
+        self.closed_with = None
+
+    def update_sync(self, update) -> None:
+        self.calculated_cost += update.cost
+
+    def close_sync(self, case_result, final_cost=None) -> None:
+        self.closed_with = (case_result, final_cost)
+
+
+def test_call_with_deadline_gives_up_on_a_hung_call():
+    hung = threading.Event()
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="start case"):
+        call_with_deadline(time.time() + 0.1, hung.wait, 5, what="start case")
+    assert time.perf_counter() - start < 1
+    assert call_with_deadline(None, sum, [1, 2], what="sum") == 3
+    with pytest.raises(ZeroDivisionError):
+        call_with_deadline(time.time() + 1, lambda: 1 / 0, what="divide")
+
+
+def test_case_started_after_the_deadline_is_closed(monkeypatch):
+    """A Case.start_sync abandoned at the deadline that still creates its Case gets it closed as timed out."""
+    answer = threading.Event()
+    case = _FakeCase()
+
+    def slow_start(cls, **kwargs) -> _FakeCase:
+        answer.wait(5)
+        return case
+
+    monkeypatch.setattr(agent_simple.Case, "start_sync", classmethod(slow_start))
+    with pytest.raises(DeadlineExceeded, match="start case C1"):
+        agent_simple.custom_case_start("C1", "job", deadline=time.time() + 0.05)
+    assert case.closed_with is None
+    answer.set()  # the platform answers late
+    for _ in range(100):
+        if case.closed_with is not None:
+            break
+        time.sleep(0.01)
+    assert case.closed_with[0]["status"] == "timeout" and "after the deadline" in case.closed_with[0]["message"]
+
+
+def test_case_deadline_is_the_tightest_bound():
+    assert job_deadline(None) is None and job_deadline(JobInstructions()) is None
+    deadline = job_deadline(JobInstructions(max_duration=60))
+    assert 59 < deadline - time.time() <= 60
+    assert case_deadline(deadline, timeout=None) == deadline
+    assert case_deadline(deadline, timeout=1) - time.time() <= 1
+    assert case_deadline(time.time() + 0.5, timeout=10) - time.time() <= 0.5
+
+
+def test_slow_case_is_closed_as_timed_out_with_its_cost(monkeypatch):
+    case = _FakeCase()
+    monkeypatch.setattr(agent_simple.Case, "start_sync", classmethod(lambda cls, **kw: case))
+    monkeypatch.setattr(agent_simple.random, "uniform", lambda low, high: high)  # sleep 5s, cost 10
+    with pytest.raises(DeadlineExceeded):
+        agent_simple.custom_case_start("C1", "job", deadline=time.time() + 0.1)
+    result, cost = case.closed_with
+    assert result["status"] == "timeout" and cost == 0.0
+
+
+def test_max_duration_bounds_the_whole_job(monkeypatch):
+    monkeypatch.setattr(agent_simple.Case, "start_sync", classmethod(lambda cls, **kw: _FakeCase()))
+    monkeypatch.setattr(agent_simple.random, "uniform", lambda low, high: high)
+    context = JobContext(
+        workspace_id="ws",
+        job_id="slow-job",
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+        job_instructions=JobInstructions(max_duration=1),
+    )
+    start = time.perf_counter()
+    response = agent_simple.job_start(fields={"How many times to say hello": "3"}, context=context)
+    assert time.perf_counter() - start < 2.5
+    assert response.status == EntityStatus.COMPLETED
@@ -0,0 +1,79 @@
+# supervaize_hello_world/tests/test_dynamic_choices.py
+"""Dynamic choices: indexed prefix search, cache invalidation and the start-form routes."""
+import time
+
+from dynamic_choices import ChoiceCatalog, ChoiceIndex
+
+COUNTRIES_URL = "/api/supervaizer/agents/email-agent/start/dynamic_choices/countries"
+CONTACTS_URL = "/api/supervaizer/agents/email-agent/start/dynamic_choices/contacts"
+
+
+def test_prefix_matches_values_and_label_words_in_label_order():
+    index = ChoiceIndex([("PG", "Papua New Guinea"), ("PA", "Panama"), ("PY", "Paraguay"), ("PL", "Poland")])
+    assert index.search("pa") == [["PA", "Panama"], ["PG", "Papua New Guinea"], ["PY", "Paraguay"]]
+    assert index.search("GUI") == [["PG", "Papua New Guinea"]]
+    assert index.search("new  gu") == [["PG", "Papua New Guinea"]]
+    assert index.search("pl") == [["PL", "Poland"]]
+    assert index.search("", limit=2) == [["PA", "Panama"], ["PG", "Papua New Guinea"]]
+    assert index.search("x") == []
+
+
+def test_search_on_large_index_is_limited_and_fast():
+    index = ChoiceIndex((f"id{n}", f"Contact {n:06d}") for n in range(100_000))
+    start = time.perf_counter()
+    for _ in range(100):
+        found = index.search("contact 0420", limit=20)
+    assert (time.perf_counter() - start) / 100 < 0.01
+    assert found[0] == ["id42000", "Contact 042000"] and len(found) == 20
+
+
+def test_versioned_source_is_rebuilt_only_when_it_changes():
+    data = {"version": 1, "builds": 0}
+
+    def build(workspace_id):
+        data["builds"] += 1
+        return [(workspace_id, f"v{data['version']}")]
+
+    catalog = ChoiceCatalog()
+    catalog.register("k", build, version=lambda ws: data["version"], per_workspace=True)
+    assert catalog.search("k", workspace_id="a") == [["a", "v1"]]
+    assert catalog.search("k", workspace_id="a") == [["a", "v1"]]
+    assert catalog.search("k", workspace_id="b") == [["b", "v1"]]
+    assert data["builds"] == 2
+    data["version"] = 2
+    assert catalog.search("k", workspace_id="a") == [["a", "v2"]]
+    assert data["builds"] == 3
+
+
+def test_start_form_gets_first_options_of_each_key(client):
+    response = client.post(
+        "/api/supervaizer/agents/email-agent/start/dynamic_choices",
+        json={"workspace_id": "default", "mission_id": "m"},
+    )
+    assert response.status_code == 200
+    choices = response.json()["choices"]
+    assert set(choices) == {"countries", "languages", "contacts"}
+    assert ["PA", "Panama"] in choices["countries"]
+
+
+def test_search_route_filters_server_side(client):
+    assert client.get(COUNTRIES_URL, params={"q": "pa", "limit": 2}).json() == {
+        "key": "countries",
+        "choices": [["PA", "Panama"], ["PG", "Papua New Guinea"]],
+    }
+    assert client.get("/api/supervaizer/agents/email-agent/start/dynamic_choices/nope").status_code == 404
+    assert client.get("/api/supervaizer/agents/hello-world-ai-agent/start/dynamic_choices/countries").status_code == 404
+
+
+def test_contact_choices_follow_the_workspace_store(client):
+    assert client.get(CONTACTS_URL, params={"q": "ali"}).json()["choices"] == [["c1", "Alice Smith"]]
+    created = client.post(
+        "/api/agents/hello-world-ai-agent/data/contacts/",
+        json={"first_name": "Alison", "last_name": "Brie", "email": "alison@example.com"},
+    ).json()
+    labels = [label for _, label in client.get(CONTACTS_URL, params={"q": "ali"}).json()["choices"]]
+    assert labels == ["Alice Smith", "Alison Brie"]
+    assert created["id"] in [value for value, _ in client.get(CONTACTS_URL, params={"q": "brie"}).json()["choices"]]
+    assert client.get(CONTACTS_URL, params={"q": "example.com"}).json()["choices"] == []  # emails stay private
+    other = client.get(CONTACTS_URL, params={"q": "ali"}, headers={"X-Supervaize-Workspace-Id": "acme"}).json()["choices"]
+    assert [label for _, label in other] == ["Alice Smith"]
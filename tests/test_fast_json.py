@@ -0,0 +1,42 @@
+# supervaize_hello_world/tests/test_fast_json.py
+"""Fast JSON path: same bodies as JSONResponse, with or without orjson."""
+import json
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import fast_json
+from fast_json import FastJSONResponse, dumps
+
+ROWS = [
+    {"id": "c1", "first_name": "Zoë", "last_name": None, "score": 1.5, "active": True, "tags": ["a", "b"]},
+    {"id": "c2", "first_name": "Bob", "created_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)},
+    {"id": "c3", "owner": UUID("12345678-1234-5678-1234-567812345678"), "birthday": date(1990, 5, 17)},
+]
+
+
+@pytest.mark.parametrize("with_orjson", [True, False])
+def test_body_matches_the_default_encoder(monkeypatch, with_orjson):
+    if not with_orjson:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    elif fast_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    body = FastJSONResponse(ROWS).body
+    assert json.loads(body) == json.loads(JSONResponse(jsonable_encoder(ROWS)).body)
+    assert "Zoë".encode() in body and b", " not in body
+    with pytest.raises(TypeError):
+        dumps([{"id": "c4", "tags": {"a"}}])  # not JSON: no silent str()
+
+
+def test_trusted_contacts_routes_skip_encoding_but_keep_the_contract(client):
+    listed = client.get("/api/agents/hello-world-ai-agent/data/contacts/")
+    assert listed.headers["content-type"] == "application/json"
+    assert listed.content == dumps(listed.json())
+    created = client.post(
+        "/api/agents/hello-world-ai-agent/data/contacts/",
+        json={"first_name": "Dana", "email": "dana@example.com"},
+    )
+    assert created.status_code == 201 and created.json()["first_name"] == "Dana"
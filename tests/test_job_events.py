@@ -0,0 +1,149 @@
+# supervaize_hello_world/tests/test_job_events.py
+"""Job events: bounded drop-oldest subscriber buffers and the SSE stream of a job."""
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+
+from supervaizer import EntityStatus, Job, JobContext
+from supervaizer.job import Jobs
+
+import agent_simple
+from job_events import JobEventBus, Subscription, job_events, stream_events
+from supervaizer_control import simple_agent
+
+
+class _FakeCase:
+    id = "case"
+    calculated_cost = 0.0
+
+    def update_sync(self, update) -> None:
+        pass
+
+    def close_sync(self, case_result, final_cost=None) -> None:
+        pass
+
+
+def _parse(lines: list[str]) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+
+
+def test_full_buffer_drops_oldest_and_reports_the_loss():
+    async def scenario() -> list[dict]:
+        subscription = Subscription("j", maxlen=3, loop=asyncio.get_running_loop())
+        for n in range(5):
+            subscription.push({"id": n, "type": "case_update"})
+        return await subscription.next_batch(timeout=1)
+
+    batch = asyncio.run(scenario())
+    assert batch[0] == {"type": "dropped", "job_id": "j", "count": 2}
+    assert [event["id"] for event in batch[1:]] == [2, 3, 4]
+
+
+def test_events_published_from_worker_threads_reach_the_subscriber():
+    bus = JobEventBus(buffer=16)
+
+    async def scenario() -> list[dict]:
+        subscription = bus.subscribe("j")
+        threading.Thread(target=lambda: [bus.publish("j", "case_start", case_id=f"C{n}") for n in range(3)]).start()
+        received: list[dict] = []
+        while len(received) < 3:
+            received += await subscription.next_batch(timeout=1)
+        bus.unsubscribe(subscription)
+        return received
+
+    assert [event["case_id"] for event in asyncio.run(scenario())] == ["C0", "C1", "C2"]
+    assert bus.progress("j")["subscribers"] == 0
+
+
+def test_job_is_done_only_once_its_open_cases_are_closed():
+    bus = JobEventBus()
+    with bus.track("j") as events:
+        bus.publish("j", "case_start", case_id="C1")
+        bus.publish("j", "case_awaiting", case_id="C1")
+        events.end("completed", cases=1)
+    assert not bus.done("j") and bus.progress("j")["open_cases"] == ["C1"]
+    bus.publish("j", "case_close", case_id="C1", status="approved")
+    assert bus.done("j")
+
+
+def test_stream_replays_a_job_and_resumes_after_last_event_id(client, monkeypatch):
+    monkeypatch.setattr(agent_simple.Case, "start_sync", classmethod(lambda cls, **kw: _FakeCase()))
+    monkeypatch.setattr(agent_simple.random, "uniform", lambda low, high: low)
+    context = JobContext(
+        workspace_id="ws",
+        job_id="sse-job",
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+    agent_simple.job_start(fields={"How many times to say hello": "2"}, context=context)
+
+    with client.stream("GET", "/api/jobs/sse-job/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse(list(response.iter_lines()))
+    types = [event["type"] for event in events]
+    assert types[0] == "job_start" and types[-1] == "job_end"
+    assert types.count("case_start") == types.count("case_close") == 2
+    assert events[-1]["status"] == "completed" and events[-1]["cases"] == 2
+
+    with client.stream("GET", "/api/jobs/sse-job/events", headers={"Last-Event-ID": str(events[-2]["id"])}) as response:
+        assert _parse(list(response.iter_lines())) == events[-1:]
+
+
+def _sdk_job(job_id: str) -> Job:
+    context = JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+    return Job.new(job_context=context, agent_name=simple_agent.name)
+
+
+def test_unknown_job_is_not_found_and_not_recorded(client):
+    assert client.get("/api/jobs/no-such-job/events").status_code == 404
+    assert not job_events.knows("no-such-job")
+
+
+def test_stream_of_a_job_finished_without_events_ends(client):
+    job = _sdk_job("finished-elsewhere")
+    try:
+        job.status = EntityStatus.COMPLETED
+        with client.stream("GET", "/api/jobs/finished-elsewhere/events") as response:
+            assert response.status_code == 200
+            assert _parse(list(response.iter_lines())) == []
+        assert not job_events.knows("finished-elsewhere")
+    finally:
+        Jobs().jobs_by_agent[simple_agent.name].pop(job.id)
+
+
+def test_stream_ends_when_an_untracked_job_finishes():
+    bus = JobEventBus()
+    status = {"finished": False}
+
+    class _Request:
+        async def is_disconnected(self) -> bool:
+            return False
+
+    async def scenario() -> list[str]:
+        stream = stream_events(bus, _Request(), "j", heartbeat=0.01, finished=lambda job_id: status["finished"])
+        messages = [await anext(stream), await anext(stream)]  # retry, then a keep-alive while it runs
+        status["finished"] = True
+        return messages + [message async for message in stream]
+
+    messages = asyncio.run(scenario())
+    assert messages[0].startswith("retry:") and all(m.startswith(": keep-alive") for m in messages[1:])
+
+
+def test_distributed_stream_opens_with_a_notice(client, monkeypatch):
+    monkeypatch.setenv("SUPERVAIZER_EXECUTION_MODE", "distributed")
+    with job_events.track("distributed-job"):
+        pass
+    with client.stream("GET", "/api/jobs/distributed-job/events") as response:
+        events = _parse(list(response.iter_lines()))
+    assert [event["type"] for event in events] == ["notice", "job_start", "job_end"]
+    assert "not streamed" in events[0]["message"]
@@ -0,0 +1,82 @@
+# supervaize_hello_world/tests/test_platform_http.py
+"""Platform HTTP pool: account_service calls share keep-alive connections, with stats."""
+import asyncio
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from supervaizer import account_service
+
+from platform_http import PlatformHTTP, http2_enabled, install_platform_http
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def platform_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/event"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sequential_calls_reuse_one_connection(platform_url):
+    platform_http = PlatformHTTP(max_connections=4)
+    for _ in range(5):
+        assert platform_http.client.post(platform_url, json={"n": 1}).status_code == 200
+
+    async def post_concurrently() -> None:
+        await asyncio.gather(*(platform_http.async_client.post(platform_url, json={}) for _ in range(8)))
+        await platform_http.async_client.aclose()
+
+    asyncio.run(post_concurrently())
+    stats = platform_http.stats()
+    assert stats["sync"]["requests"] == 5 and stats["sync"]["connections_opened"] == 1
+    assert stats["sync"]["reuse_rate"] == 0.8 and stats["sync"]["active"] == 0
+    assert stats["sync"]["pool"] == {"open": 1, "idle": 1, "http2": 0}
+    assert stats["async"]["requests"] == 8 and 1 <= stats["async"]["connections_opened"] <= 4
+    assert stats["async"]["peak_active"] > 1
+    platform_http.client.close()
+
+
+def test_install_closes_the_clients_it_replaces(monkeypatch):
+    previous, previous_async = httpx.Client(), httpx.AsyncClient()
+    monkeypatch.setattr(account_service, "_sync_httpx_client", previous)
+    monkeypatch.setattr(account_service, "_httpx_client", previous_async)
+    platform_http = install_platform_http(SimpleNamespace(app=FastAPI()), workers=2)
+    assert previous.is_closed and previous_async.is_closed
+
+    async def install_on_a_running_loop() -> None:  # e.g. the app imported by uvicorn
+        install_platform_http(SimpleNamespace(app=FastAPI()), workers=2)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(install_on_a_running_loop())
+    assert platform_http.client.is_closed and platform_http.async_client.is_closed
+    account_service._sync_httpx_client.close()
+
+
+def test_installed_for_account_service(client):
+    assert account_service._sync_httpx_client is client.app.state.platform_http.client
+    assert account_service._httpx_client is client.app.state.platform_http.async_client
+    stats = client.get("/api/platform-http").json()
+    assert stats["max_connections"] >= 1 and "reuse_rate" in stats["sync"]
+    assert http2_enabled("0") is False and http2_enabled("true") is True
@@ -0,0 +1,82 @@
+# supervaize_hello_world/tests/test_profiler.py
+"""Sampling profiler: collapsed stacks of the whole process or of one job's threads."""
+import threading
+import time
+from datetime import datetime, timezone
+
+from supervaizer import JobContext
+
+from profiler import ProfilerControl, SamplingProfiler
+from scheduler import CaseScheduler
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _other_work(stop: threading.Event) -> None:
+    while not stop.is_set():
+        _spin(0.01)
+
+
+def _context(job_id: str) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+
+
+def test_samples_are_collapsed_stacks_of_the_busy_thread():
+    worker = threading.Thread(target=_spin, args=(0.3,))
+    worker.start()
+    profiler = SamplingProfiler(interval=0.005, threads=lambda: {worker.ident})
+    profiler.start(seconds=0.2)
+    worker.join()
+    profiler.stop()
+
+    lines = profiler.collapsed().splitlines()
+    assert profiler.samples > 5 and lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("_spin (test_profiler.py:")
+
+
+def test_job_profile_follows_the_job_threads_and_stops_with_the_job():
+    scheduler = CaseScheduler(workers=2)
+    control = ProfilerControl(scheduler, max_seconds=5)
+    stop = threading.Event()
+    noise = threading.Thread(target=_other_work, args=(stop,))
+    noise.start()
+    control.start(interval=0.005, job_id="profiled")
+    with scheduler.job(_context("profiled"), expected_cases=2) as job:
+        for _ in range(2):
+            job.submit(_spin, 0.15)
+        list(job.wait())
+    deadline = time.monotonic() + 2
+    while control.status()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    noise.join()
+
+    assert not control.status()["running"] and control.status()["job_id"] == "profiled"
+    profile = control.stop()
+    assert "_spin (test_profiler.py:" in profile
+    assert "_other_work" not in profile
+
+
+def test_routes_need_the_api_key_and_run_one_profile_at_a_time(client):
+    assert client.post("/api/profiler/start", headers={"X-API-Key": "wrong"}).status_code == 401
+    started = client.post("/api/profiler/start", params={"seconds": 5, "interval": 0.005})
+    assert started.status_code == 200 and started.json()["running"]
+    assert client.post("/api/profiler/start").status_code == 409
+    time.sleep(0.05)
+    stopped = client.post("/api/profiler/stop")
+    assert stopped.headers["content-type"].startswith("text/plain")
+    assert client.get("/api/profiler/").json()["running"] is False
+    assert client.get("/api/profiler/profile").text == stopped.text
@@ -0,0 +1,141 @@
+# supervaize_hello_world/tests/test_scheduler.py
+"""Priority case scheduler: class-weighted fairness across missions and job windows."""
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+from supervaizer import EntityStatus, JobContext, JobInstructions
+
+import agent_simple
+from scheduler import BATCH, INTERACTIVE, NORMAL, CaseScheduler
+
+
+def _context(job_id: str, mission_id: str, started_by: str = "alice", **instructions) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by=started_by,
+        started_at=datetime.now(timezone.utc),
+        mission_id=mission_id,
+        mission_name=mission_id,
+        job_instructions=JobInstructions(**instructions) if instructions else None,
+    )
+
+
+def test_classification_uses_overrides_then_size():
+    scheduler = CaseScheduler(mission_classes={"nightly": BATCH}, user_classes={"ops-bot": NORMAL})
+    assert scheduler.classify(_context("j", "m"), 1) == INTERACTIVE
+    assert scheduler.classify(_context("j", "m"), 50) == NORMAL
+    assert scheduler.classify(_context("j", "m"), 10_000) == BATCH
+    assert scheduler.classify(_context("j", "nightly"), 1) == BATCH
+    assert scheduler.classify(_context("j", "m", started_by="ops-bot"), 1) == NORMAL
+
+
+def test_interactive_case_overtakes_a_running_batch():
+    """With the only worker busy on a batch, the next dispatch goes to the interactive job."""
+    scheduler = CaseScheduler(workers=1, window=50)
+    order: list[str] = []
+    gate = threading.Event()
+
+    def case(name: str) -> None:
+        gate.wait(5)
+        order.append(name)
+
+    with scheduler.job(_context("batch", "m-batch"), expected_cases=10_000) as batch:
+        for i in range(20):
+            batch.submit(case, f"b{i}")
+        while scheduler.stats()["running"] != 1:
+            time.sleep(0.001)
+        with scheduler.job(_context("quick", "m-ui"), expected_cases=1) as quick:
+            quick.submit(case, "interactive")
+            assert scheduler.job_stats("quick") == {"class": INTERACTIVE, "queued": 1, "running": 0, "done": 0}
+            gate.set()
+            list(quick.wait())
+        list(batch.wait())
+
+    assert order.index("interactive") == 1
+    assert len(order) == 21
+
+
+def test_weighted_share_across_missions():
+    """Two saturating missions of the same class split the workers evenly, whatever their backlog."""
+    scheduler = CaseScheduler(workers=1, window=1000)
+    order: list[str] = []
+    gate = threading.Event()
+
+    def case(name: str) -> None:
+        gate.wait(5)
+        order.append(name)
+
+    with scheduler.job(_context("a", "m-a"), 500) as a, scheduler.job(_context("b", "m-b"), 500) as b:
+        for i in range(200):
+            a.submit(case, "a")
+        for i in range(40):
+            b.submit(case, "b")
+        gate.set()
+        list(a.wait())
+        list(b.wait())
+
+    first = order[:60]
+    assert abs(first.count("a") - first.count("b")) <= 2
+
+
+def test_window_bounds_in_flight_cases():
+    scheduler = CaseScheduler(workers=8, window=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def case() -> None:
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.005)
+        with lock:
+            running.pop()
+
+    with scheduler.job(_context("j", "m"), 20) as job:
+        for _ in range(20):
+            job.submit(case)
+        list(job.wait())
+    assert max(peak) <= 2
+    assert scheduler.stats()["flows"] == []
+
+
+def test_agent_job_start_runs_cases_through_scheduler(monkeypatch):
+    """job_start respects max_cases while cases run concurrently on the scheduler."""
+    started: list[str] = []
+
+    def fake_case(case_id: str, job_id: str, **kwargs):
+        started.append(case_id)
+        time.sleep(0.002)
+        return object()
+
+    monkeypatch.setattr(agent_simple, "custom_case_start", fake_case)
+    response = agent_simple.job_start(
+        fields={"How many times to say hello": "12"},
+        context=_context("job-1", "m", max_cases=7),
+    )
+    assert len(started) == 7
+    assert response.status == EntityStatus.COMPLETED
+    assert agent_simple.job_status(context=_context("job-1", "m")) == {"status": "idle", "job_id": "job-1"}
+
+
+class _FinishesWhenLookedAt(Future):
+    """Not done at the first ``done()`` check, done from the next one on."""
+
+    def done(self) -> bool:
+        finished = super().done()
+        if not finished:
+            self.set_result("late")
+        return finished
+
+
+def test_cases_finishing_during_collection_are_not_lost():
+    scheduler = CaseScheduler(workers=1)
+    with scheduler.job(_context("racy", "m"), expected_cases=20) as job:
+        job._pending = [_FinishesWhenLookedAt() for _ in range(20)]
+        collected = list(job.completed())
+        collected += list(job.wait())
+    assert len(collected) == 20 and job.in_flight == 0
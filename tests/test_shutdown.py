@@ -0,0 +1,155 @@
+# supervaize_hello_world/tests/test_shutdown.py
+"""Graceful shutdown: refuse new jobs, drain in-flight cases, settle open Cases."""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from supervaizer import EntityStatus, JobContext
+from supervaizer.access.api_auth import API_KEYS
+
+import shutdown as shutdown_module
+from admission import AdmissionController, AdmissionMiddleware
+from scheduler import CaseScheduler, SchedulerClosedError
+from shutdown import INTERRUPTED_RESULT, GracefulShutdown, install_graceful_shutdown
+
+
+def _context(job_id: str) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+
+
+class _FakeCase:
+    def __init__(self, status: EntityStatus, cost: float = 0.0) -> None:
+        self.id = f"case-{status.value}"
+        self.job_id = "j"
+        self.status = status
+        self.calculated_cost = cost
+        self.closed_with = None
+
+    def close_sync(self, case_result, final_cost=None) -> None:
+        self.closed_with = (case_result, final_cost)
+        self.status = EntityStatus.COMPLETED
+
+
+def test_drain_lets_in_flight_cases_finish_and_stops_the_job():
+    scheduler = CaseScheduler(workers=2, window=2)
+    handler = GracefulShutdown(AdmissionController(), scheduler, timeout=5, poll_interval=0.01)
+    outcome: dict = {}
+
+    def job_loop() -> None:
+        done = []
+        with scheduler.job(_context("long"), expected_cases=100) as job:
+            try:
+                for i in range(100):
+                    job.submit(time.sleep, 0.05)
+            except SchedulerClosedError:
+                outcome["interrupted_at"] = i
+            done = [f for f in job.wait()]
+        outcome["finished"] = [f.exception() is None and not f.cancelled() for f in done]
+
+    thread = threading.Thread(target=job_loop)
+    thread.start()
+    time.sleep(0.12)
+    report = asyncio.run(handler.drain(cases=list))
+    thread.join(1)
+
+    assert report["drained"] and report["cancelled_cases"] == 0
+    assert 0 < outcome["interrupted_at"] < 100
+    assert outcome["finished"] and all(outcome["finished"])
+    assert handler.idle()
+
+
+def test_deadline_cancels_queued_cases_and_settles_open_cases(monkeypatch):
+    scheduler = CaseScheduler(workers=1, window=5)
+    handler = GracefulShutdown(AdmissionController(), scheduler, timeout=0.1, poll_interval=0.01)
+    release = threading.Event()
+    checkpointed: list = []
+    monkeypatch.setattr(shutdown_module, "checkpoint_case", checkpointed.append)
+    running, awaiting = _FakeCase(EntityStatus.IN_PROGRESS, cost=3.5), _FakeCase(EntityStatus.AWAITING)
+    flushed: list[bool] = []
+    handler.add_hook(lambda: flushed.append(True))
+
+    with scheduler.job(_context("stuck"), expected_cases=2) as job:
+        job.submit(release.wait, 5)
+        queued = job.submit(time.sleep, 0)
+        report = asyncio.run(handler.drain(cases=lambda: [running, awaiting]))
+        release.set()
+        list(job.wait())
+
+    assert not report["drained"] and report["cancelled_cases"] == 1
+    assert queued.cancelled()
+    assert running.closed_with == (INTERRUPTED_RESULT, 3.5)
+    assert checkpointed == [awaiting] and awaiting.closed_with is None
+    assert (report["closed_cases"], report["checkpointed_cases"]) == (1, 1)
+    assert flushed == [True]
+
+
+def test_app_shutdown_drains_and_draining_refuses_job_starts():
+    app = FastAPI()
+    app.state.server = SimpleNamespace(api_key="secret")
+
+    @app.post("/api/supervaizer/agents/demo/jobs", status_code=202)
+    async def start_job() -> dict:
+        return {"status": "accepted"}
+
+    controller = AdmissionController()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    scheduler = CaseScheduler(workers=1)
+    handler = install_graceful_shutdown(SimpleNamespace(app=app), controller, scheduler, timeout=1)
+    reports: list[dict] = []
+    original = handler.drain
+
+    async def recording_drain(cases=list):
+        reports.append(await original(cases=cases))
+        return reports[-1]
+
+    handler.drain = recording_drain
+
+    with TestClient(app, headers={"X-API-Key": "secret"}) as client:
+        assert client.post("/api/supervaizer/agents/demo/jobs").status_code == 202
+        with patch.dict(API_KEYS, {"read-only": {"scope": "read"}}):
+            assert client.post("/api/shutdown/drain", headers={"X-API-Key": "read-only"}).status_code == 403
+        assert not handler.draining
+        drained = client.post("/api/shutdown/drain")
+        assert drained.json() == {"draining": True, "in_flight": {"jobs": 0, "queued_cases": 0, "running_cases": 0}}
+        refused = client.post("/api/supervaizer/agents/demo/jobs")
+        assert refused.status_code == 503 and refused.headers["Retry-After"]
+    assert len(reports) == 1 and reports[0]["drained"]
+    assert scheduler.closed
+
+
+def test_interrupted_job_is_finished_on_the_platform(monkeypatch, client):
+    """A job cut short by a drain still goes through the SDK's finish path with its cases and cost."""
+    import agent_simple
+    from supervaizer import Job
+    from supervaizer_control import simple_agent
+
+    scheduler = CaseScheduler(workers=1)
+    monkeypatch.setattr(agent_simple, "case_scheduler", scheduler)
+
+    def case_then_drain(case_id: str, job_id: str, **kwargs) -> SimpleNamespace:
+        scheduler.close()  # the server starts draining while the first case runs
+        return SimpleNamespace(id=case_id, total_cost=2.0)
+
+    monkeypatch.setattr(agent_simple, "custom_case_start", case_then_drain)
+    events: list = []
+    server = SimpleNamespace(supervisor_account=SimpleNamespace(send_event_sync=lambda sender, event: events.append(event)))
+    job = Job.new(job_context=_context("drained-job"), agent_name=simple_agent.name)
+
+    simple_agent.job_start(job, {"How many times to say hello": "5"}, job.job_context, server)
+
+    assert job.status == EntityStatus.CANCELLED and job.finished_at is not None
+    costs = job.payload["costs"]
+    assert 0 < costs["cases"] < 5 and costs["total_cost"] == 2.0 * costs["statuses"]["completed"]
+    assert [type(event).__name__ for event in events] == ["JobStartConfirmationEvent", "JobFinishedEvent"]
@@ -0,0 +1,50 @@
+# supervaize_hello_world/tests/test_static_cache.py
+"""Static cache: precomputed pages with content negotiation, ETags and Cache-Control."""
+from pathlib import Path
+
+from static_cache import CachedBody
+
+INSTRUCTIONS_URL = "/api/supervaizer/agents/email-agent/supervaize_instructions.html"
+
+
+def test_negotiation_follows_accept_encoding_and_skips_small_bodies():
+    body = CachedBody(b"hello " * 500, "text/plain")
+    assert body.negotiate("gzip, deflate") == "gzip"
+    assert body.negotiate("gzip;q=0, identity") == "identity"
+    assert body.negotiate("*") == ("br" if "br" in body.variants else "gzip")
+    assert body.negotiate("") == "identity"
+    assert len(body.variants["gzip"][0]) < len(body.variants["identity"][0])
+    assert set(CachedBody(b"tiny", "text/plain").variants) == {"identity"}
+
+
+def test_landing_page_is_compressed_and_revalidated_with_etag(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content == Path("index.html").read_bytes()
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    etag = response.headers["etag"]
+
+    revalidated = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    plain = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] != etag
+
+
+def test_instructions_page_keeps_the_api_key_check(client):
+    page = client.get(INSTRUCTIONS_URL)
+    assert page.status_code == 200 and "Email Agent" in page.text
+    assert page.headers["cache-control"].startswith("private")
+    assert client.get(INSTRUCTIONS_URL, headers={"X-API-Key": "wrong"}).status_code == 401
+
+
+def test_context_is_rebuilt_only_when_the_server_url_changes(client, monkeypatch):
+    import main
+
+    first = client.get("/api/context")
+    assert first.json() == main.api_context()
+    assert client.get("/api/context").headers["etag"] == first.headers["etag"]
+    monkeypatch.setattr(main.sv_server, "public_url", "https://agents.example.com")
+    moved = client.get("/api/context")
+    assert moved.json()["public_url"] == "https://agents.example.com"
+    assert moved.headers["etag"] != first.headers["etag"]
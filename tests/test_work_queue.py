@@ -0,0 +1,211 @@
+# supervaize_hello_world/tests/test_work_queue.py
+"""Distributed execution: brokers, leases, accounting and scale-out across workers."""
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from supervaizer import JobContext
+
+from deadlines import DeadlineExceeded
+from scheduler import CaseScheduler
+from work_queue import (
+    InProcessBroker,
+    RemoteCaseError,
+    RemoteExecutor,
+    SQLiteBroker,
+    Task,
+    configure_distributed_execution,
+    decode_call,
+    decode_error,
+    encode_call,
+    run_worker,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CASE_SECONDS = 0.05
+
+
+def slow_case(case_id: str, cost: float = 1.0) -> dict:
+    time.sleep(CASE_SECONDS)
+    return {"case_id": case_id, "cost": cost}
+
+
+def failing_case(case_id: str) -> None:
+    raise ValueError(f"case {case_id} exploded")
+
+
+def expired_case(case_id: str) -> None:
+    raise DeadlineExceeded(f"case {case_id} ran past its deadline")
+
+
+def _context(job_id: str) -> JobContext:
+    return JobContext(
+        workspace_id="ws",
+        job_id=job_id,
+        started_by="alice",
+        started_at=datetime.now(timezone.utc),
+        mission_id="m",
+        mission_name="m",
+    )
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def broker(request, tmp_path):
+    return InProcessBroker() if request.param == "memory" else SQLiteBroker(str(tmp_path / "queue.db"))
+
+
+def test_call_payload_round_trips_pydantic_models():
+    context = _context("j1")
+    args, kwargs = decode_call(encode_call(("C1",), {"context": context, "fields": {"n": 3}}))
+    assert args == ["C1"]
+    assert kwargs["context"] == context
+    assert kwargs["fields"] == {"n": 3}
+    with pytest.raises(TypeError, match="datetime"):
+        encode_call((), {"started": datetime.now(timezone.utc)})
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_expired_lease_is_retried_and_stale_result_ignored(kind, tmp_path):
+    # Only for functions declared safe to retry: cases run at most once.
+    broker = InProcessBroker(max_attempts=2) if kind == "memory" else SQLiteBroker(str(tmp_path / "q.db"), max_attempts=2)
+    broker.put(Task("t1", "j1", "tests.test_work_queue.slow_case", encode_call(("C1",), {})))
+    first = broker.claim("w1", lease=0.01)
+    time.sleep(0.02)
+    second = broker.claim("w2", lease=10)
+    assert (first.id, second.id, second.attempts) == ("t1", "t1", 2)
+    assert not broker.finish("t1", "w1", True, "1")  # w1 lost its lease
+    assert broker.finish("t1", "w2", True, "2")
+    assert broker.collect(["t1"]) == {"t1": (True, "2")}
+    assert broker.collect(["t1"]) == {}
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_lost_worker_fails_the_case_without_running_it_again(kind, tmp_path):
+    # The case may have opened its platform Case before the worker died.
+    broker = InProcessBroker() if kind == "memory" else SQLiteBroker(str(tmp_path / "q.db"))
+    broker.put(Task("t1", "j1", "tests.test_work_queue.slow_case", encode_call(("C1",), {})))
+    broker.claim("w1", lease=0.01)
+    time.sleep(0.02)
+    assert broker.claim("w2") is None
+    ok, value = broker.collect(["t1"])["t1"]
+    assert not ok and str(decode_error(value)) == "worker lost after 1 attempts"
+
+
+def test_job_accounting_is_exact_with_distributed_workers(broker):
+    scheduler = CaseScheduler(workers=16, window=16)
+    scheduler.runner = RemoteExecutor(broker, poll_interval=0.01).run
+    stop = threading.Event()
+    run_worker(broker, concurrency=8, worker_id="w", poll_interval=0.01, stop=stop)
+    try:
+        with scheduler.job(_context("j1"), expected_cases=40) as job:
+            futures = [job.submit(slow_case, f"C{i}", cost=0.5) for i in range(40)]
+            futures.append(job.submit(expired_case, "late"))
+            futures.append(job.submit(failing_case, "boom"))
+            list(job.wait())
+    finally:
+        stop.set()
+    results = [f.result() for f in futures[:-2]]
+    assert sorted(r["case_id"] for r in results) == sorted(f"C{i}" for i in range(40))
+    assert sum(r["cost"] for r in results) == 20.0
+    with pytest.raises(DeadlineExceeded, match="past its deadline"):  # a timeout, not a failure
+        futures[-2].result()
+    with pytest.raises(RemoteCaseError, match="ValueError: case boom exploded"):
+        futures[-1].result()
+
+
+def _throughput(db: Path, processes: int, cases: int) -> float:
+    broker = SQLiteBroker(str(db))
+    scheduler = CaseScheduler(workers=64, window=64)
+    configure_distributed_execution(scheduler, f"sqlite:///{db}")
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "worker.py", "--broker", f"sqlite:///{db}", "--concurrency", "2", "--poll-interval", "0.01"],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for _ in range(processes)
+    ]
+    try:
+        # Worker processes import cases by path; pytest's module names for this
+        # file are not importable there, so the cases are plain time.sleep calls.
+        # Warm-up: wait until every worker process is up and claiming.
+        with scheduler.job(_context(f"warm-{processes}"), expected_cases=processes * 2) as job:
+            for _ in range(processes * 2):
+                job.submit(time.sleep, CASE_SECONDS)
+            list(job.wait())
+        started = time.perf_counter()
+        with scheduler.job(_context(f"run-{processes}"), expected_cases=cases) as job:
+            futures = [job.submit(time.sleep, CASE_SECONDS) for _ in range(cases)]
+            list(job.wait())
+        elapsed = time.perf_counter() - started
+        assert all(f.result() is None for f in futures)
+        assert broker.stats() == {"queued": 0, "running": 0, "finished": 0}
+        return cases / elapsed
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+
+@pytest.mark.perf
+def test_throughput_scales_with_worker_processes(tmp_path):
+    """Sleep-bound cases: doubling the worker processes roughly doubles case throughput."""
+    one = _throughput(tmp_path / "one.db", processes=1, cases=40)
+    two = _throughput(tmp_path / "two.db", processes=2, cases=80)
+    assert two >= 1.6 * one, f"cases/s: 1 worker process={one:.1f} 2 worker processes={two:.1f}"
+
+
+_WORKER_IMPORTS = """
+import sys, threading, time
+from work_queue import InProcessBroker, Task, encode_call, run_worker
+broker = InProcessBroker()
+for task_id, agent in (("t1", "agent_simple"), ("t2", "agent_email")):
+    broker.put(Task(id=task_id, job_id="j", func=f"{agent}.job_status", payload=encode_call((), {"context": {"job_id": "j"}})))
+stop = threading.Event()
+run_worker(broker, stop=stop, poll_interval=0.01)
+deadline = time.time() + 30
+results = {}
+while len(results) < 2 and time.time() < deadline:
+    results.update(broker.collect(["t1", "t2"]))
+    time.sleep(0.01)
+stop.set()
+assert results["t1"][0] and results["t2"][0], results
+modules = ("agent_simple", "agent_email", "agent_data_resource", "supervaizer_control")
+print(sorted(name for name in modules if name in sys.modules))
+"""
+
+
+def test_worker_does_not_build_the_api_server():
+    """Workers load the agent modules without the API server or the contact store."""
+    done = subprocess.run(
+        [sys.executable, "-c", _WORKER_IMPORTS], cwd=REPO_ROOT, capture_output=True, text=True, timeout=60
+    )
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip().splitlines()[-1] == "['agent_email', 'agent_simple']"
+
+
+def test_cases_get_only_what_they_need(monkeypatch):
+    """job_start's kwargs carry workspace secrets: they must not reach the broker."""
+    import agent_simple
+
+    received: list[dict] = []
+
+    def fake_case(**kwargs) -> dict:
+        received.append(kwargs)
+        encode_call((), kwargs)  # what distributed mode writes to the broker
+        return {"cost": 1.0}
+
+    monkeypatch.setattr(agent_simple, "custom_case_start", fake_case)
+    secrets = [{"name": "SIMPLE AGENT SECRET", "value": "123456", "is_secret": True}]
+    agent_simple.job_start(
+        fields={"How many times to say hello": "2"}, context=_context("secrets"), agent_parameters=secrets
+    )
+    assert [sorted(kwargs) for kwargs in received] == [["case_id", "deadline", "fields", "job_id"]] * 2
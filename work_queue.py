@@ -0,0 +1,529 @@
+# supervaize_hello_world/work_queue.py
+"""Distributed case execution through a work queue.
+
+In the default ``local`` execution mode the case scheduler (scheduler.py) runs
+cases on threads of the API process. With
+``SUPERVAIZER_EXECUTION_MODE=distributed`` it still decides the dispatch order,
+but each dispatched case is written to a broker and executed by worker
+processes (``python worker.py``). Adding workers raises case throughput;
+``SCHEDULER_WORKERS`` then bounds how many cases are outstanding in the
+broker, so set it to at least the total worker concurrency.
+
+Brokers:
+
+- ``memory://``: in-process queue served by worker threads (development, tests);
+- ``sqlite:///path/to/queue.db``: SQLite file (WAL mode) on a local disk, for
+  workers on the same host. WAL needs shared memory between the processes and
+  does not work on network filesystems (NFS, SMB). Workers on other hosts need a networked ``Broker``
+  implementation (Redis, a database table, a cloud queue).
+
+Accounting stays consistent across workers: a task is leased to one worker
+at a time and only the current lease holder can record the result, so every
+case is counted exactly once in the job's cases and cost. A lease that
+expires (crashed worker) fails the task rather than running it again: the
+case may already have opened its Case on the platform, and a second run
+would open a duplicate. Brokers take ``max_attempts`` for functions that are
+safe to retry.
+
+Tasks name their function by import path and carry JSON arguments (pydantic
+models such as JobContext round-trip); brokers are trusted infrastructure,
+as anyone able to write to one can run any importable function on the workers.
+"""
+import heapq
+import importlib
+import itertools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from loguru import logger as log
+from pydantic import BaseModel
+
+from contacts_store import new_ulids
+from deadlines import DeadlineExceeded
+from scheduler import BATCH, INTERACTIVE, NORMAL, CaseScheduler, JobHandle
+
+# Broker-side ordering of the classes (lower runs first).
+CLASS_PRIORITY = {INTERACTIVE: 0, NORMAL: 1, BATCH: 2}
+
+DEFAULT_LEASE = 300.0
+# Cases are not idempotent (each run opens a platform Case): run them at most once.
+MAX_ATTEMPTS = 1
+
+
+class RemoteCaseError(RuntimeError):
+    """A case failed on a worker; the message carries the remote exception."""
+
+
+# Exceptions re-raised as themselves when a worker reports them, so that the
+# job handles a remote case like a local one (a timeout is not a failure).
+_REMOTE_EXCEPTIONS: dict[str, type[Exception]] = {
+    f"{cls.__module__}.{cls.__qualname__}": cls for cls in (DeadlineExceeded,)
+}
+
+
+@dataclass
+class Task:
+    id: str
+    job_id: str
+    func: str
+    payload: str
+    priority: int = CLASS_PRIORITY[NORMAL]
+    attempts: int = 0
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+
+
+def _import(path: str) -> Any:
+    module_name, _, qualname = path.rpartition(".")
+    target: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        target = getattr(target, name)
+    return target
+
+
+def _function_path(fn: Callable[..., Any]) -> str:
+    if "<" in fn.__qualname__:
+        raise ValueError(f"{fn.__qualname__} is not importable by workers; use a module-level function")
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        cls = type(value)
+        return {"__model__": f"{cls.__module__}.{cls.__qualname__}", "data": value.model_dump(mode="json")}
+    # A str() would reach the worker as a different type: refuse it at submission.
+    raise TypeError(f"{type(value).__name__} arguments cannot be sent to workers; pass JSON values or pydantic models")
+
+
+def _decode(obj: dict[str, Any]) -> Any:
+    if obj.keys() == {"__model__", "data"}:
+        cls = _import(obj["__model__"])
+        if isinstance(cls, type) and issubclass(cls, BaseModel):
+            return cls.model_validate(obj["data"])
+    if obj.keys() == {"__object__"}:
+        return SimpleNamespace(**obj["__object__"])
+    return obj
+
+
+def encode_call(args: tuple, kwargs: dict[str, Any]) -> str:
+    return json.dumps({"args": list(args), "kwargs": kwargs}, default=_encode)
+
+
+def decode_call(payload: str) -> tuple[list[Any], dict[str, Any]]:
+    call = json.loads(payload, object_hook=_decode)
+    return call["args"], call["kwargs"]
+
+
+# Attributes kept when a case function returns an object (e.g. a Case): enough
+# for the job's accounting without shipping credentials back through the broker.
+_RESULT_ATTRIBUTES = ("id", "name", "status", "cost", "total_cost", "calculated_cost")
+
+
+def encode_result(result: Any) -> str:
+    if result is None or isinstance(result, (str, int, float, bool, list, dict)):
+        return json.dumps(result, default=str)
+    summary = {name: getattr(result, name) for name in _RESULT_ATTRIBUTES if hasattr(result, name)}
+    return json.dumps({"__object__": summary}, default=str)
+
+
+def decode_result(value: str) -> Any:
+    return json.loads(value, object_hook=_decode)
+
+
+def encode_error(exc: Exception) -> str:
+    cls = type(exc)
+    return json.dumps({"__error__": f"{cls.__module__}.{cls.__qualname__}", "message": str(exc)})
+
+
+def decode_error(value: str) -> Exception:
+    """The exception to raise locally: a known type (see ``_REMOTE_EXCEPTIONS``) or ``RemoteCaseError``."""
+    error = json.loads(value)
+    if not isinstance(error, dict):  # reported by the broker, e.g. a lost worker
+        return RemoteCaseError(error)
+    kind, message = error["__error__"], error["message"]
+    if kind in _REMOTE_EXCEPTIONS:
+        return _REMOTE_EXCEPTIONS[kind](message)
+    return RemoteCaseError(f"{kind.rpartition('.')[2]}: {message}")
+
+
+# ---------------------------------------------------------------------------
+# Brokers
+# ---------------------------------------------------------------------------
+
+
+class Broker(ABC):
+    """Work queue contract shared by the API process and the workers."""
+
+    @abstractmethod
+    def put(self, task: Task) -> None:
+        """Queue ``task``."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease: float = DEFAULT_LEASE) -> Task | None:
+        """Lease the next task (lowest priority value, then FIFO), or None."""
+
+    @abstractmethod
+    def heartbeat(self, task_id: str, worker_id: str, lease: float = DEFAULT_LEASE) -> bool:
+        """Extend a lease; False when the lease was lost."""
+
+    @abstractmethod
+    def finish(self, task_id: str, worker_id: str, ok: bool, value: str) -> bool:
+        """Record a result if ``worker_id`` still holds the lease."""
+
+    @abstractmethod
+    def collect(self, task_ids: list[str]) -> dict[str, tuple[bool, str]]:
+        """Pop the results available among ``task_ids``."""
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        """Queued, running and finished task counts."""
+
+
+class InProcessBroker(Broker):
+    """Thread-safe in-memory broker."""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS) -> None:
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._queued: list[tuple[int, int, Task]] = []
+        self._running: dict[str, tuple[Task, str, float]] = {}
+        self._finished: dict[str, tuple[bool, str]] = {}
+
+    def put(self, task: Task) -> None:
+        with self._lock:
+            heapq.heappush(self._queued, (task.priority, next(self._seq), task))
+
+    def _expire(self, now: float) -> None:
+        for task_id, (task, _worker, lease_until) in list(self._running.items()):
+            if lease_until < now:
+                del self._running[task_id]
+                if task.attempts >= self.max_attempts:
+                    self._finished[task_id] = (False, json.dumps(f"worker lost after {task.attempts} attempts"))
+                else:
+                    heapq.heappush(self._queued, (task.priority, next(self._seq), task))
+
+    def claim(self, worker_id: str, lease: float = DEFAULT_LEASE) -> Task | None:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if not self._queued:
+                return None
+            _priority, _seq, task = heapq.heappop(self._queued)
+            task.attempts += 1
+            self._running[task.id] = (task, worker_id, now + lease)
+            return task
+
+    def heartbeat(self, task_id: str, worker_id: str, lease: float = DEFAULT_LEASE) -> bool:
+        with self._lock:
+            entry = self._running.get(task_id)
+            if entry is None or entry[1] != worker_id:
+                return False
+            self._running[task_id] = (entry[0], worker_id, time.time() + lease)
+            return True
+
+    def finish(self, task_id: str, worker_id: str, ok: bool, value: str) -> bool:
+        with self._lock:
+            entry = self._running.get(task_id)
+            if entry is None or entry[1] != worker_id:
+                return False
+            del self._running[task_id]
+            self._finished[task_id] = (ok, value)
+            return True
+
+    def collect(self, task_ids: list[str]) -> dict[str, tuple[bool, str]]:
+        with self._lock:
+            return {task_id: self._finished.pop(task_id) for task_id in task_ids if task_id in self._finished}
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"queued": len(self._queued), "running": len(self._running), "finished": len(self._finished)}
+
+
+class SQLiteBroker(Broker):
+    """Broker on a local-disk SQLite file shared by the API process and the workers.
+
+    Claims run in ``BEGIN IMMEDIATE`` transactions, so concurrent workers never
+    lease the same task. Each thread uses its own connection.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            job_id TEXT NOT NULL,
+            func TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            worker TEXT,
+            lease_until REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            ok INTEGER,
+            result TEXT
+        );
+        CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, priority);
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, task: Task) -> None:
+        self._conn().execute(
+            "INSERT INTO tasks (id, job_id, func, payload, priority) VALUES (?, ?, ?, ?, ?)",
+            (task.id, task.job_id, task.func, task.payload, task.priority),
+        )
+
+    def claim(self, worker_id: str, lease: float = DEFAULT_LEASE) -> Task | None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', ok = 0, result = ?"
+                " WHERE state = 'running' AND lease_until < ? AND attempts >= ?",
+                (json.dumps(f"worker lost after {self.max_attempts} attempts"), now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, job_id, func, payload, priority, attempts FROM tasks"
+                " WHERE state = 'queued' OR (state = 'running' AND lease_until < ?)"
+                " ORDER BY priority, rowid LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE tasks SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1"
+                    " WHERE id = ?",
+                    (worker_id, now + lease, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        task_id, job_id, func, payload, priority, attempts = row
+        return Task(task_id, job_id, func, payload, priority, attempts + 1)
+
+    def heartbeat(self, task_id: str, worker_id: str, lease: float = DEFAULT_LEASE) -> bool:
+        cursor = self._conn().execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            (time.time() + lease, task_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, task_id: str, worker_id: str, ok: bool, value: str) -> bool:
+        cursor = self._conn().execute(
+            "UPDATE tasks SET state = ?, ok = ?, result = ?, lease_until = NULL"
+            " WHERE id = ? AND worker = ? AND state = 'running'",
+            ("done" if ok else "failed", int(ok), value, task_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def collect(self, task_ids: list[str]) -> dict[str, tuple[bool, str]]:
+        conn = self._conn()
+        results: dict[str, tuple[bool, str]] = {}
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start : start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, ok, result FROM tasks WHERE state IN ('done', 'failed') AND id IN ({marks})", chunk
+            ).fetchall()
+            if rows:
+                found = [row[0] for row in rows]
+                conn.execute(f"DELETE FROM tasks WHERE id IN ({','.join('?' * len(found))})", found)
+                results.update((task_id, (bool(ok), result)) for task_id, ok, result in rows)
+        return results
+
+    def stats(self) -> dict[str, int]:
+        counts = dict(self._conn().execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "finished": counts.get("done", 0) + counts.get("failed", 0),
+        }
+
+
+def broker_from_url(url: str) -> Broker:
+    """``memory://`` or ``sqlite:///relative.db`` / ``sqlite:////absolute.db``."""
+    if url == "memory://":
+        return InProcessBroker()
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///") :])
+    raise ValueError(f"Unsupported work queue URL: {url!r}")
+
+
+# ---------------------------------------------------------------------------
+# API side: cases -> futures
+# ---------------------------------------------------------------------------
+
+
+class RemoteExecutor:
+    """Queues calls on a broker and resolves their futures from one poller thread."""
+
+    def __init__(self, broker: Broker, poll_interval: float = 0.05) -> None:
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self._pending: dict[str, Future[Any]] = {}
+        self._lock = threading.Lock()
+        self._poller: threading.Thread | None = None
+
+    def submit(
+        self, fn: Callable[..., Any], args: tuple, kwargs: dict[str, Any], job_id: str, priority: int
+    ) -> Future[Any]:
+        task = Task(new_ulids()[0], job_id, _function_path(fn), encode_call(args, kwargs), priority)
+        future: Future[Any] = Future()
+        with self._lock:
+            self._pending[task.id] = future
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name="work-queue-results", daemon=True)
+                self._poller.start()
+        self.broker.put(task)
+        return future
+
+    def run(self, handle: JobHandle, fn: Callable[..., Any], args: tuple, kwargs: dict[str, Any]) -> Any:
+        """CaseScheduler runner: execute the case remotely and wait for its result."""
+        return self.submit(fn, args, kwargs, handle.job_id, CLASS_PRIORITY[handle.priority]).result()
+
+    def _poll(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                task_ids = list(self._pending)
+            if not task_ids:
+                continue
+            try:
+                results = self.broker.collect(task_ids)
+            except Exception as exc:  # broker hiccup: keep polling
+                log.error(f"[WorkQueue] collecting results failed: {exc}")
+                continue
+            for task_id, (ok, value) in results.items():
+                with self._lock:
+                    future = self._pending.pop(task_id)
+                if ok:
+                    future.set_result(decode_result(value))
+                else:
+                    future.set_exception(decode_error(value))
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+def execute(task: Task) -> tuple[bool, str]:
+    """Run a task's function; returns ``(ok, encoded result or error)``."""
+    try:
+        args, kwargs = decode_call(task.payload)
+        return True, encode_result(_import(task.func)(*args, **kwargs))
+    except Exception as exc:
+        log.error(f"[Worker] Task {task.id} ({task.func}) failed: {exc}")
+        return False, encode_error(exc)
+
+
+def run_worker(
+    broker: Broker,
+    concurrency: int = 1,
+    worker_id: str | None = None,
+    lease: float = DEFAULT_LEASE,
+    poll_interval: float = 0.2,
+    stop: threading.Event | None = None,
+) -> list[threading.Thread]:
+    """Start ``concurrency`` threads consuming ``broker`` until ``stop`` is set.
+
+    A heartbeat thread renews the leases of running tasks every ``lease / 3``.
+    Returns the started threads (daemon); join them to block.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    active: dict[str, str] = {}  # task id -> lease holder id
+    active_lock = threading.Lock()
+
+    def consume(slot: int) -> None:
+        holder = f"{worker_id}/{slot}"
+        while not stop.is_set():
+            task = broker.claim(holder, lease)
+            if task is None:
+                stop.wait(poll_interval)
+                continue
+            with active_lock:
+                active[task.id] = holder
+            ok, value = execute(task)
+            with active_lock:
+                del active[task.id]
+            if not broker.finish(task.id, holder, ok, value):
+                log.warning(f"[Worker] Lease on task {task.id} was lost; result discarded")
+
+    def heartbeat() -> None:
+        while not stop.wait(lease / 3):
+            with active_lock:
+                leases = list(active.items())
+            for task_id, holder in leases:
+                broker.heartbeat(task_id, holder, lease)
+
+    threads = [
+        threading.Thread(target=consume, args=(slot,), name=f"{worker_id}/{slot}", daemon=True)
+        for slot in range(concurrency)
+    ]
+    threads.append(threading.Thread(target=heartbeat, name=f"{worker_id}/heartbeat", daemon=True))
+    for thread in threads:
+        thread.start()
+    log.info(f"[Worker] {worker_id}: {concurrency} slot(s) consuming {type(broker).__name__}")
+    return threads
+
+
+def configure_distributed_execution(
+    scheduler: CaseScheduler, url: str, local_workers: int = 0
+) -> RemoteExecutor:
+    """Route the scheduler's cases through the broker at ``url``.
+
+    ``local_workers`` starts in-process worker threads (always needed with
+    ``memory://``, since no other process can reach that queue).
+    """
+    broker = broker_from_url(url)
+    executor = RemoteExecutor(broker)
+    scheduler.runner = executor.run
+    if isinstance(broker, InProcessBroker):
+        local_workers = local_workers or scheduler.workers
+    if local_workers:
+        run_worker(broker, concurrency=local_workers, worker_id="local", poll_interval=0.01)
+    log.info(f"[WorkQueue] Distributed execution via {url}")
+    return executor
+
+
+def configure_from_env(scheduler: CaseScheduler) -> RemoteExecutor | None:
+    """Apply SUPERVAIZER_EXECUTION_MODE / SUPERVAIZER_WORK_QUEUE / SUPERVAIZER_LOCAL_WORKERS."""
+    mode = os.getenv("SUPERVAIZER_EXECUTION_MODE", "local")
+    if mode == "local":
+        return None
+    if mode != "distributed":
+        raise ValueError(f"SUPERVAIZER_EXECUTION_MODE must be 'local' or 'distributed', got {mode!r}")
+    return configure_distributed_execution(
+        scheduler,
+        os.getenv("SUPERVAIZER_WORK_QUEUE", "sqlite:///work_queue.db"),
+        int(os.getenv("SUPERVAIZER_LOCAL_WORKERS", "0")),
+    )
@@ -0,0 +1,51 @@
+# supervaize_hello_world/worker.py
+"""Case worker process for SUPERVAIZER_EXECUTION_MODE=distributed.
+
+Consumes cases queued by the API process (see work_queue.py). Start as many
+as needed; with the SQLite broker they run on the host that holds the file:
+
+    python worker.py --broker sqlite:///work_queue.db --concurrency 4
+"""
+import argparse
+import os
+import threading
+
+from loguru import logger as log
+
+from work_queue import DEFAULT_LEASE, broker_from_url, run_worker
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run Hello World agent cases from the work queue")
+    parser.add_argument("--broker", default=os.getenv("SUPERVAIZER_WORK_QUEUE", "sqlite:///work_queue.db"))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--worker-id", default=None, help="Defaults to <hostname>:<pid>")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE, help="Seconds before an unrenewed case is failed")
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.broker == "memory://":
+        parser.error("memory:// is in-process only; point workers at a shared broker such as sqlite:///work_queue.db")
+
+    stop = threading.Event()
+    threads = run_worker(
+        broker_from_url(args.broker),
+        concurrency=args.concurrency,
+        worker_id=args.worker_id,
+        lease=args.lease,
+        poll_interval=args.poll_interval,
+        stop=stop,
+    )
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        log.info("[Worker] Stopping: running cases finish, no new ones are claimed")
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()